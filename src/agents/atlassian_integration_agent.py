@@ -225,12 +225,12 @@ If this is not a requirements-related issue, return {{"skip": true}}"""
         self, context: AgentContext, issues: list[JiraIssue]
     ) -> list[str]:
         """Extract business rules from issues."""
-        all_descriptions = "\n---\n".join(
-            [
-                f"[{issue.key}] {issue.summary}\n{issue.description}"
-                for issue in issues[:10]  # Limit to avoid token overflow
-            ]
+        # Issues arrive most relevant first; pack as many as fit the budget
+        issue_texts = [f"[{issue.key}] {issue.summary}\n{issue.description}" for issue in issues]
+        packed = self.token_budget.pack(
+            issue_texts, self.context_budget(context), separator_tokens=3
         )
+        all_descriptions = "\n---\n".join(item.text for item in packed)
 
         prompt = f"""From these Jira issues, extract all business rules mentioned:
 
@@ -2,13 +2,21 @@
 Base Agent class for all specialized PRD agents.
 
 Provides common functionality for:
-- LLM invocation with retry logic
+- LLM invocation with rate limiting, adaptive concurrency and retry logic
+- Optional disk cache of LLM responses
 - Vector store context retrieval
+- Token budgeting of prompts
 - Structured response parsing
 - Execution timing and logging
+- Per-call token, cost and latency accounting
 """
 
+import asyncio
+import hashlib
+import inspect
+import json
 from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable, Mapping
 from dataclasses import dataclass, field
 from typing import Any, Generic, TypeVar
 
@@ -16,13 +24,27 @@ from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 
 from src.config.settings import get_settings
+from src.utils.concurrency import ConcurrencyController, get_concurrency_controller
+from src.utils.image_processing import VisionImage
+from src.utils.llm_cache import LLMResponseCache
+from src.utils.llm_usage import LLMCallRecord, summarize_llm_calls
 from src.utils.logging_config import ExecutionTimer, get_logger
+from src.utils.model_routing import STANDARD_TIER, ModelRouter, ModelTier, get_model_router
+from src.utils.rate_limiter import (
+    HIGH_DETAIL_IMAGE_TOKENS,
+    LOW_DETAIL_IMAGE_TOKENS,
+    RateLimiter,
+    get_rate_limiter,
+    usage_tokens,
+)
 from src.utils.serialization import (
     extract_json_array,
     extract_json_object,
     from_dict_list,
+    json_schema_response_format,
     parse_list_response,
 )
+from src.utils.token_budget import ContextItem, TokenBudget
 from src.vector_store.qdrant_manager import QdrantManager
 
 # Type variable for agent output
@@ -65,6 +87,9 @@ class BaseAgent(ABC, Generic[T]):
     - Execution result creation
     """
 
+    # Model tier of calls without a route of their own
+    default_tier = STANDARD_TIER
+
     def __init__(self, name: str) -> None:
         """
         Initialize the base agent.
@@ -75,22 +100,111 @@ class BaseAgent(ABC, Generic[T]):
         self.name = name
         self.settings = get_settings()
         self._llm: ChatOpenAI | None = None
+        self._tier_llms: dict[str, ChatOpenAI] = {}
+        self._router: ModelRouter | None = None
         self._vector_store: QdrantManager | None = None
+        self._rate_limiter: RateLimiter | None = None
+        self._concurrency: ConcurrencyController | None = None
+        self._response_cache: LLMResponseCache | None = None
+        bypass = {a.strip() for a in self.settings.llm.cache_bypass_agents.split(",")}
+        # Agents can also opt out in code, e.g. when prompts embed volatile data
+        self.use_response_cache = self.settings.llm.cache_enabled and name not in bypass
+        self.llm_calls: list[LLMCallRecord] = []
         self.logger = get_logger(name, agent=name)
 
     @property
     def llm(self) -> ChatOpenAI:
-        """Get or create the LLM instance."""
+        """Get or create the LLM instance of the agent's default tier."""
         if self._llm is None:
-            self._llm = ChatOpenAI(
-                model=self.settings.openai.model,
-                openai_api_key=self.settings.openai.api_key,
-                temperature=self.settings.openai.temperature,
-                max_tokens=self.settings.openai.max_tokens,
-            )
-            self.logger.debug("Initialized LLM", model=self.settings.openai.model)
+            self._llm = self._create_llm(self.router.tier(self.default_tier))
         return self._llm
 
+    @property
+    def router(self) -> ModelRouter:
+        """Get the process-wide routing table of call sites to model tiers."""
+        if self._router is None:
+            self._router = get_model_router()
+        return self._router
+
+    def llm_for_tier(self, tier: ModelTier) -> ChatOpenAI:
+        """
+        Get or create the LLM instance of a model tier.
+
+        Args:
+            tier: The routed tier
+
+        Returns:
+            The agent's default LLM for its default tier, a tier-specific one otherwise
+        """
+        if tier.name == self.default_tier:
+            return self.llm
+        if tier.name not in self._tier_llms:
+            self._tier_llms[tier.name] = self._create_llm(tier)
+        return self._tier_llms[tier.name]
+
+    def _create_llm(self, tier: ModelTier) -> ChatOpenAI:
+        """Create the LLM instance of a tier."""
+        llm = ChatOpenAI(
+            model=tier.model,
+            openai_api_key=self.settings.openai.api_key,
+            temperature=tier.temperature,
+            max_tokens=tier.max_tokens,
+            # Retries go through the rate limiter, which honours Retry-After
+            max_retries=0,
+        )
+        self.logger.debug("Initialized LLM", model=tier.model, tier=tier.name)
+        return llm
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        """Get the process-wide rate limiter shared by all agents."""
+        if self._rate_limiter is None:
+            self._rate_limiter = get_rate_limiter()
+        return self._rate_limiter
+
+    @property
+    def concurrency(self) -> ConcurrencyController:
+        """Get the process-wide controller of in-flight LLM calls."""
+        if self._concurrency is None:
+            self._concurrency = get_concurrency_controller()
+        return self._concurrency
+
+    @property
+    def token_budget(self) -> TokenBudget:
+        """Token budget of calls to this agent's default model."""
+        return self._token_budget(self.router.tier(self.default_tier))
+
+    def _token_budget(self, tier: ModelTier) -> TokenBudget:
+        """Token budget of calls to a model tier (needs no API client)."""
+        return TokenBudget(
+            tier.model,
+            max_completion_tokens=tier.max_tokens,
+            headroom=self.settings.llm.prompt_headroom_tokens,
+        )
+
+    def context_budget(self, context: AgentContext, *fixed_texts: str) -> int:
+        """
+        Tokens available for variable context in a prompt.
+
+        Args:
+            context: The agent context (selects the system prompt)
+            *fixed_texts: Fixed prompt parts (template, other sections)
+
+        Returns:
+            The configured context budget, reduced if the prompt would not fit the model
+        """
+        return min(
+            self.settings.llm.context_budget_tokens,
+            self.token_budget.available(self.get_system_prompt(context), *fixed_texts),
+        )
+
+    @property
+    def response_cache(self) -> LLMResponseCache:
+        """Get or create the LLM response cache."""
+        if self._response_cache is None:
+            self._response_cache = LLMResponseCache()
+        return self._response_cache
+
     @property
     def vector_store(self) -> QdrantManager:
         """Get or create the vector store manager."""
@@ -128,15 +242,31 @@ class BaseAgent(ABC, Generic[T]):
     # ========== LLM Invocation Methods ==========
 
     async def invoke_llm(
-        self, context: AgentContext, user_prompt: str, images: list[str] | None = None
+        self,
+        context: AgentContext,
+        user_prompt: str,
+        images: list[str | VisionImage] | None = None,
+        use_cache: bool = True,
+        response_format: dict[str, Any] | None = None,
+        validate: Callable[[str], bool] | None = None,
+        tier: str | None = None,
     ) -> str:
         """
         Invoke the LLM with system and user prompts.
 
+        The model is selected by the routing table entry of the calling
+        method. When the response fails ``validate`` and the tier escalates,
+        the call is repeated on the stronger tier.
+
         Args:
             context: The agent context
             user_prompt: The user message content
-            images: Optional list of base64-encoded images for vision
+            images: Optional images for vision; plain strings are base64 PNGs,
+                VisionImage carries its own MIME type and detail level
+            use_cache: Allow a cached response when the response cache is enabled
+            response_format: Optional API response format (e.g. a JSON schema)
+            validate: Optional check of the response; invalid responses are not cached
+            tier: Explicit model tier, overriding the routing table
 
         Returns:
             LLM response as string
@@ -144,26 +274,164 @@ class BaseAgent(ABC, Generic[T]):
         system_prompt = self.get_system_prompt(context)
         messages = [SystemMessage(content=system_prompt)]
 
+        call_site = self._call_site()
+        route = (
+            self.router.tier(tier) if tier else self.router.route(call_site, self.default_tier)
+        )
+        llm = self.llm_for_tier(route)
+        model = llm.model_name
+        budget = self._token_budget(route)
+        original_prompt = user_prompt
+        available = budget.available(system_prompt)
+        if budget.count(user_prompt) > available:
+            self.logger.warning(
+                "Prompt exceeds the model's context window, truncating",
+                prompt_tokens=budget.count(user_prompt),
+                available_tokens=available,
+            )
+            user_prompt = budget.fit(user_prompt, available)
+
+        # Prompt plus the full completion budget, as the API counts it against the limits
+        estimated_tokens = (
+            budget.count(system_prompt) + budget.count(user_prompt) + budget.max_completion_tokens
+        )
+        if response_format:
+            estimated_tokens += budget.count(json.dumps(response_format))
+        image_hashes: list[str] = []
+
         if images:
             # Use vision-capable message format
             content: list[dict[str, Any]] = [{"type": "text", "text": user_prompt}]
             for img in images:
+                if isinstance(img, str):
+                    img = VisionImage(data=img)
+                image_hashes.append(
+                    hashlib.sha256(f"{img.detail}:{img.data_url}".encode()).hexdigest()
+                )
+                estimated_tokens += (
+                    LOW_DETAIL_IMAGE_TOKENS if img.detail == "low" else HIGH_DETAIL_IMAGE_TOKENS
+                )
                 content.append(
-                    {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{img}"}}
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": img.data_url, "detail": img.detail},
+                    }
                 )
             messages.append(HumanMessage(content=content))
         else:
             messages.append(HumanMessage(content=user_prompt))
 
+        timer = ExecutionTimer()
+        cache_key = None
+        if use_cache and self.use_response_cache:
+            cache_key = LLMResponseCache.cache_key(
+                model,
+                llm.temperature,
+                llm.max_tokens,
+                system_prompt,
+                user_prompt,
+                image_hashes,
+                response_format,
+            )
+            # The cache is SQLite-backed and may wait on its lock; keep it off the event loop
+            cached = await asyncio.to_thread(self.response_cache.get, cache_key)
+            if cached is not None:
+                self.logger.debug("LLM response served from cache", prompt_length=len(user_prompt))
+                self._record_call(call_site, model, timer, from_cache=True)
+                return cached
+
         self.logger.debug(
             "Invoking LLM",
+            model=model,
+            tier=route.name,
             prompt_length=len(user_prompt),
             has_images=bool(images),
             image_count=len(images) if images else 0,
         )
 
-        response = await self.llm.ainvoke(messages)
-        return str(response.content)
+        kwargs = {"response_format": response_format} if response_format else {}
+
+        async def call() -> Any:
+            # Each attempt holds a slot; waits between retries do not
+            async with self.concurrency.slot(model):
+                return await llm.ainvoke(messages, **kwargs)
+
+        retries = 0
+
+        def count_retry(error: Exception) -> None:
+            nonlocal retries
+            retries += 1
+
+        try:
+            response = await self.rate_limiter.run(
+                model, estimated_tokens, call, actual_tokens=usage_tokens, on_retry=count_retry
+            )
+        except Exception:
+            self._record_call(call_site, model, timer, retries=retries, success=False)
+            raise
+
+        self._record_call(call_site, model, timer, response=response, retries=retries)
+        text = str(response.content)
+        if validate is not None and not validate(text):
+            if route.escalate_to:
+                self.logger.info(
+                    "Escalating LLM call after invalid response",
+                    call_site=call_site,
+                    model=model,
+                    tier=route.escalate_to,
+                )
+                return await self.invoke_llm(
+                    context,
+                    original_prompt,
+                    images=images,
+                    use_cache=use_cache,
+                    response_format=response_format,
+                    validate=validate,
+                    tier=route.escalate_to,
+                )
+            return text
+        if cache_key:
+            await asyncio.to_thread(self.response_cache.put, cache_key, model, text)
+        return text
+
+    def llm_usage(self) -> dict[str, Any]:
+        """Token, cost and latency totals of this agent's calls, per call site."""
+        return summarize_llm_calls(self.llm_calls)
+
+    def _call_site(self) -> str:
+        """Qualified name of the agent method that (indirectly) invoked the LLM."""
+        frame = inspect.currentframe()
+        # Skip the invocation helpers defined in this module
+        while frame is not None and frame.f_globals.get("__name__") == __name__:
+            frame = frame.f_back
+        return frame.f_code.co_qualname if frame is not None else self.name
+
+    def _record_call(
+        self,
+        call_site: str,
+        model: str,
+        timer: ExecutionTimer,
+        response: Any = None,
+        retries: int = 0,
+        from_cache: bool = False,
+        success: bool = True,
+    ) -> None:
+        """Record the usage of one LLM call."""
+        usage = getattr(response, "usage_metadata", None) or {}
+        record = LLMCallRecord(
+            agent=self.name,
+            call_site=call_site,
+            model=model,
+            prompt_tokens=usage.get("input_tokens", 0),
+            completion_tokens=usage.get("output_tokens", 0),
+            cached_tokens=(usage.get("input_token_details") or {}).get("cache_read", 0),
+            latency_ms=timer.elapsed_ms(),
+            retries=retries,
+            from_cache=from_cache,
+            success=success,
+        )
+        self.llm_calls.append(record)
+        self.logger.debug("LLM call completed", **record.to_dict())
 
     async def invoke_llm_for_json_array(
         self,
@@ -182,10 +450,105 @@ class BaseAgent(ABC, Generic[T]):
         Returns:
             List of parsed dataclass instances
         """
-        response = await self.invoke_llm(context, prompt)
-        json_data = extract_json_array(response)
+        json_data = await self.invoke_llm_structured(context, prompt, result_class, many=True)
         return from_dict_list(json_data, result_class)
 
+    async def invoke_llm_structured(
+        self,
+        context: AgentContext,
+        prompt: str,
+        result_class: type,
+        many: bool = False,
+        images: list[str | VisionImage] | None = None,
+        exclude: tuple[str, ...] = (),
+    ) -> Any:
+        """
+        Invoke LLM with a JSON schema derived from a dataclass as response format.
+
+        The provider constrains the response to the schema, so it parses
+        without scanning. With structured output disabled (models without
+        JSON schema support), JSON is extracted from the free-text response.
+
+        Args:
+            context: The agent context
+            prompt: The prompt describing the expected result
+            result_class: Dataclass the response fields are taken from
+            many: Whether a list of results is expected
+            images: Optional images for vision
+            exclude: Top-level fields of the dataclass not requested from the model
+
+        Returns:
+            Field dict of one result, or a list of them when ``many`` (empty on failure)
+        """
+        response_format = None
+        if self.settings.llm.structured_output_enabled:
+            response_format = json_schema_response_format(result_class, many, exclude)
+        parse = extract_json_array if many else extract_json_object
+        response = await self.invoke_llm(
+            context,
+            prompt,
+            images=images,
+            response_format=response_format,
+            validate=lambda text: bool(parse(text)),
+        )
+        return parse(response)
+
+    async def invoke_llm_for_sections(
+        self,
+        context: AgentContext,
+        prompt: str,
+        sections_class: type,
+        exclude: tuple[str, ...] = (),
+    ) -> dict[str, Any]:
+        """
+        Request several result sections in one structured call.
+
+        Args:
+            context: The agent context
+            prompt: The prompt describing every requested section
+            sections_class: Dataclass with one field per section
+            exclude: Sections not requested from the model
+
+        Returns:
+            Field dict of the sections (empty when the call fails)
+        """
+        try:
+            data = await self.invoke_llm_structured(
+                context, prompt, sections_class, exclude=exclude
+            )
+        except Exception as e:
+            self.logger.warning(
+                "Combined sections call failed", sections=sections_class.__name__, error=str(e)
+            )
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    async def fill_missing_sections(
+        self,
+        sections: dict[str, Any],
+        fallbacks: Mapping[str, Callable[[], Awaitable[Any]]],
+    ) -> dict[str, Any]:
+        """
+        Complete the sections of a combined call with individual calls.
+
+        Agents request their secondary sections in one structured call and
+        keep only the sections that pass validation; the others are
+        generated one by one.
+
+        Args:
+            sections: Valid sections from the combined call
+            fallbacks: Individual call per section name
+
+        Returns:
+            The sections, including those produced by fallbacks
+        """
+        missing = [name for name in fallbacks if name not in sections]
+        if missing:
+            self.logger.info("Generating sections individually", sections=missing)
+        for name in missing:
+            sections[name] = await fallbacks[name]()
+        return sections
+
     async def invoke_llm_for_json_object(
         self,
         context: AgentContext,
@@ -201,7 +564,9 @@ class BaseAgent(ABC, Generic[T]):
         Returns:
             Parsed dictionary
         """
-        response = await self.invoke_llm(context, prompt)
+        response = await self.invoke_llm(
+            context, prompt, validate=lambda text: bool(extract_json_object(text))
+        )
         return extract_json_object(response)
 
     async def invoke_llm_for_list(
@@ -221,7 +586,9 @@ class BaseAgent(ABC, Generic[T]):
         Returns:
             List of extracted items
         """
-        response = await self.invoke_llm(context, prompt)
+        response = await self.invoke_llm(
+            context, prompt, validate=lambda text: bool(parse_list_response(text, prefix))
+        )
         return parse_list_response(response, prefix)
 
     # ========== Vector Store Methods ==========
@@ -259,13 +626,57 @@ class BaseAgent(ABC, Generic[T]):
             )
             return []
 
-    def format_context_for_prompt(self, contexts: list[str], max_contexts: int = 5) -> str:
+    def retrieve_scored_context(
+        self, form_name: str, query: str, limit: int = 10, doc_type: str | None = None
+    ) -> list[ContextItem]:
+        """
+        Retrieve relevant context with similarity scores for budgeted packing.
+
+        Args:
+            form_name: Name of the form collection
+            query: Search query
+            limit: Maximum number of results
+            doc_type: Optional document type filter
+
+        Returns:
+            Context items scored by vector similarity
+        """
+        try:
+            filter_metadata = {"doc_type": doc_type} if doc_type else None
+            results = self.vector_store.search(
+                form_name=form_name,
+                query=query,
+                limit=limit,
+                filter_metadata=filter_metadata,
+            )
+            return [
+                ContextItem(text=r.content, score=r.score, metadata=r.metadata) for r in results
+            ]
+        except Exception as e:
+            self.logger.warning(
+                "Failed to retrieve context from vector store",
+                error=str(e),
+                form_name=form_name,
+                query=query[:50],
+            )
+            return []
+
+    def format_context_for_prompt(
+        self,
+        contexts: list[str] | list[ContextItem],
+        max_contexts: int = 5,
+        max_tokens: int | None = None,
+    ) -> str:
         """
         Format retrieved contexts for inclusion in a prompt.
 
+        The most relevant contexts are packed into the token budget rather
+        than taking a fixed number of them.
+
         Args:
-            contexts: List of context strings
+            contexts: Context strings (ordered by relevance) or scored context items
             max_contexts: Maximum number of contexts to include
+            max_tokens: Token budget (defaults to the configured context budget)
 
         Returns:
             Formatted context string
@@ -273,8 +684,12 @@ class BaseAgent(ABC, Generic[T]):
         if not contexts:
             return "No additional context available."
 
-        limited = contexts[:max_contexts]
-        formatted = [f"[Context {i}]\n{ctx}\n" for i, ctx in enumerate(limited, 1)]
+        if max_tokens is None:
+            max_tokens = self.settings.llm.context_budget_tokens
+        packed = self.token_budget.pack(
+            contexts, max_tokens, separator_tokens=6, max_items=max_contexts
+        )
+        formatted = [f"[Context {i}]\n{item.text}\n" for i, item in enumerate(packed, 1)]
         return "\n".join(formatted)
 
     # ========== Result Creation Methods ==========
@@ -293,6 +708,8 @@ class BaseAgent(ABC, Generic[T]):
         Returns:
             AgentResult with success=True
         """
+        metadata.setdefault("llm_usage", self.llm_usage())
+        metadata.setdefault("llm_concurrency", self.concurrency.metrics())
         return AgentResult(
             agent_name=self.name,
             success=True,
@@ -324,4 +741,5 @@ class BaseAgent(ABC, Generic[T]):
             success=False,
             error=error_msg,
             execution_time_ms=timer.elapsed_ms(),
+            metadata={"llm_usage": self.llm_usage()},
         )
@@ -237,10 +237,11 @@ class PRDAggregatorAgent(BaseAgent[PRDAggregatorResult]):
         """Generate the overview section."""
         jira_context = ""
         if atlassian_analysis:
+            summary = self.token_budget.fit(atlassian_analysis.summary, 150)
             jira_context = f"""
 Based on Jira analysis:
 - Total issues: {atlassian_analysis.total_issues}
-- Summary: {atlassian_analysis.summary[:500]}
+- Summary: {summary}
 """
         
         prompt = f"""Write the Overview section for "{context.form_name}" PRD:
@@ -272,7 +273,7 @@ Write in professional technical documentation style."""
 
 ### Screens Analyzed
 {len(screenshot_analysis.screen_analyses)} screens were analyzed for the {context.form_name} module.
-
+{self._format_dedup_note(screenshot_analysis)}
 ### Screen Inventory
 {screen_summary}
 
@@ -294,6 +295,17 @@ Write in professional technical documentation style."""
         
         return PRDSection(title="2. User Interface", content=content, order=2)
     
+    def _format_dedup_note(self, screenshot_analysis: ScreenshotAnalysisResult) -> str:
+        """Note on near-duplicate screenshots that shared a vision call."""
+        if not screenshot_analysis.vision_calls_skipped:
+            return ""
+        return (
+            f"{screenshot_analysis.total_screens} screenshots were grouped into "
+            f"{len([s for s in screenshot_analysis.screen_analyses if s.screenshots])} distinct "
+            f"screens; {screenshot_analysis.vision_calls_skipped} near-duplicate screenshots "
+            "reused the analysis of their representative.\n"
+        )
+
     async def _generate_functional_requirements_section(
         self, context: AgentContext, requirements_analysis: RequirementsGeneratorResult
     ) -> PRDSection:
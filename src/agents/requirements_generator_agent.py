@@ -5,14 +5,26 @@ Analyzes code, Jira documentation, and screenshots to generate comprehensive
 functional and non-functional requirements for legacy system migration.
 """
 
+import re
+from collections import defaultdict
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Any
 
 from src.agents.base_agent import AgentContext, AgentResult, BaseAgent
 from src.extractors.code_extractor import CodeFile
+from src.extractors.sql_schema import SchemaIndex, TableSchema, generic_type
 from src.prompts.requirements import RequirementsPrompts
 from src.utils.logging_config import ExecutionTimer
 from src.utils.serialization import extract_json_array
+from src.utils.token_budget import ContextItem
+
+# Tables described per LLM call when a parsed schema is available
+SCHEMA_DESCRIPTION_BATCH = 40
+
+# Methods listed and tokens allowed per file in code summaries
+SUMMARY_METHODS_PER_FILE = 15
+SUMMARY_TOKENS_PER_FILE = 200
 
 
 @dataclass
@@ -100,11 +112,13 @@ class RequirementsGeneratorAgent(BaseAgent[RequirementsGeneratorResult]):
             code_files: Analyzed code files
             jira_context: Summary from Jira analysis
             screenshot_context: Summary from screenshot analysis
+            **kwargs: Optional ``schema`` (serialized SchemaIndex parsed from DDL)
 
         Returns:
             AgentResult with RequirementsGeneratorResult
         """
         timer = ExecutionTimer()
+        schema = SchemaIndex.from_dict(kwargs.get("schema"))
 
         self.logger.info(
             "Starting requirements generation",
@@ -115,7 +129,7 @@ class RequirementsGeneratorAgent(BaseAgent[RequirementsGeneratorResult]):
 
         try:
             # Retrieve context from vector store
-            stored_context = self.retrieve_context(
+            stored_context = self.retrieve_scored_context(
                 context.form_name, "requirements business logic validation", limit=10
             )
 
@@ -126,7 +140,7 @@ class RequirementsGeneratorAgent(BaseAgent[RequirementsGeneratorResult]):
             non_functional_reqs = await self._generate_non_functional_requirements(
                 context, code_files
             )
-            data_reqs = await self._generate_data_requirements(context, code_files)
+            data_reqs = await self._generate_data_requirements(context, code_files, schema)
 
             # Extract rules and integration requirements
             integration_reqs = await self._extract_integration_requirements(context, code_files)
@@ -171,11 +185,18 @@ class RequirementsGeneratorAgent(BaseAgent[RequirementsGeneratorResult]):
             return self.create_error_result(e, timer)
 
     async def _generate_functional_requirements(
-        self, context: AgentContext, code_files: list[CodeFile] | None, stored_context: list[str]
+        self,
+        context: AgentContext,
+        code_files: list[CodeFile] | None,
+        stored_context: list[ContextItem],
     ) -> list[FunctionalRequirement]:
         """Generate functional requirements from code and context."""
-        code_summary = self._build_code_summary(code_files, limit=15)
-        context_summary = self.format_context_for_prompt(stored_context, max_contexts=5)
+        # Code and retrieved context share the prompt's context budget
+        budget = self.context_budget(context) // 2
+        code_summary = self._build_code_summary(context, code_files, max_tokens=budget)
+        context_summary = self.format_context_for_prompt(
+            stored_context, max_contexts=5, max_tokens=budget
+        )
 
         prompt = f"""Based on the code analysis and context for "{context.form_name}", generate functional requirements.
 
@@ -202,7 +223,9 @@ Generate requirements in JSON array format:
 
 Generate 5-15 requirements covering the main functionality."""
 
-        data = extract_json_array(await self.invoke_llm(context, prompt))
+        data = await self.invoke_llm_structured(
+            context, prompt, FunctionalRequirement, many=True
+        )
         return [
             FunctionalRequirement(
                 req_id=r.get("req_id", f"FR-{i:03d}"),
@@ -245,7 +268,9 @@ Generate in JSON array format:
 
 Generate 5-8 key non-functional requirements."""
 
-        data = extract_json_array(await self.invoke_llm(context, prompt))
+        data = await self.invoke_llm_structured(
+            context, prompt, NonFunctionalRequirement, many=True
+        )
         return [
             NonFunctionalRequirement(
                 req_id=r.get("req_id", f"NFR-{i:03d}"),
@@ -259,11 +284,27 @@ Generate 5-8 key non-functional requirements."""
         ]
 
     async def _generate_data_requirements(
-        self, context: AgentContext, code_files: list[CodeFile] | None
+        self,
+        context: AgentContext,
+        code_files: list[CodeFile] | None,
+        schema: SchemaIndex | None = None,
     ) -> list[DataRequirement]:
-        """Generate data model requirements from code analysis."""
+        """
+        Generate data model requirements.
+
+        When DDL was parsed into a schema index, entities, fields, keys and
+        relationships come straight from it and the LLM only writes the
+        descriptions. Otherwise the LLM infers the model from code summaries.
+        """
+        if schema and schema.tables:
+            return await self._data_requirements_from_schema(context, schema)
+
         model_files = self._get_model_files(code_files)
-        model_summary = "\n".join(f"- {cf.path}: {cf.classes}" for cf in model_files[:10])
+        model_summary = "\n".join(
+            self.token_budget.pack_lines(
+                [f"- {cf.path}: {cf.classes}" for cf in model_files], self.context_budget(context)
+            )
+        )
 
         prompt = f"""Based on the data models for "{context.form_name}":
 
@@ -298,17 +339,140 @@ Generate data requirements for the main entities."""
             for r in data
         ]
 
-    def _build_code_summary(self, code_files: list[CodeFile] | None, limit: int = 15) -> str:
-        """Build a summary of code files for prompts."""
+    async def _data_requirements_from_schema(
+        self, context: AgentContext, schema: SchemaIndex
+    ) -> list[DataRequirement]:
+        """Build data requirements from a parsed schema, using the LLM for prose only."""
+        tables = sorted(schema.tables.values(), key=lambda t: t.name.lower())
+        descriptions: dict[str, str] = {}
+
+        for start in range(0, len(tables), SCHEMA_DESCRIPTION_BATCH):
+            batch = tables[start : start + SCHEMA_DESCRIPTION_BATCH]
+            table_lines = "\n".join(
+                f"- {t.name}: {', '.join(c.name for c in t.columns[:15])}" for t in batch
+            )
+            prompt = f"""For the "{context.form_name}" form, write a one-sentence business description of each database table below.
+
+{table_lines}
+
+Return a JSON object mapping each table name to its description:
+{{"TABLE_NAME": "What this table stores and why"}}"""
+
+            try:
+                response = await self.invoke_llm_for_json_object(context, prompt)
+            except Exception as e:
+                self.logger.warning("Table description generation failed", error=str(e))
+                response = {}
+            descriptions.update({str(k).lower(): str(v) for k, v in response.items()})
+
+        return [
+            self._table_to_data_requirement(table, schema, descriptions.get(table.name.lower(), ""))
+            for table in tables
+        ]
+
+    def _table_to_data_requirement(
+        self, table: TableSchema, schema: SchemaIndex, description: str
+    ) -> DataRequirement:
+        """Convert a parsed table into a DataRequirement."""
+        fields = [
+            {
+                "name": column.name,
+                "type": generic_type(column.data_type),
+                "sql_type": column.data_type,
+                "required": "no" if column.nullable else "yes",
+            }
+            for column in table.columns
+        ]
+
+        relationships = [
+            f"References {fk.ref_table} via {', '.join(fk.columns)}"
+            + (f" -> {', '.join(fk.ref_columns)}" if fk.ref_columns else "")
+            for fk in table.foreign_keys
+        ]
+        relationships.extend(
+            f"Referenced by {source} via {', '.join(fk.columns)}"
+            for source, fk in schema.referenced_by(table.name)
+        )
+
+        constraints = []
+        if table.primary_key:
+            constraints.append(f"Primary key on {', '.join(table.primary_key)}")
+        constraints.extend(
+            f"Unique constraint on {column.name}" for column in table.columns if column.unique
+        )
+        constraints.extend(
+            f"Unique constraint on {', '.join(columns)}" for columns in table.unique_constraints
+        )
+        constraints.extend(
+            f"{'Unique index' if index.unique else 'Index'} {index.name} on {', '.join(index.columns)}"
+            for index in table.indexes
+        )
+        constraints.extend(f"Check {check}" for check in table.check_constraints)
+
+        return DataRequirement(
+            entity_name=table.name,
+            description=description or f"Data stored in the {table.name} table",
+            fields=fields,
+            relationships=relationships,
+            constraints=constraints,
+            source_table=table.name,
+        )
+
+    def _build_code_summary(
+        self, context: AgentContext, code_files: list[CodeFile] | None, max_tokens: int
+    ) -> str:
+        """Build a summary of the most relevant code files that fit the token budget."""
         if not code_files:
             return "No code files available for analysis."
 
-        return "\n".join(
-            [
-                f"- {cf.path}: {cf.file_type}, classes: {cf.classes}, methods: {cf.methods[:5]}"
-                for cf in code_files[:limit]
-            ]
-        )
+        distances = self._dependency_distances(context.form_name, code_files)
+        unreached = max(distances.values(), default=0) + 1
+        # Entry files first, then by hops away from them. Lines are kept greedily
+        # in that order rather than by score per token, so many small unrelated
+        # files can never crowd out the form's own files.
+        ranked = sorted(code_files, key=lambda cf: distances.get(cf.path, unreached))
+        lines = []
+        for cf in ranked:
+            methods = ", ".join(cf.methods[:SUMMARY_METHODS_PER_FILE])
+            if len(cf.methods) > SUMMARY_METHODS_PER_FILE:
+                methods += f" (+{len(cf.methods) - SUMMARY_METHODS_PER_FILE} more)"
+            line = f"- {cf.path}: {cf.file_type}, classes: {cf.classes}, methods: {methods}"
+            lines.append(self.token_budget.fit(line, SUMMARY_TOKENS_PER_FILE))
+
+        return "\n".join(self.token_budget.pack_lines(lines, max_tokens))
+
+    def _dependency_distances(self, form_name: str, code_files: list[CodeFile]) -> dict[str, int]:
+        """
+        Hops from the form's entry files (``<form>.java`` / ``<form>.form``) to each file.
+
+        Files reference each other through imports, dependencies and the
+        Java source / .form pair sharing a name; unreachable files are omitted.
+        """
+        owners: dict[str, set[str]] = defaultdict(set)
+        for cf in code_files:
+            owners[Path(cf.path).stem].add(cf.path)
+            for class_name in cf.classes:
+                owners[class_name].add(cf.path)
+
+        def references(cf: CodeFile) -> set[str]:
+            names = {imported.rsplit(".", 1)[-1] for imported in cf.imports}
+            for dependency in cf.dependencies:
+                names.update(re.findall(r"[A-Za-z_]\w*", dependency))
+            names.add(Path(cf.path).stem)
+            return {path for name in names for path in owners.get(name, ())}
+
+        by_path = {cf.path: cf for cf in code_files}
+        frontier = [cf.path for cf in code_files if Path(cf.path).stem.lower() == form_name.lower()]
+        distances = dict.fromkeys(frontier, 0)
+        while frontier:
+            discovered = []
+            for path in frontier:
+                for target in references(by_path[path]):
+                    if target not in distances:
+                        distances[target] = distances[path] + 1
+                        discovered.append(target)
+            frontier = discovered
+        return distances
 
     def _get_model_files(self, code_files: list[CodeFile] | None) -> list[CodeFile]:
         """Extract model/entity files from code files."""
@@ -364,11 +528,19 @@ Format as a simple list."""
         ]
 
     async def _extract_validation_rules(
-        self, context: AgentContext, code_files: list[CodeFile] | None, stored_context: list[str]
+        self,
+        context: AgentContext,
+        code_files: list[CodeFile] | None,
+        stored_context: list[ContextItem],
     ) -> list[str]:
         """Extract validation rules from code and context."""
-        validation_snippets = self._extract_validation_snippets(code_files)
-        context_text = "\n".join(stored_context[:3])
+        budget = self.context_budget(context) // 2
+        validation_snippets = self.token_budget.pack(
+            self._extract_validation_snippets(code_files), budget, max_items=5
+        )
+        context_text = self.format_context_for_prompt(
+            stored_context, max_contexts=3, max_tokens=budget
+        )
 
         prompt = f"""Extract validation rules for "{context.form_name}":
 
@@ -376,7 +548,7 @@ Context:
 {context_text}
 
 Code snippets with validation:
-{" ".join(validation_snippets[:3])}
+{chr(10).join(item.text for item in validation_snippets)}
 
 List all validation rules in the format:
 VR-001: [Field] must [condition]
@@ -399,18 +571,18 @@ VR-002: Amount must be greater than 0"""
             # Check if content is available (may be empty when files are filtered for size)
             if cf.content:
                 if any(kw in cf.content.lower() for kw in keywords):
-                    snippets.append(cf.content[:500])
+                    snippets.append(f"File: {cf.path}\n{self.token_budget.fit(cf.content, 400)}")
             # If content is not available, use method names as hints
             elif any(kw in " ".join(cf.methods).lower() for kw in keywords):
                 snippets.append(
-                    f"File: {cf.path}\nMethods: {', '.join(cf.methods[:5])}\n"
+                    f"File: {cf.path}\nMethods: {', '.join(cf.methods)}\n"
                     f"(Full content not available - check vector store for details)"
                 )
 
         return snippets
 
     async def _extract_business_rules(
-        self, context: AgentContext, stored_context: list[str]
+        self, context: AgentContext, stored_context: list[ContextItem]
     ) -> list[str]:
         """Extract business rules from context."""
         context_text = self.format_context_for_prompt(stored_context, max_contexts=5)
@@ -453,7 +625,9 @@ OUT OF SCOPE:
 - Item 1
 - Item 2"""
 
-        response = await self.invoke_llm(context, prompt)
+        response = await self.invoke_llm(
+            context, prompt, validate=lambda text: any(self._parse_assumptions_response(text))
+        )
         return self._parse_assumptions_response(response)
 
     def _parse_assumptions_response(self, response: str) -> tuple[list[str], list[str]]:
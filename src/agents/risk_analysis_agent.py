@@ -12,7 +12,7 @@ from typing import Any
 from src.agents.base_agent import AgentContext, AgentResult, BaseAgent
 from src.prompts.risk_analysis import RiskAnalysisPrompts
 from src.utils.logging_config import ExecutionTimer
-from src.utils.serialization import extract_json_array
+from src.utils.token_budget import ContextItem
 
 
 class RiskSeverity(Enum):
@@ -81,6 +81,17 @@ class RiskAnalysisResult:
     executive_summary: str
 
 
+@dataclass
+class RiskAnalysisSections:
+    """Secondary sections of a risk analysis, requested in one call."""
+
+    recommended_approach: str
+    dependencies_risks: list[str]
+    technical_debt_items: list[str]
+    success_factors: list[str]
+    executive_summary: str
+
+
 class RiskAnalysisAgent(BaseAgent[RiskAnalysisResult]):
     """
     Agent for analyzing migration risks and developing mitigation strategies.
@@ -123,7 +134,7 @@ class RiskAnalysisAgent(BaseAgent[RiskAnalysisResult]):
 
         try:
             # Retrieve context from vector store
-            stored_context = self.retrieve_context(
+            stored_context = self.retrieve_scored_context(
                 context.form_name, "dependencies complexity integration legacy technical", limit=10
             )
 
@@ -132,20 +143,12 @@ class RiskAnalysisAgent(BaseAgent[RiskAnalysisResult]):
             risk_matrix = self._calculate_risk_matrix(risks)
             top_risks = self._get_top_risks(risks)
 
-            # Assess complexity and approach
+            # Assess complexity
             migration_complexity = self._assess_complexity(risks)
-            recommended_approach = await self._recommend_approach(
-                context, risks, migration_complexity
-            )
-
-            # Identify additional risk factors
-            dependency_risks = await self._identify_dependency_risks(context, stored_context)
-            technical_debt = await self._identify_technical_debt(context, code_analysis)
-            success_factors = await self._identify_success_factors(context, risks)
 
-            # Generate executive summary
-            executive_summary = await self._generate_summary(
-                context, risks, risk_matrix, migration_complexity
+            # Approach, additional risk factors and executive summary
+            sections = await self._generate_sections(
+                context, risks, risk_matrix, migration_complexity, stored_context, code_analysis
             )
 
             result = RiskAnalysisResult(
@@ -154,11 +157,7 @@ class RiskAnalysisAgent(BaseAgent[RiskAnalysisResult]):
                 risk_matrix=risk_matrix,
                 top_risks=top_risks,
                 migration_complexity=migration_complexity,
-                recommended_approach=recommended_approach,
-                dependencies_risks=dependency_risks,
-                technical_debt_items=technical_debt,
-                success_factors=success_factors,
-                executive_summary=executive_summary,
+                **sections,
             )
 
             self.logger.info(
@@ -176,7 +175,10 @@ class RiskAnalysisAgent(BaseAgent[RiskAnalysisResult]):
             return self.create_error_result(e, timer)
 
     async def _identify_risks(
-        self, context: AgentContext, stored_context: list[str], code_analysis: dict[str, Any] | None
+        self,
+        context: AgentContext,
+        stored_context: list[ContextItem],
+        code_analysis: dict[str, Any] | None,
     ) -> list[Risk]:
         """Identify all risks for the migration."""
         context_text = self.format_context_for_prompt(stored_context, max_contexts=5)
@@ -207,7 +209,7 @@ Generate risks in JSON array format:
 
 Identify 8-12 risks across different categories."""
 
-        data = extract_json_array(await self.invoke_llm(context, prompt))
+        data = await self.invoke_llm_structured(context, prompt, Risk, many=True)
 
         if data:
             return [
@@ -228,7 +230,7 @@ Identify 8-12 risks across different categories."""
                 for i, r in enumerate(data, 1)
             ]
 
-        # Return default risk if parsing fails
+        # Return default risk if the model identified none
         return [self._create_default_risk()]
 
     def _format_code_metrics(self, code_analysis: dict[str, Any] | None) -> str:
@@ -236,12 +238,45 @@ Identify 8-12 risks across different categories."""
         if not code_analysis:
             return ""
 
-        return f"""
-Code metrics:
-- Files: {code_analysis.get("file_count", "Unknown")}
-- Languages: {code_analysis.get("languages", "Unknown")}
-- Dependencies: {code_analysis.get("dependencies", [])}
-"""
+        lines = [
+            "",
+            "Code metrics:",
+            f"- Files: {code_analysis.get('file_count', 'Unknown')}",
+            f"- Languages: {', '.join(code_analysis.get('languages', [])) or 'Unknown'}",
+        ]
+
+        metrics = code_analysis.get("metrics")
+        if metrics:
+            lines.extend(
+                [
+                    f"- Lines of code: {metrics['total_loc']} "
+                    f"(comment ratio {metrics['comment_ratio']:.0%})",
+                    f"- Methods: {metrics['method_count']}, cyclomatic complexity "
+                    f"avg {metrics['avg_complexity']} / max {metrics['max_complexity']}",
+                    f"- Duplication: {metrics['duplicated_regions']} duplicated regions "
+                    f"({metrics['duplication_ratio']:.0%} of lines)",
+                ]
+            )
+            if metrics.get("complex_methods"):
+                lines.append(
+                    "- Most complex methods: "
+                    + ", ".join(
+                        f"{m['file']}:{m['method']} (CC {m['complexity']})"
+                        for m in metrics["complex_methods"][:5]
+                    )
+                )
+            if metrics.get("top_fan_in"):
+                lines.append(
+                    "- Most depended-on files: "
+                    + ", ".join(f"{f['file']} ({f['fan_in']})" for f in metrics["top_fan_in"][:5])
+                )
+            if metrics.get("table_touches"):
+                lines.append(
+                    "- Database tables (files touching): "
+                    + ", ".join(f"{t} ({n})" for t, n in list(metrics["table_touches"].items())[:10])
+                )
+
+        return "\n".join(lines) + "\n"
 
     def _create_default_risk(self) -> Risk:
         """Create a default risk when analysis fails."""
@@ -308,6 +343,127 @@ Code metrics:
             return "medium"
             return "low"
 
+    async def _generate_sections(
+        self,
+        context: AgentContext,
+        risks: list[Risk],
+        risk_matrix: RiskMatrix,
+        complexity: str,
+        stored_context: list[ContextItem],
+        code_analysis: dict[str, Any] | None,
+    ) -> dict[str, Any]:
+        """
+        Generate the secondary sections, in one structured call when enabled.
+
+        Sections missing from or invalid in the combined response are
+        generated by their individual calls.
+        """
+        fallbacks = {
+            "recommended_approach": lambda: self._recommend_approach(context, risks, complexity),
+            "dependencies_risks": lambda: self._identify_dependency_risks(context, stored_context),
+            "technical_debt_items": lambda: self._identify_technical_debt(context, code_analysis),
+            "success_factors": lambda: self._identify_success_factors(context, risks),
+            "executive_summary": lambda: self._generate_summary(
+                context, risks, risk_matrix, complexity
+            ),
+        }
+
+        sections: dict[str, Any] = {}
+        metrics = (code_analysis or {}).get("metrics")
+        local_debt = self._technical_debt_from_metrics(metrics) if metrics else []
+        if local_debt:
+            sections["technical_debt_items"] = local_debt
+
+        if self.settings.llm.combined_sections_enabled:
+            exclude = tuple(sections)
+            prompt = self._sections_prompt(
+                context, risks, risk_matrix, complexity, stored_context, code_analysis, exclude
+            )
+            data = await self.invoke_llm_for_sections(
+                context, prompt, RiskAnalysisSections, exclude=exclude
+            )
+            sections.update(self._valid_sections(data))
+
+        return await self.fill_missing_sections(sections, fallbacks)
+
+    def _sections_prompt(
+        self,
+        context: AgentContext,
+        risks: list[Risk],
+        risk_matrix: RiskMatrix,
+        complexity: str,
+        stored_context: list[ContextItem],
+        code_analysis: dict[str, Any] | None,
+        exclude: tuple[str, ...],
+    ) -> str:
+        """Build the prompt requesting all secondary sections at once."""
+        risk_lines = "\n".join(
+            f"- {r.risk_id} {r.title}: {r.severity} ({r.category})" for r in risks[:5]
+        )
+        context_text = self.format_context_for_prompt(stored_context, max_contexts=3)
+        fields = [
+            "- recommended_approach: a 2-paragraph migration approach (big bang vs phased, "
+            "strangler pattern, parallel running, data migration and rollback strategy)",
+            "- dependencies_risks: specific dependency-related risk statements (external "
+            "systems, libraries and frameworks, data, timing, circular dependencies)",
+        ]
+        metrics_text = ""
+        if "technical_debt_items" not in exclude:
+            fields.append(
+                "- technical_debt_items: technical debt to address during migration (code "
+                "quality, missing documentation, hardcoded values, deprecated technologies, "
+                "security, performance, test gaps), each with a brief description"
+            )
+            metrics_text = self._format_code_metrics(code_analysis)
+        fields.extend(
+            [
+                "- success_factors: 5-8 critical success factors of the migration",
+                "- executive_summary: a 2-3 paragraph executive summary for senior stakeholders",
+            ]
+        )
+
+        return f"""Complete the risk analysis for "{context.form_name}" migration.
+
+Risk Matrix:
+- Critical risks: {risk_matrix.critical_count}
+- High risks: {risk_matrix.high_count}
+- Medium risks: {risk_matrix.medium_count}
+- Low risks: {risk_matrix.low_count}
+- Overall risk score: {risk_matrix.risk_score}/100
+
+Migration complexity: {complexity}
+Risk areas: {", ".join({r.category for r in risks})}
+
+Top risks:
+{risk_lines}
+
+Dependency context:
+{context_text}
+{metrics_text}
+Return a JSON object with:
+{chr(10).join(fields)}"""
+
+    def _valid_sections(self, data: dict[str, Any]) -> dict[str, Any]:
+        """Keep the sections of a combined response that pass validation."""
+        sections: dict[str, Any] = {}
+        for name in ("recommended_approach", "executive_summary"):
+            text = data.get(name)
+            if isinstance(text, str) and len(text.strip()) > 50:
+                sections[name] = text.strip()
+
+        limits = {"dependencies_risks": 10, "technical_debt_items": 10, "success_factors": 8}
+        for name, limit in limits.items():
+            items = data.get(name)
+            if isinstance(items, list):
+                cleaned = self._clean_items([str(item).strip() for item in items], limit)
+                if cleaned:
+                    sections[name] = cleaned
+        return sections
+
+    def _clean_items(self, items: list[str], limit: int) -> list[str]:
+        """Keep specific items (more than a few words) up to a limit."""
+        return [item for item in items if len(item) > 10][:limit]
+
     async def _recommend_approach(
         self, context: AgentContext, risks: list[Risk], complexity: str
     ) -> str:
@@ -331,7 +487,7 @@ Provide a 2-paragraph recommendation."""
         return await self.invoke_llm(context, prompt)
 
     async def _identify_dependency_risks(
-        self, context: AgentContext, stored_context: list[str]
+        self, context: AgentContext, stored_context: list[ContextItem]
     ) -> list[str]:
         """Identify risks related to dependencies."""
         context_text = self.format_context_for_prompt(stored_context, max_contexts=3)
@@ -350,14 +506,20 @@ Consider:
 List each as a specific risk statement."""
 
         items = await self.invoke_llm_for_list(context, prompt)
-        return [item for item in items if len(item) > 10][:10]
+        return self._clean_items(items, 10)
 
     async def _identify_technical_debt(
         self, context: AgentContext, code_analysis: dict[str, Any] | None
     ) -> list[str]:
-        """Identify technical debt items."""
-        prompt = f"""For migrating "{context.form_name}", list technical debt items that should be addressed:
+        """Identify technical debt items, from local code metrics when available."""
+        metrics = (code_analysis or {}).get("metrics")
+        if metrics:
+            items = self._technical_debt_from_metrics(metrics)
+            if items:
+                return items
 
+        prompt = f"""For migrating "{context.form_name}", list technical debt items that should be addressed:
+{self._format_code_metrics(code_analysis)}
 Consider:
 - Code quality issues
 - Missing documentation
@@ -370,7 +532,49 @@ Consider:
 List each item with a brief description."""
 
         items = await self.invoke_llm_for_list(context, prompt)
-        return [item for item in items if len(item) > 10][:10]
+        return self._clean_items(items, 10)
+
+    def _technical_debt_from_metrics(self, metrics: dict[str, Any]) -> list[str]:
+        """Derive technical debt items deterministically from code metrics."""
+        items: list[str] = []
+
+        for method in metrics.get("complex_methods", [])[:4]:
+            items.append(
+                f"High cyclomatic complexity in {method['file']}:{method['method']} "
+                f"(CC {method['complexity']}, {method['lines']} lines) - "
+                "decompose and cover with characterization tests before migrating"
+            )
+
+        undocumented = metrics.get("undocumented_files", [])
+        if undocumented:
+            names = ", ".join(f["file"] for f in undocumented[:3])
+            items.append(
+                f"Missing documentation: {len(undocumented)} large files have under 5% "
+                f"comments (e.g. {names}) - business rules must be recovered from code"
+            )
+
+        if metrics.get("duplicated_regions"):
+            items.append(
+                f"Duplicated code: {metrics['duplicated_regions']} duplicated regions covering "
+                f"{metrics['duplicated_lines']} lines ({metrics['duplication_ratio']:.0%}) - "
+                "consolidate into shared services in the target system"
+            )
+
+        for hub in metrics.get("top_fan_in", [])[:2]:
+            if hub["fan_in"] >= 5:
+                items.append(
+                    f"Coupling hot spot: {hub['file']} is imported by {hub['fan_in']} files - "
+                    "changes ripple widely; migrate behind a stable interface"
+                )
+
+        shared_tables = [t for t, n in metrics.get("table_touches", {}).items() if n >= 3]
+        if shared_tables:
+            items.append(
+                f"Shared database tables accessed from many files: {', '.join(shared_tables[:5])} "
+                "- centralize data access before splitting modules"
+            )
+
+        return items[:10]
 
     async def _identify_success_factors(
         self, context: AgentContext, risks: list[Risk]
@@ -385,7 +589,7 @@ Risk areas to address: {risk_categories}
 List 5-8 critical success factors that will determine project success."""
 
         items = await self.invoke_llm_for_list(context, prompt)
-        return [item for item in items if len(item) > 10][:8]
+        return self._clean_items(items, 8)
 
     async def _generate_summary(
         self, context: AgentContext, risks: list[Risk], risk_matrix: RiskMatrix, complexity: str
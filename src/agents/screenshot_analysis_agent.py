@@ -9,9 +9,19 @@ from dataclasses import dataclass, field
 from typing import Any
 
 from src.agents.base_agent import AgentContext, AgentResult, BaseAgent
+from src.extractors.form_parser import FormDefinition, FormInventory
 from src.extractors.minio_extractor import MinioExtractor, Screenshot
+from src.extractors.screenshot_ocr import ScreenshotOCR, ScreenshotText
 from src.prompts.screenshot_analysis import ScreenshotAnalysisPrompts
+from src.utils.image_processing import (
+    ImagePreprocessor,
+    cluster_by_hash,
+    difference_hash,
+    estimate_image_tokens,
+    summarize_image_stats,
+)
 from src.utils.logging_config import ExecutionTimer
+from src.utils.model_routing import VISION_TIER
 
 
 @dataclass
@@ -38,6 +48,8 @@ class ScreenAnalysis:
     data_displayed: list[str]
     validation_rules: list[str]
     accessibility_notes: list[str]
+    # Object names of the screenshots this analysis covers (near-duplicates share one)
+    screenshots: list[str] = field(default_factory=list)
 
 
 @dataclass
@@ -51,6 +63,8 @@ class ScreenshotAnalysisResult:
     common_patterns: list[str]
     component_inventory: dict[str, int]
     recommendations: list[str]
+    vision_calls_skipped: int = 0
+    text_only_screens: int = 0
 
 
 class ScreenshotAnalysisAgent(BaseAgent[ScreenshotAnalysisResult]):
@@ -59,25 +73,26 @@ class ScreenshotAnalysisAgent(BaseAgent[ScreenshotAnalysisResult]):
     Extracts UI components, layout information, and user interaction patterns.
     """
     
+    # Calls go to the vision-capable model tier
+    default_tier = VISION_TIER
+
     def __init__(self) -> None:
         """Initialize the screenshot analysis agent."""
         super().__init__("ScreenshotAnalysisAgent")
         self.minio_extractor = MinioExtractor()
-        # Override LLM to use vision-capable model
-        from langchain_openai import ChatOpenAI
-
-        from src.config.settings import get_settings
-
-        settings = get_settings()
-        # Use configured model if it supports vision, otherwise default to gpt-4o
-        vision_model = settings.openai.model if "gpt-4o" in settings.openai.model else "gpt-4o"
-        self._llm = ChatOpenAI(
-            model=vision_model,
-            openai_api_key=settings.openai.api_key,
-            temperature=settings.openai.temperature,
-            max_tokens=settings.openai.max_tokens,
-        )
+        self.image_preprocessor = ImagePreprocessor()
+        self._ocr: ScreenshotOCR | None = None
+        self._image_stats: list[dict[str, Any]] = []
+        self._vision_calls_skipped = 0
+        self._text_only_screens = 0
     
+    @property
+    def ocr(self) -> ScreenshotOCR:
+        """Get or create the OCR stage."""
+        if self._ocr is None:
+            self._ocr = ScreenshotOCR()
+        return self._ocr
+
     def get_system_prompt(self, context: AgentContext) -> str:
         """Get the system prompt for screenshot analysis."""
         return ScreenshotAnalysisPrompts.system_prompt(context.form_name)
@@ -87,15 +102,21 @@ class ScreenshotAnalysisAgent(BaseAgent[ScreenshotAnalysisResult]):
         context: AgentContext,
         screenshots: list[Screenshot] | None = None,
         bucket: str | None = None,
+        form_inventory: dict[str, Any] | None = None,
         **kwargs: Any,
     ) -> AgentResult[ScreenshotAnalysisResult]:
         """
         Analyze screenshots for a form.
         
+        Components declared in parsed ``.form`` definitions are taken as-is,
+        so vision calls only need to cover what the XML cannot describe.
+        Without screenshots the analysis is built from the inventory alone.
+
         Args:
             context: Agent execution context
             screenshots: Optional pre-loaded screenshots
             bucket: Optional Minio bucket name
+            form_inventory: Optional serialized FormInventory from the code extraction
             
         Returns:
             AgentResult with ScreenshotAnalysisResult
@@ -106,24 +127,36 @@ class ScreenshotAnalysisAgent(BaseAgent[ScreenshotAnalysisResult]):
             "Starting screenshot analysis",
             form_name=context.form_name,
             screenshots_provided=screenshots is not None,
+            has_form_inventory=bool(form_inventory),
         )
         
+        self._image_stats = []
+        self._vision_calls_skipped = 0
+        self._text_only_screens = 0
+
         try:
+            inventory = FormInventory.from_dict(form_inventory)
+
             # Get screenshots if not provided
             if screenshots is None:
                 screenshots = self.minio_extractor.get_form_screenshots(
                     form_name=context.form_name, bucket=bucket
                 )
             
-            if not screenshots:
+            if not screenshots and not inventory.forms:
                 return self.create_error_result(
                     f"No screenshots found for form: {context.form_name}", timer
                 )
             
+            # Screens declared in .form files need no vision calls
+            screen_analyses = [self._screen_from_form(form) for form in inventory.forms]
+
             # Analyze each screenshot and build component inventory
-            screen_analyses, component_inventory = await self._analyze_all_screenshots(
-                context, screenshots
+            vision_analyses, _ = await self._analyze_all_screenshots(
+                context, screenshots or [], inventory
             )
+            screen_analyses.extend(vision_analyses)
+            component_inventory = self._count_components(screen_analyses)
             
             # Generate overall analysis
             ui_flow_summary = await self._generate_flow_summary(context, screen_analyses)
@@ -134,55 +167,253 @@ class ScreenshotAnalysisAgent(BaseAgent[ScreenshotAnalysisResult]):
             
             result = ScreenshotAnalysisResult(
                 form_name=context.form_name,
-                total_screens=len(screenshots),
+                total_screens=len(screenshots or []) or len(inventory.forms),
                 screen_analyses=screen_analyses,
                 ui_flow_summary=ui_flow_summary,
                 common_patterns=common_patterns,
                 component_inventory=component_inventory,
                 recommendations=recommendations,
+                vision_calls_skipped=self._vision_calls_skipped,
+                text_only_screens=self._text_only_screens,
             )
             
+            image_summary = summarize_image_stats(self._image_stats)
             self.logger.info(
                 "Screenshot analysis complete",
                 form_name=context.form_name,
                 screens_analyzed=len(screen_analyses),
+                screens_from_forms=len(inventory.forms),
                 components_found=sum(component_inventory.values()),
+                image_tokens_before=image_summary["original_tokens"],
+                image_tokens_after=image_summary["processed_tokens"],
+                vision_calls_skipped=self._vision_calls_skipped,
+                text_only_screens=self._text_only_screens,
                 duration_ms=timer.elapsed_ms(),
             )
             
-            return self.create_success_result(result, timer)
+            return self.create_success_result(
+                result, timer, image_stats=self._image_stats, image_summary=image_summary
+            )
             
         except Exception as e:
             return self.create_error_result(e, timer)
 
     async def _analyze_all_screenshots(
-        self, context: AgentContext, screenshots: list[Screenshot]
+        self,
+        context: AgentContext,
+        screenshots: list[Screenshot],
+        inventory: FormInventory | None = None,
     ) -> tuple[list[ScreenAnalysis], dict[str, int]]:
-        """Analyze all screenshots and build component inventory."""
+        """
+        Analyze all screenshots and build component inventory.
+
+        Near-identical screenshots (same screen, different data) are clustered
+        by perceptual hash; only one representative per cluster gets a vision
+        call and its analysis covers the whole cluster. OCR text of each
+        representative grounds its prompt.
+        """
         screen_analyses: list[ScreenAnalysis] = []
-        component_inventory: dict[str, int] = {}
+        known = self._known_components(inventory)
+        clusters = self._cluster_screenshots(screenshots)
+        texts = self.ocr.extract([cluster[0] for cluster in clusters])
 
-        for screenshot in screenshots:
-            analysis = await self._analyze_single_screenshot(context, screenshot)
+        for cluster in clusters:
+            representative = cluster[0]
+            analysis = await self._analyze_single_screenshot(
+                context, representative, known, texts.get(representative.object_name)
+            )
             if analysis:
+                # Components already taken from the form definition are not counted twice
+                analysis.ui_elements = [
+                    e for e in analysis.ui_elements if (e.element_type, e.label.lower()) not in known
+                ]
+                analysis.screenshots = [s.object_name for s in cluster]
                 screen_analyses.append(analysis)
-                for element in analysis.ui_elements:
-                    component_inventory[element.element_type] = (
-                        component_inventory.get(element.element_type, 0) + 1
-                    )
+            self._vision_calls_skipped += len(cluster) - 1
+
+        return screen_analyses, self._count_components(screen_analyses)
+
+    def _cluster_screenshots(self, screenshots: list[Screenshot]) -> list[list[Screenshot]]:
+        """Group near-duplicate screenshots by dHash Hamming distance."""
+        threshold = self.settings.vision.dedup_threshold
+        if threshold < 0 or len(screenshots) < 2:
+            return [[s] for s in screenshots]
+
+        hashes: list[int | None] = []
+        for screenshot in screenshots:
+            try:
+                hashes.append(difference_hash(screenshot.image_data))
+            except Exception as e:
+                self.logger.debug(
+                    "Could not hash screenshot", screenshot=screenshot.object_name, error=str(e)
+                )
+                hashes.append(None)
+
+        clusters = [[screenshots[i] for i in c] for c in cluster_by_hash(hashes, threshold)]
+        self.logger.info(
+            "Clustered near-duplicate screenshots",
+            screenshots=len(screenshots),
+            clusters=len(clusters),
+        )
+        return clusters
+
+    def _count_components(self, analyses: list[ScreenAnalysis]) -> dict[str, int]:
+        """Count UI elements by type across screens."""
+        component_inventory: dict[str, int] = {}
+        for analysis in analyses:
+            for element in analysis.ui_elements:
+                component_inventory[element.element_type] = (
+                    component_inventory.get(element.element_type, 0) + 1
+                )
+        return component_inventory
 
-        return screen_analyses, component_inventory
+    def _known_components(self, inventory: FormInventory | None) -> set[tuple[str, str]]:
+        """(element type, lowercase label) pairs declared in form definitions."""
+        if not inventory:
+            return set()
+        return {
+            (component.element_type, component.label.lower())
+            for form in inventory.forms
+            for component in form.components
+            if component.label
+        }
+
+    def _screen_from_form(self, form: FormDefinition) -> ScreenAnalysis:
+        """Build a screen analysis directly from a parsed form definition."""
+        by_name = {c.name: c for c in form.components}
+        ui_elements: list[UIElement] = []
+        user_actions: list[str] = []
+        data_displayed: list[str] = []
+        validation_rules: list[str] = []
+        accessibility_notes: list[str] = []
+
+        for component in form.components:
+            label = component.label or component.name
+            parent = by_name.get(component.parent or "")
+            ui_elements.append(
+                UIElement(
+                    element_type=component.element_type,
+                    label=label,
+                    description=f"{component.component_class.rsplit('.', 1)[-1]} {component.name}",
+                    location=f"in {parent.label or parent.name}" if parent else "top level",
+                    interactions=sorted(component.events),
+                )
+            )
+            user_actions.extend(
+                f"{event} on {label} ({handler})" for event, handler in component.events.items()
+            )
+            if component.element_type in ("table", "list") and component.options:
+                data_displayed.append(f"{label}: {', '.join(component.options)}")
+            elif component.element_type in ("input", "textarea", "dropdown"):
+                data_displayed.append(label)
+
+            constraints = component.constraints
+            if constraints.get("editable") == "false" or constraints.get("enabled") == "false":
+                validation_rules.append(f"{label} is read-only")
+            if "columns" in constraints:
+                validation_rules.append(f"{label} is sized for {constraints['columns']} characters")
+            if "minimum" in constraints or "maximum" in constraints:
+                validation_rules.append(
+                    f"{label} range: {constraints.get('minimum', '-')} to "
+                    f"{constraints.get('maximum', '-')}"
+                )
+            if component.element_type == "dropdown" and component.options:
+                validation_rules.append(f"{label} allowed values: {', '.join(component.options)}")
+            if component.element_type in ("input", "textarea") and not component.label:
+                accessibility_notes.append(f"{component.name} has no associated label")
+
+        containers = [c for c in form.components if c.layout]
+        layout_description = f"{form.layout or 'Unknown'} layout" + (
+            "; containers: "
+            + ", ".join(f"{c.label or c.name} ({c.layout})" for c in containers)
+            if containers
+            else ""
+        )
+
+        return ScreenAnalysis(
+            screen_name=form.screen_name,
+            screen_type=form.form_type,
+            purpose=f"Declared in {form.source_file}",
+            ui_elements=ui_elements,
+            layout_description=layout_description,
+            user_actions=user_actions,
+            data_displayed=data_displayed,
+            validation_rules=validation_rules,
+            accessibility_notes=accessibility_notes,
+        )
     
     async def _analyze_single_screenshot(
-        self, context: AgentContext, screenshot: Screenshot
+        self,
+        context: AgentContext,
+        screenshot: Screenshot,
+        known_components: set[tuple[str, str]] | None = None,
+        ocr_text: ScreenshotText | None = None,
     ) -> ScreenAnalysis | None:
-        """Analyze a single screenshot."""
+        """
+        Analyze a single screenshot.
+
+        Screens that are almost entirely text are analyzed from their OCR text
+        without an image. Otherwise OCR text grounds the prompt and the image is
+        sent at low detail.
+        """
         try:
-            # Convert image to base64
-            image_b64 = self.minio_extractor.get_image_base64(screenshot)
+            text_only = self.ocr.is_text_only(ocr_text)
+            images = []
+            if text_only:
+                self._text_only_screens += 1
+            else:
+                # Crop, downscale and re-encode; cached by the source object's ETag
+                prepared = self.image_preprocessor.prepare(
+                    screenshot.image_data,
+                    mime_type=screenshot.content_type,
+                    cache_id=(screenshot.bucket, screenshot.object_name, screenshot.etag),
+                )
+                if ocr_text and ocr_text.lines:
+                    # Text is read locally, so the model only needs the layout
+                    prepared.image.detail = "low"
+                    prepared.processed_tokens = estimate_image_tokens(
+                        *prepared.processed_size, detail="low"
+                    )
+                images.append(prepared.image)
+                self._image_stats.append(
+                    {"object_name": screenshot.object_name, **prepared.stats()}
+                )
+                self.logger.debug(
+                    "Prepared screenshot for vision",
+                    screenshot=screenshot.object_name,
+                    bytes_before=prepared.original_bytes,
+                    bytes_after=prepared.processed_bytes,
+                    tokens_before=prepared.original_tokens,
+                    tokens_after=prepared.processed_tokens,
+                    detail=prepared.image.detail,
+                )
             
-            prompt = f"""Analyze this screenshot from the "{context.form_name}" application.
+            known_section = ""
+            if known_components:
+                known_list = ", ".join(
+                    f"{label} ({element_type})" for element_type, label in sorted(known_components)
+                )
+                known_section = f"""
+These components are already known from the form definition: {known_list}.
+Do not list them in ui_elements; focus on layout, data shown, visual cues
+and anything the form definition cannot describe.
+"""
 
+            ocr_section = ""
+            if ocr_text and ocr_text.lines:
+                ocr_section = f"""
+Text read from the screen by OCR, with pixel positions on a \
+{ocr_text.width}x{ocr_text.height} image:
+{ocr_text.format_for_prompt()}
+"""
+
+            subject = (
+                "the screen whose text is listed below (no image is attached)"
+                if text_only
+                else "this screenshot"
+            )
+            prompt = f"""Analyze {subject} from the "{context.form_name}" application.
+{ocr_section}{known_section}
 Provide a detailed analysis in the following JSON structure:
 {{
     "screen_name": "Name for this screen",
@@ -206,17 +437,15 @@ Provide a detailed analysis in the following JSON structure:
 
 Be thorough in identifying all UI elements."""
 
-            response = await self.invoke_llm(context, prompt, images=[image_b64])
-            
-            # Parse the response
-            import json
-            import re
-            
-            # Extract JSON from response
-            json_match = re.search(r"\{[\s\S]*\}", response)
-            if json_match:
-                data = json.loads(json_match.group())
-                
+            # The response is constrained to the ScreenAnalysis schema
+            data = await self.invoke_llm_structured(
+                context,
+                prompt,
+                ScreenAnalysis,
+                images=images or None,
+                exclude=("screenshots",),
+            )
+            if data:
                 ui_elements = [
                     UIElement(
                         element_type=elem.get("element_type", "unknown"),
@@ -5,13 +5,14 @@ Analyzes screenshots and code to generate comprehensive user flow documentation
 including user journeys, entry/exit points, and flow diagrams.
 """
 
+import re
 from dataclasses import dataclass
 from typing import Any
 
 from src.agents.base_agent import AgentContext, AgentResult, BaseAgent
 from src.prompts.user_flow import UserFlowPrompts
 from src.utils.logging_config import ExecutionTimer
-from src.utils.serialization import extract_json_array
+from src.utils.token_budget import ContextItem
 
 
 @dataclass
@@ -56,6 +57,24 @@ class UserFlowResult:
     flow_diagram_mermaid: str
 
 
+@dataclass
+class UserFlowContextSections:
+    """Actors, flow boundaries and cross-module flows, requested in one call."""
+
+    primary_actors: list[str]
+    entry_points: list[str]
+    exit_points: list[str]
+    cross_module_flows: list[str]
+
+
+@dataclass
+class UserFlowNarrativeSections:
+    """Journey map and flow diagram, requested in one call."""
+
+    user_journey_map: str
+    flow_diagram_mermaid: str
+
+
 class UserFlowAgent(BaseAgent[UserFlowResult]):
     """
     Agent for analyzing user flows and journeys from screenshots and code.
@@ -98,23 +117,22 @@ class UserFlowAgent(BaseAgent[UserFlowResult]):
 
         try:
             # Retrieve context from vector store
-            stored_context = self.retrieve_context(
+            stored_context = self.retrieve_scored_context(
                 context.form_name, "user flow workflow steps actions screens", limit=10
             )
 
-            # Identify actors and boundaries
-            primary_actors = await self._identify_actors(context, stored_context)
-            entry_points, exit_points = await self._identify_flow_boundaries(
-                context, screenshot_analysis
+            # Identify actors, boundaries and cross-module flows
+            sections = await self._generate_context_sections(
+                context, stored_context, screenshot_analysis
             )
+            primary_actors = sections["primary_actors"]
+            entry_points, exit_points = sections["flow_boundaries"]
 
-            # Generate flows and analysis
+            # Generate flows, then the journey map and diagram describing them
             user_flows = await self._generate_user_flows(
                 context, primary_actors, entry_points, stored_context
             )
-            cross_module_flows = await self._identify_cross_module_flows(context, stored_context)
-            journey_map = await self._generate_journey_map(context, user_flows)
-            flow_diagram = await self._generate_flow_diagram(context, user_flows)
+            narrative = await self._generate_narrative_sections(context, user_flows)
 
             result = UserFlowResult(
                 form_name=context.form_name,
@@ -122,9 +140,9 @@ class UserFlowAgent(BaseAgent[UserFlowResult]):
                 primary_actors=primary_actors,
                 entry_points=entry_points,
                 exit_points=exit_points,
-                cross_module_flows=cross_module_flows,
-                user_journey_map=journey_map,
-                flow_diagram_mermaid=flow_diagram,
+                cross_module_flows=sections["cross_module_flows"],
+                user_journey_map=narrative["user_journey_map"],
+                flow_diagram_mermaid=narrative["flow_diagram_mermaid"],
             )
 
             self.logger.info(
@@ -140,7 +158,103 @@ class UserFlowAgent(BaseAgent[UserFlowResult]):
         except Exception as e:
             return self.create_error_result(e, timer)
 
-    async def _identify_actors(self, context: AgentContext, stored_context: list[str]) -> list[str]:
+    async def _generate_context_sections(
+        self,
+        context: AgentContext,
+        stored_context: list[ContextItem],
+        screenshot_analysis: dict[str, Any] | None,
+    ) -> dict[str, Any]:
+        """
+        Identify actors, boundaries and cross-module flows, in one call when enabled.
+
+        Sections missing from or invalid in the combined response are
+        generated by their individual calls. Entry and exit points form
+        one ``flow_boundaries`` section.
+        """
+        fallbacks = {
+            "primary_actors": lambda: self._identify_actors(context, stored_context),
+            "flow_boundaries": lambda: self._identify_flow_boundaries(
+                context, screenshot_analysis
+            ),
+            "cross_module_flows": lambda: self._identify_cross_module_flows(
+                context, stored_context
+            ),
+        }
+
+        sections: dict[str, Any] = {}
+        if self.settings.llm.combined_sections_enabled:
+            context_text = self.format_context_for_prompt(stored_context, max_contexts=5)
+            prompt = f"""For the "{context.form_name}" module, based on this context:
+
+{context_text}
+
+Return a JSON object with:
+- primary_actors: user types who interact with this module (primary users, reviewers \
+and approvers, administrators, system actors), each as "Name: brief description"
+- entry_points: how users access this module (menu items, links from other modules, \
+direct URLs, system triggers)
+- exit_points: how users leave this module (save and close, navigation to other modules, \
+logout/timeout, cancel)
+- cross_module_flows: workflows spanning modules, each as \
+"[Module A] -> [Module B]: Description"; empty if there are none"""
+
+            data = await self.invoke_llm_for_sections(context, prompt, UserFlowContextSections)
+            actors = self._actor_names(data.get("primary_actors") or [])
+            if actors:
+                sections["primary_actors"] = actors
+            entry_points, exit_points = data.get("entry_points"), data.get("exit_points")
+            if entry_points and exit_points:
+                sections["flow_boundaries"] = (entry_points, exit_points)
+            if isinstance(data.get("cross_module_flows"), list):
+                sections["cross_module_flows"] = self._cross_module_items(
+                    data["cross_module_flows"]
+                )
+
+        return await self.fill_missing_sections(sections, fallbacks)
+
+    async def _generate_narrative_sections(
+        self, context: AgentContext, user_flows: list[UserFlow]
+    ) -> dict[str, Any]:
+        """Generate the journey map and flow diagram, in one call when enabled."""
+        fallbacks = {
+            "user_journey_map": lambda: self._generate_journey_map(context, user_flows),
+            "flow_diagram_mermaid": lambda: self._generate_flow_diagram(context, user_flows),
+        }
+
+        sections: dict[str, Any] = {}
+        if self.settings.llm.combined_sections_enabled and user_flows:
+            main_flow = user_flows[0]
+            flow_summaries = "\n".join(
+                f"- {f.name}: {len(f.steps)} steps, {f.estimated_time}" for f in user_flows
+            )
+            steps_text = "\n".join(f"{s.step_number}. {s.action}" for s in main_flow.steps)
+            prompt = f"""For "{context.form_name}", based on these user flows:
+
+{flow_summaries}
+
+Steps of "{main_flow.name}":
+{steps_text}
+
+Return a JSON object with:
+- user_journey_map: a 3-4 paragraph narrative journey map (the user's goal when entering \
+the module, key touchpoints and interactions, emotional states at each stage, opportunities \
+for improvement in the modernized version)
+- flow_diagram_mermaid: a valid Mermaid flowchart of "{main_flow.name}" starting with \
+"flowchart TD", including decision points where there are alternative paths"""
+
+            data = await self.invoke_llm_for_sections(context, prompt, UserFlowNarrativeSections)
+            journey_map = data.get("user_journey_map")
+            if isinstance(journey_map, str) and len(journey_map.strip()) > 50:
+                sections["user_journey_map"] = journey_map.strip()
+            diagram = self._find_mermaid_diagram(str(data.get("flow_diagram_mermaid") or ""))
+            if diagram:
+                sections["flow_diagram_mermaid"] = diagram
+
+        return await self.fill_missing_sections(sections, fallbacks)
+
+    async def _identify_actors(
+        self, context: AgentContext, stored_context: list[ContextItem]
+    ) -> list[str]:
         """Identify user types who interact with this module."""
         context_text = self.format_context_for_prompt(stored_context, max_contexts=5)
 
@@ -158,16 +272,17 @@ Consider:
 List each actor with a brief description."""
 
         items = await self.invoke_llm_for_list(context, prompt)
+        actors = self._actor_names(items)
+        return actors if actors else ["Standard User", "Administrator"]
 
-        # Extract just the actor name (before any colon description)
-        actors = [
+    def _actor_names(self, items: list[str]) -> list[str]:
+        """Extract just the actor names (before any colon description)."""
+        return [
             item.split(":")[0].strip()
             for item in items
             if item and len(item.split(":")[0].strip()) < 50
         ]
 
-        return actors if actors else ["Standard User", "Administrator"]
-
     async def _identify_flow_boundaries(
         self, context: AgentContext, screenshot_analysis: dict[str, Any] | None
     ) -> tuple[list[str], list[str]]:
@@ -195,7 +310,9 @@ EXIT POINTS:
 - Exit point 1
 - Exit point 2"""
 
-        response = await self.invoke_llm(context, prompt)
+        response = await self.invoke_llm(
+            context, prompt, validate=lambda text: "ENTRY" in text.upper() and "EXIT" in text.upper()
+        )
 
         entry_points: list[str] = []
         exit_points: list[str] = []
@@ -221,7 +338,7 @@ EXIT POINTS:
         context: AgentContext,
         actors: list[str],
         entry_points: list[str],
-        stored_context: list[str],
+        stored_context: list[ContextItem],
     ) -> list[UserFlow]:
         """Generate detailed user flows."""
         context_text = self.format_context_for_prompt(stored_context, max_contexts=5)
@@ -264,7 +381,7 @@ Include:
 2. Search/filter flow
 3. Approval/workflow (if applicable)"""
 
-        data = extract_json_array(await self.invoke_llm(context, prompt))
+        data = await self.invoke_llm_structured(context, prompt, UserFlow, many=True)
         default_actor = actors[0] if actors else "User"
 
         return [
@@ -302,7 +419,7 @@ Include:
         )
 
     async def _identify_cross_module_flows(
-        self, context: AgentContext, stored_context: list[str]
+        self, context: AgentContext, stored_context: list[ContextItem]
     ) -> list[str]:
         """Identify flows that span multiple modules."""
         context_text = self.format_context_for_prompt(stored_context, max_contexts=5)
@@ -319,6 +436,10 @@ List workflows that:
 Format: [Module A] -> [Module B]: Description"""
 
         items = await self.invoke_llm_for_list(context, prompt)
+        return self._cross_module_items(items)
+
+    def _cross_module_items(self, items: list[str]) -> list[str]:
+        """Keep items that describe a flow between modules."""
         return [item for item in items if "->" in item or "→" in item]
 
     async def _generate_journey_map(self, context: AgentContext, user_flows: list[UserFlow]) -> str:
@@ -373,8 +494,18 @@ Include decision points where there are alternative paths."""
 
     def _extract_mermaid_diagram(self, response: str, flow: UserFlow) -> str:
         """Extract Mermaid diagram from LLM response."""
-        import re
+        diagram = self._find_mermaid_diagram(response)
+        if diagram:
+            return diagram
+
+        # Return basic diagram as fallback
+        first_action = flow.steps[0].action if flow.steps else "Process"
+        return f"""flowchart TD
+    A[Start: {flow.name}] --> B[{first_action}]
+    B --> C[End]"""
 
+    def _find_mermaid_diagram(self, response: str) -> str | None:
+        """Find a Mermaid flowchart in a response, or None."""
         # Try to find mermaid code block
         mermaid_match = re.search(r"```mermaid\s*([\s\S]*?)```", response)
         if mermaid_match:
@@ -385,8 +516,4 @@ Include decision points where there are alternative paths."""
         if flowchart_match:
             return flowchart_match.group(1).strip()
 
-        # Return basic diagram as fallback
-        first_action = flow.steps[0].action if flow.steps else "Process"
-        return f"""flowchart TD
-    A[Start: {flow.name}] --> B[{first_action}]
-    B --> C[End]"""
+        return None
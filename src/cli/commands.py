@@ -55,10 +55,18 @@ def generate(
     dependency_file: str | None = typer.Option(
         None, "--dependency-file", "-d", help="Path to dependency file with file paths to include"
     ),
+    dependency_depth: int | None = typer.Option(
+        None,
+        "--dependency-depth",
+        help="Depth of the automatic dependency closure when no dependency file is given",
+    ),
     minio_bucket: str | None = typer.Option(
         None, "--bucket", "-b", help="Minio bucket for screenshots"
     ),
     jira_project: str | None = typer.Option(None, "--jira-project", "-j", help="Jira project key"),
+    jira_export: str | None = typer.Option(
+        None, "--jira-export", help="Jira XML/JSON export to read instead of the Jira API"
+    ),
     output_dir: str = typer.Option("./output", "--output", "-o", help="Output directory for PRD"),
     skip_screenshots: bool = typer.Option(
         False, "--skip-screenshots", help="Skip screenshot analysis"
@@ -99,8 +107,10 @@ def generate(
                 code_dir=code_dir,
                 file_mappings=mappings_list,
                 dependency_file=dependency_file,
+                dependency_depth=dependency_depth,
                 minio_bucket=minio_bucket,
                 jira_project=jira_project,
+                jira_export=jira_export,
                 output_dir=output_dir,
                 skip_screenshots=skip_screenshots,
                 skip_jira=skip_jira,
@@ -115,8 +125,10 @@ def generate(
                 code_dir=code_dir,
                 file_mappings=mappings_list,
                 dependency_file=dependency_file,
+                dependency_depth=dependency_depth,
                 minio_bucket=minio_bucket,
                 jira_project=jira_project,
+                jira_export=jira_export,
                 output_dir=output_dir,
                 skip_screenshots=skip_screenshots,
                 skip_jira=skip_jira,
@@ -131,8 +143,10 @@ async def _run_workflow_generation(
     code_dir: str | None,
     file_mappings: list[str] | None,
     dependency_file: str | None,
+    dependency_depth: int | None,
     minio_bucket: str | None,
     jira_project: str | None,
+    jira_export: str | None,
     output_dir: str,
     skip_screenshots: bool,
     skip_jira: bool,
@@ -161,8 +175,10 @@ async def _run_workflow_generation(
                 code_directory=code_dir,
                 file_mappings=file_mappings,
                 dependency_file=dependency_file,
+                dependency_depth=dependency_depth,
                 minio_bucket=minio_bucket,
                 jira_project_key=jira_project,
+                jira_export_path=jira_export,
                 output_dir=output_dir,
                 skip_screenshots=skip_screenshots,
                 skip_jira=skip_jira,
@@ -185,6 +201,13 @@ async def _run_workflow_generation(
                 console.print(f"  [blue]Word count:[/blue] {result.word_count}")
                 console.print(f"  [blue]Sections:[/blue] {result.section_count}")
                 console.print(f"  [blue]Vector collection:[/blue] {result.vector_collection}")
+                if result.llm_usage:
+                    usage = result.llm_usage
+                    tokens = usage["prompt_tokens"] + usage["completion_tokens"]
+                    console.print(
+                        f"  [blue]LLM usage:[/blue] {usage['calls']} calls, {tokens} tokens, "
+                        f"~${usage['cost_usd']:.2f}"
+                    )
             else:
                 console.print(f"\n[red]✗[/red] PRD generation failed: {result.error}")
 
@@ -206,13 +229,19 @@ def _extract_code_files(
     code_dir: str | None,
     file_mappings: list[str] | None,
     dependency_file: str | None = None,
+    form_name: str | None = None,
+    dependency_depth: int | None = None,
 ):
     """Extract code files from zip or directory."""
     from src.extractors.code_extractor import CodeExtractor
 
     if zip_path:
-        return CodeExtractor().extract_from_zip(
-            zip_path, file_mappings=file_mappings, dependency_file=dependency_file
+        return CodeExtractor().extract_from_index(
+            zip_path,
+            file_mappings=file_mappings,
+            dependency_file=dependency_file,
+            form_name=form_name,
+            dependency_depth=dependency_depth,
         )
     if code_dir:
         return CodeExtractor().extract_from_directory(
@@ -232,13 +261,20 @@ async def _analyze_screenshots(context, form_name: str, minio_bucket: str | None
     return await ScreenshotAnalysisAgent().analyze(context, screenshots=screenshots)
 
 
-async def _analyze_jira(context, form_name: str, jira_project: str | None):
+async def _analyze_jira(
+    context, form_name: str, jira_project: str | None, jira_export: str | None = None
+):
     """Analyze Jira issues with error handling."""
     from src.agents.atlassian_integration_agent import AtlassianIntegrationAgent
     from src.extractors.jira_extractor import JiraExtractor
 
     try:
-        issues = JiraExtractor().get_form_issues(form_name, project_key=jira_project)
+        extractor = JiraExtractor()
+        export_path = jira_export or extractor.settings.jira.export_path
+        if export_path:
+            issues = extractor.get_export_issues(export_path, form_name, jira_project)
+        else:
+            issues = extractor.get_form_issues(form_name, project_key=jira_project)
         if not issues:
             return None
         return await AtlassianIntegrationAgent().analyze(context, issues=issues)
@@ -267,6 +303,7 @@ async def _run_analysis_agents(
     code_files: list,
     minio_bucket: str | None,
     jira_project: str | None,
+    jira_export: str | None,
     skip_screenshots: bool,
     skip_jira: bool,
     progress: Progress,
@@ -285,7 +322,7 @@ async def _run_analysis_agents(
     jira_result = None
     if not skip_jira:
         progress.update(task, description="Analyzing Jira issues...")
-        jira_result = await _analyze_jira(context, form_name, jira_project)
+        jira_result = await _analyze_jira(context, form_name, jira_project, jira_export)
 
     progress.update(task, description="Generating requirements...")
     req_result = await RequirementsGeneratorAgent().analyze(context, code_files=code_files)
@@ -345,8 +382,10 @@ async def _run_direct_generation(
     code_dir: str | None,
     file_mappings: list[str] | None,
     dependency_file: str | None,
+    dependency_depth: int | None,
     minio_bucket: str | None,
     jira_project: str | None,
+    jira_export: str | None,
     output_dir: str,
     skip_screenshots: bool,
     skip_jira: bool,
@@ -364,7 +403,9 @@ async def _run_direct_generation(
     ) as progress:
         task = progress.add_task("Extracting code...", total=None)
 
-        code_files = _extract_code_files(zip_path, code_dir, file_mappings, dependency_file)
+        code_files = _extract_code_files(
+            zip_path, code_dir, file_mappings, dependency_file, form_name, dependency_depth
+        )
         console.print(f"  Extracted {len(code_files)} code files")
 
         progress.update(task, description="Creating vector collection...")
@@ -376,6 +417,7 @@ async def _run_direct_generation(
             code_files,
             minio_bucket,
             jira_project,
+            jira_export,
             skip_screenshots,
             skip_jira,
             progress,
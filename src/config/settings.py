@@ -67,6 +67,18 @@ class MinioSettings(BaseSettings):
     secret_key: str = Field(default="minioadmin", description="Minio secret key")
     bucket: str = Field(default="screenshots", description="Default bucket name")
     secure: bool = Field(default=False, description="Use HTTPS")
+    max_connections: int = Field(
+        default=16, description="Maximum pooled HTTP connections per Minio host"
+    )
+    download_workers: int = Field(
+        default=8, description="Concurrent object downloads when fetching screenshots"
+    )
+    cache_max_mb: int = Field(
+        default=1024, description="Size bound of the local screenshot cache in MB (0 disables)"
+    )
+    probe_bytes: int = Field(
+        default=8192, description="Bytes read by ranged GETs when probing image headers"
+    )
 
 
 class JiraSettings(BaseSettings):
@@ -78,6 +90,24 @@ class JiraSettings(BaseSettings):
     username: str = Field(default="", description="Jira username/email")
     api_token: str = Field(default="", description="Jira API token")
     project_key: str | None = Field(default=None, description="Default project key")
+    page_size: int = Field(default=100, description="Issues requested per JQL search page")
+    fetch_workers: int = Field(default=4, description="Concurrent JQL page requests")
+    extra_fields: str = Field(
+        default="",
+        description="Comma-separated extra fields to fetch (e.g. acceptance criteria custom fields)",
+    )
+    export_path: str = Field(
+        default="", description="XML or JSON export used instead of the API when set"
+    )
+    sync_enabled: bool = Field(
+        default=True, description="Serve issues from the local store, syncing incrementally"
+    )
+    sync_overlap_minutes: int = Field(
+        default=5, description="Extra minutes re-fetched by incremental syncs (clock skew)"
+    )
+    deletion_check_hours: int = Field(
+        default=24, description="Hours between key listings that drop deleted issues"
+    )
 
 
 class ConfluenceSettings(BaseSettings):
@@ -90,6 +120,109 @@ class ConfluenceSettings(BaseSettings):
     api_token: str = Field(default="", description="Confluence API token")
 
 
+class VisionSettings(BaseSettings):
+    """Preprocessing of images sent to vision models."""
+
+    model_config = SettingsConfigDict(env_prefix="VISION_", extra="ignore")
+
+    enabled: bool = Field(default=True, description="Preprocess images before vision calls")
+    max_long_edge: int = Field(default=1536, description="Downscale images to this long edge")
+    crop_borders: bool = Field(default=True, description="Crop uniform borders around the UI")
+    border_tolerance: int = Field(
+        default=8, description="Max per-channel difference treated as border color"
+    )
+    image_format: str = Field(default="webp", description="Output format: webp, jpeg or png")
+    quality: int = Field(default=80, description="Lossy encoding quality")
+    detail: str = Field(default="auto", description="Detail level: auto, low or high")
+    low_detail_max_edge: int = Field(
+        default=512, description="With detail=auto, images this small are sent at low detail"
+    )
+    dedup_threshold: int = Field(
+        default=6,
+        description="Max dHash Hamming distance for near-duplicate screenshots (-1 disables)",
+    )
+    ocr_enabled: bool = Field(default=True, description="Run local OCR over screenshots")
+    ocr_workers: int = Field(default=0, description="OCR worker processes (0 = one per CPU)")
+    ocr_language: str = Field(default="eng", description="Tesseract language(s)")
+    ocr_min_confidence: int = Field(default=60, description="Minimum OCR word confidence")
+    text_only_max_ink_ratio: float = Field(
+        default=0.05,
+        description="Screens with less non-text ink than this are analyzed from OCR text only",
+    )
+
+
+class LLMSettings(BaseSettings):
+    """Coordination of LLM and embedding API calls."""
+
+    model_config = SettingsConfigDict(env_prefix="LLM_", extra="ignore")
+
+    rate_limit_enabled: bool = Field(default=True, description="Rate limit OpenAI API calls")
+    rate_limit_shared: bool = Field(
+        default=True, description="Share rate limits across worker processes via the cache dir"
+    )
+    requests_per_minute: int = Field(default=500, description="Chat requests per minute per model")
+    tokens_per_minute: int = Field(
+        default=300000, description="Chat tokens per minute per model (prompt + max completion)"
+    )
+    embedding_requests_per_minute: int = Field(
+        default=3000, description="Embedding requests per minute"
+    )
+    embedding_tokens_per_minute: int = Field(
+        default=1000000, description="Embedding tokens per minute"
+    )
+    model_limits: str = Field(
+        default="", description="Per-model overrides as comma-separated model=rpm:tpm pairs"
+    )
+    retry_max_wait_seconds: float = Field(
+        default=60.0, description="Longest wait before retrying a rate-limited or failed call"
+    )
+    concurrency_enabled: bool = Field(
+        default=True, description="Adapt in-flight LLM calls per model to throttling (AIMD)"
+    )
+    concurrency_initial: int = Field(default=4, description="Initial in-flight calls per model")
+    concurrency_min: int = Field(default=1, description="Lowest in-flight calls per model")
+    concurrency_max: int = Field(default=16, description="Hard ceiling on in-flight calls per model")
+    concurrency_backoff: float = Field(
+        default=0.5, description="Factor applied to the window on 429s, timeouts and slow calls"
+    )
+    latency_target_seconds: float = Field(
+        default=60.0, description="Calls slower than this shrink the window (0 disables)"
+    )
+    cache_enabled: bool = Field(
+        default=False, description="Reuse responses of identical LLM calls from a disk cache"
+    )
+    cache_ttl_hours: float = Field(default=168.0, description="Lifetime of cached LLM responses")
+    cache_max_mb: int = Field(default=256, description="Size bound of the LLM response cache")
+    cache_bypass_agents: str = Field(
+        default="", description="Comma-separated agent names that never use the response cache"
+    )
+    context_budget_tokens: int = Field(
+        default=6000, description="Tokens of retrieved context or code summaries per prompt"
+    )
+    prompt_headroom_tokens: int = Field(
+        default=1024, description="Tokens kept free below the model's context window"
+    )
+    structured_output_enabled: bool = Field(
+        default=True, description="Request JSON results with a JSON schema response format"
+    )
+    routing_enabled: bool = Field(
+        default=True, description="Route list-style call sites to the fast model tier"
+    )
+    routes: str = Field(
+        default="", description="Per-call-site tier overrides as comma-separated Agent._method=tier"
+    )
+    fast_model: str = Field(default="gpt-4o-mini", description="Model of the fast tier")
+    fast_max_tokens: int = Field(default=1024, description="Max completion tokens of the fast tier")
+    fast_temperature: float = Field(default=0.0, description="Temperature of the fast tier")
+    vision_model: str = Field(default="gpt-4o", description="Model of the vision tier")
+    escalation_enabled: bool = Field(
+        default=True, description="Repeat fast-tier calls on the standard tier when invalid"
+    )
+    combined_sections_enabled: bool = Field(
+        default=True, description="Request an agent's secondary sections in one structured call"
+    )
+
+
 class Settings(BaseSettings):
     """Main application settings aggregating all configuration."""
 
@@ -102,6 +235,8 @@ class Settings(BaseSettings):
     minio: MinioSettings = Field(default_factory=MinioSettings)
     jira: JiraSettings = Field(default_factory=JiraSettings)
     confluence: ConfluenceSettings = Field(default_factory=ConfluenceSettings)
+    vision: VisionSettings = Field(default_factory=VisionSettings)
+    llm: LLMSettings = Field(default_factory=LLMSettings)
 
     # Application settings
     log_level: str = Field(default="INFO", description="Logging level")
@@ -109,10 +244,19 @@ class Settings(BaseSettings):
     chunk_size: int = Field(default=1000, description="Text chunk size for splitting")
     chunk_overlap: int = Field(default=200, description="Overlap between chunks")
     max_retries: int = Field(default=3, description="Max retries for operations")
+    code_graph_depth: int = Field(
+        default=3, description="Default depth for a form's code dependency closure"
+    )
+    metrics_workers: int = Field(
+        default=0, description="Worker processes for code metrics (0 = one per CPU)"
+    )
 
     # Paths
     uploads_dir: str = Field(default="./uploads", description="Upload directory")
     output_dir: str = Field(default="./output", description="Output directory")
+    cache_dir: str = Field(
+        default="./.cache", description="Local cache directory for indexes and downloads"
+    )
 
 
 @lru_cache
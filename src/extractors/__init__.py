@@ -1,7 +1,8 @@
 """Extractors for various data sources."""
 
 from src.extractors.code_extractor import CodeExtractor
+from src.extractors.code_index import CodebaseIndex
 from src.extractors.jira_extractor import JiraExtractor
 from src.extractors.minio_extractor import MinioExtractor
 
-__all__ = ["CodeExtractor", "MinioExtractor", "JiraExtractor"]
+__all__ = ["CodeExtractor", "CodebaseIndex", "MinioExtractor", "JiraExtractor"]
@@ -3,8 +3,10 @@ Code Extractor for processing legacy codebase files.
 """
 
 import re
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any
 
 from langchain_core.documents import Document
 
@@ -23,6 +25,22 @@ from src.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Patterns used to derive cross-file symbols for the dependency graph
+_JAVA_COMMENT_PATTERN = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+_JAVA_STRING_PATTERN = re.compile(r'"(?:\\.|[^"\\\n])*"')
+_JAVA_PACKAGE_PATTERN = re.compile(r"^\s*package\s+([\w.]+)\s*;", re.MULTILINE)
+_JAVA_WILDCARD_IMPORT_PATTERN = re.compile(r"^\s*import\s+([\w.]+)\.\*\s*;", re.MULTILINE)
+_JAVA_TYPE_DECL_PATTERN = re.compile(r"\b(?:class|interface|enum)\s+([A-Za-z_]\w*)")
+_TYPE_REFERENCE_PATTERN = re.compile(r"\b([A-Z]\w*)\b")
+_SQL_TABLE_PATTERN = re.compile(
+    r"\b(?:FROM|JOIN|INTO|UPDATE|REFERENCES)\s+([\w.$\"`\[\]]+)", re.IGNORECASE
+)
+_SQL_CREATE_TABLE_PATTERN = re.compile(
+    r"\bCREATE\s+(?:GLOBAL\s+TEMPORARY\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.$\"`\[\]]+)",
+    re.IGNORECASE,
+)
+_FORM_COMPONENT_CLASS_PATTERN = re.compile(r"<(?:Component|Container)\s[^>]*?class=\"([\w.$]+)\"")
+
 
 @dataclass
 class CodeFile:
@@ -213,6 +231,69 @@ class CodeExtractor:
 
         return code_files
 
+    def extract_from_index(
+        self,
+        zip_path: str | Path,
+        file_mappings: list[str] | None = None,
+        dependency_file: str | Path | None = None,
+        form_name: str | None = None,
+        dependency_depth: int | None = None,
+    ) -> list[CodeFile]:
+        """
+        Resolve code files for a form against the archive's codebase index.
+
+        The index is built once per archive (keyed by its hash) and reused by
+        every later run, so nothing is extracted to disk or re-parsed here.
+        Without a dependency file or mappings, the form's entry files
+        (``<form>.java`` / ``<form>.form``) and their transitive dependencies
+        from the index's dependency graph are used instead.
+
+        Args:
+            zip_path: Path to the ZIP file
+            file_mappings: Optional list of specific file paths
+            dependency_file: Optional path to dependency file with file paths
+            form_name: Optional form name used to find entry files
+            dependency_depth: Optional closure depth (defaults to code_graph_depth)
+
+        Returns:
+            List of parsed CodeFile objects
+        """
+        from src.extractors.code_index import CodebaseIndex
+
+        index = CodebaseIndex(zip_path)
+        index.build(self)
+
+        dependency_paths: list[str] | None = None
+        if dependency_file:
+            dependency_paths = parse_dependency_file(dependency_file)
+            logger.info(
+                "Loaded dependency file",
+                file=str(dependency_file),
+                paths_count=len(dependency_paths),
+            )
+
+        paths: list[str] | None = None
+        if dependency_paths:
+            paths = index.resolve(dependency_paths)
+        elif file_mappings:
+            paths = index.find_by_names({Path(m).name for m in file_mappings})
+        elif form_name:
+            entry_files = index.find_entry_files(form_name)
+            if entry_files:
+                paths = index.dependency_closure(entry_files, dependency_depth)
+
+        code_files = index.get_files(paths)
+
+        logger.info(
+            "Resolved code files from index",
+            zip=str(zip_path),
+            archive_hash=index.archive_hash[:12],
+            total_files=len(code_files),
+            filtered=paths is not None,
+        )
+
+        return code_files
+
     def _parse_code_file(self, file_path: Path, base_path: Path) -> CodeFile | None:
         """
         Parse a single code file.
@@ -226,36 +307,49 @@ class CodeExtractor:
         """
         try:
             content = read_file_content(file_path)
-            extension = get_file_extension(file_path)
-            language = self.LANGUAGE_MAP.get(extension, "unknown")
-
             relative_path = str(file_path.relative_to(base_path))
-
-            # Determine file type
-            file_type = self._determine_file_type(file_path, content)
-
-            # Extract code structure based on language
-            classes, methods, imports = self._extract_code_structure(content, language)
-
-            # Extract dependencies
-            dependencies = self._extract_dependencies(content, language)
-
-            return CodeFile(
-                path=relative_path,
-                content=content,
-                language=language,
-                file_type=file_type,
-                classes=classes,
-                methods=methods,
-                imports=imports,
-                dependencies=dependencies,
-                line_count=content.count("\n") + 1,
-            )
+            return self.parse_content(relative_path, content)
 
         except Exception as e:
             logger.warning("Failed to parse code file", file_path=str(file_path), error=str(e))
             return None
 
+    def parse_content(self, relative_path: str, content: str) -> CodeFile:
+        """
+        Parse code that has already been read into memory.
+
+        Args:
+            relative_path: Path of the file relative to the codebase root
+            content: File content
+
+        Returns:
+            Parsed CodeFile
+        """
+        file_path = Path(relative_path)
+        extension = get_file_extension(file_path)
+        language = self.LANGUAGE_MAP.get(extension, "unknown")
+
+        # Determine file type
+        file_type = self._determine_file_type(file_path, content)
+
+        # Extract code structure based on language
+        classes, methods, imports = self._extract_code_structure(content, language)
+
+        # Extract dependencies
+        dependencies = self._extract_dependencies(content, language)
+
+        return CodeFile(
+            path=relative_path,
+            content=content,
+            language=language,
+            file_type=file_type,
+            classes=classes,
+            methods=methods,
+            imports=imports,
+            dependencies=dependencies,
+            line_count=content.count("\n") + 1,
+        )
+
     def _determine_file_type(self, file_path: Path, content: str) -> str:
         """Determine the type of code file based on content and path."""
         name = file_path.name.lower()
@@ -346,18 +440,144 @@ class CodeExtractor:
 
         return list(set(dependencies))
 
-    def to_documents(self, code_files: list[CodeFile], form_name: str) -> list[Document]:
+    def extract_symbols(self, code_file: CodeFile) -> tuple[str, list[str], list[str]]:
+        """
+        Extract the symbols a file defines and the symbols it references.
+
+        Symbols are fully-qualified class names (``com.acme.Foo``), simple
+        class names, wildcard imports (``com.acme.*``) and SQL tables
+        (``table:customer``). They are the input to the dependency graph
+        built by CodebaseIndex.
+
+        Args:
+            code_file: Parsed code file
+
+        Returns:
+            Tuple of (package, defined symbols, referenced symbols)
+        """
+        package = ""
+        defined: set[str] = set()
+        referenced: set[str] = set()
+
+        if code_file.language == "java":
+            strings = _JAVA_STRING_PATTERN.findall(_JAVA_COMMENT_PATTERN.sub(" ", code_file.content))
+            code = _JAVA_STRING_PATTERN.sub('""', _JAVA_COMMENT_PATTERN.sub(" ", code_file.content))
+
+            package_match = _JAVA_PACKAGE_PATTERN.search(code)
+            package = package_match.group(1) if package_match else ""
+
+            for name in _JAVA_TYPE_DECL_PATTERN.findall(code):
+                defined.add(name)
+                if package:
+                    defined.add(f"{package}.{name}")
+
+            referenced.update(code_file.imports)
+            referenced.update(f"{p}.*" for p in _JAVA_WILDCARD_IMPORT_PATTERN.findall(code))
+            for dependency in code_file.dependencies:
+                referenced.update(re.findall(r"[A-Za-z_]\w*", dependency))
+            referenced.update(_TYPE_REFERENCE_PATTERN.findall(code))
+            for literal in strings:
+                referenced.update(f"table:{t}" for t in self.extract_sql_tables(literal))
+
+        elif code_file.language == "sql":
+            for raw_name in _SQL_CREATE_TABLE_PATTERN.findall(code_file.content):
+                defined.add(f"table:{_normalize_table_name(raw_name)}")
+            referenced.update(f"table:{t}" for t in self.extract_sql_tables(code_file.content))
+
+        elif code_file.language == "java_form":
+            referenced.update(_FORM_COMPONENT_CLASS_PATTERN.findall(code_file.content))
+
+        return package, sorted(defined), sorted(referenced - defined)
+
+    def extract_sql_tables(self, sql: str) -> list[str]:
+        """
+        Extract the tables referenced by SQL text.
+
+        Args:
+            sql: SQL statement(s) or a string literal containing SQL
+
+        Returns:
+            Lowercase table names in order of appearance (with repeats)
+        """
+        return [_normalize_table_name(name) for name in _SQL_TABLE_PATTERN.findall(sql)]
+
+    def compute_metrics(self, code_files: list[CodeFile]) -> dict[str, Any]:
+        """
+        Compute deterministic code metrics for a set of files.
+
+        Args:
+            code_files: Parsed code files with content
+
+        Returns:
+            Compact metrics summary (LOC, comment ratio, complexity hot spots,
+            fan-in/fan-out, SQL table touches and duplication)
+        """
+        from src.extractors.code_metrics import CodeMetricsAnalyzer
+
+        return CodeMetricsAnalyzer().analyze(code_files).summary
+
+    def extract_schema(self, code_files: list[CodeFile]) -> dict[str, Any]:
+        """
+        Parse DDL files into a structured schema index.
+
+        Args:
+            code_files: Parsed code files with content; only ``ddl`` files are used
+
+        Returns:
+            Serialized SchemaIndex with tables, columns, keys and indexes
+        """
+        from src.extractors.sql_schema import SQLSchemaParser
+
+        parser = SQLSchemaParser()
+        for code_file in code_files:
+            if code_file.file_type == "ddl":
+                parser.parse(code_file.content, source_file=code_file.path)
+
+        logger.info("Schema extracted", table_count=len(parser.schema.tables))
+        return parser.schema.to_dict()
+
+    def extract_form_inventory(self, code_files: list[CodeFile]) -> dict[str, Any]:
+        """
+        Parse ``.form`` definitions into a UI component inventory.
+
+        Args:
+            code_files: Parsed code files with content; only ``form_definition`` files are used
+
+        Returns:
+            Serialized FormInventory with components, labels, hierarchy, events and constraints
+        """
+        from src.extractors.form_parser import FormDefinitionParser, FormInventory
+
+        parser = FormDefinitionParser()
+        inventory = FormInventory()
+        for code_file in code_files:
+            if code_file.file_type == "form_definition":
+                definition = parser.parse(code_file.content, source_file=code_file.path)
+                if definition:
+                    inventory.forms.append(definition)
+
+        logger.info(
+            "Form inventory extracted",
+            form_count=len(inventory.forms),
+            component_count=sum(inventory.component_counts().values()),
+        )
+        return inventory.to_dict()
+
+    def to_documents(self, code_files: Iterable[CodeFile], form_name: str) -> Iterator[Document]:
         """
         Convert CodeFile objects to LangChain Documents for vectorization.
 
+        Documents are yielded one at a time so callers can stream them into
+        the vector store without materializing the whole codebase.
+
         Args:
-            code_files: List of parsed code files
+            code_files: Iterable of parsed code files
             form_name: Name of the form these files belong to
 
-        Returns:
-            List of LangChain Documents
+        Yields:
+            LangChain Documents, one per code file
         """
-        documents: list[Document] = []
+        count = 0
 
         for code_file in code_files:
             # Create a comprehensive text representation
@@ -390,15 +610,13 @@ class CodeExtractor:
                 "doc_type": "code",
             }
 
-            document = Document(
+            count += 1
+            yield Document(
                 page_content="\n".join(text_parts),
                 metadata=metadata,
             )
-            documents.append(document)
 
-        logger.info("Converted code files to documents", count=len(documents))
-
-        return documents
+        logger.info("Converted code files to documents", count=count)
 
     def get_form_mapping(
         self,
@@ -438,3 +656,9 @@ class CodeExtractor:
             sql_files=[f"*{form_name}*.sql"],
             form_files=[f"*{form_name}*.form"],
         )
+
+
+def _normalize_table_name(raw_name: str) -> str:
+    """Strip quoting and schema prefixes from a SQL table name."""
+    name = raw_name.strip("\"`[]").split(".")[-1]
+    return name.strip("\"`[]").lower()
@@ -0,0 +1,509 @@
+"""
+Codebase index for legacy archives shared by many forms.
+
+Parsing a multi-gigabyte archive for every form is wasteful when hundreds of
+forms are generated from the same ZIP. The index parses every member once,
+keyed by the archive's SHA256, and stores the resulting CodeFile metadata
+(with zlib-compressed content) in a SQLite file under the cache directory.
+
+The same file also holds a static dependency graph (imports, class
+references, extends/implements, SQL table usage and .form/.java pairs), so
+a form's transitive dependency closure can be computed from its entry
+files without a hand-curated dependency list.
+"""
+
+import json
+import os
+import sqlite3
+import zlib
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any
+
+from src.config.settings import get_settings
+from src.extractors.code_extractor import CodeExtractor, CodeFile
+from src.utils.dependency_parser import normalize_path_for_matching
+from src.utils.file_utils import (
+    calculate_file_hash,
+    decode_content,
+    ensure_directory,
+    is_code_file,
+    iter_zip_members,
+)
+from src.utils.logging_config import ExecutionTimer, get_logger
+
+logger = get_logger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK_SIZE = 500
+
+
+class CodebaseIndex:
+    """
+    On-disk index of every parsed code file in a ZIP archive.
+
+    Usage:
+        index = CodebaseIndex("legacy.zip")
+        index.build()  # no-op when the archive was already indexed
+        files = index.get_files(index.resolve(["src/forms/le01.java"]))
+        closure = index.dependency_closure(index.find_entry_files("le01"), depth=3)
+    """
+
+    SCHEMA_VERSION = 2
+
+    def __init__(self, zip_path: str | Path, index_dir: str | Path | None = None) -> None:
+        """
+        Initialize the index for an archive.
+
+        Args:
+            zip_path: Path to the ZIP archive
+            index_dir: Optional directory for index files (defaults to <cache_dir>/code_index)
+        """
+        self.settings = get_settings()
+        self.zip_path = Path(zip_path)
+        self.index_dir = ensure_directory(
+            index_dir or Path(self.settings.cache_dir) / "code_index"
+        )
+        self._archive_hash: str | None = None
+
+    @property
+    def archive_hash(self) -> str:
+        """Get the SHA256 of the archive, memoized by path, size and mtime."""
+        if self._archive_hash is None:
+            self._archive_hash = self._lookup_archive_hash()
+        return self._archive_hash
+
+    @property
+    def db_path(self) -> Path:
+        """Path of the SQLite file holding this archive's index."""
+        return self.index_dir / f"{self.archive_hash}.sqlite"
+
+    def exists(self) -> bool:
+        """Check whether the archive has already been indexed."""
+        if not self.db_path.exists():
+            return False
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        return row is not None and int(row[0]) == self.SCHEMA_VERSION
+
+    def build(self, extractor: CodeExtractor | None = None, force: bool = False) -> Path:
+        """
+        Parse every code file in the archive into the index.
+
+        The index is written to a temporary file and atomically moved into
+        place, so concurrent workers indexing the same archive never observe
+        a partial index.
+
+        Args:
+            extractor: Optional CodeExtractor used for parsing
+            force: Rebuild even if an index already exists
+
+        Returns:
+            Path to the index file
+        """
+        if not force and self.exists():
+            logger.debug("Codebase index already built", archive_hash=self.archive_hash[:12])
+            return self.db_path
+
+        extractor = extractor or CodeExtractor()
+        timer = ExecutionTimer()
+        tmp_path = self.db_path.with_suffix(f".tmp-{os.getpid()}")
+        tmp_path.unlink(missing_ok=True)
+
+        conn = sqlite3.connect(tmp_path)
+        try:
+            self._create_schema(conn)
+            file_count = 0
+            batch: list[tuple[Any, ...]] = []
+            symbol_rows: list[tuple[str, str, str, str]] = []
+
+            for member_path, data in iter_zip_members(self.zip_path):
+                if not is_code_file(member_path):
+                    continue
+                try:
+                    code_file = extractor.parse_content(member_path, decode_content(data))
+                except Exception as e:
+                    logger.warning("Failed to parse code file", file_path=member_path, error=str(e))
+                    continue
+
+                batch.append(self._to_row(code_file))
+                symbol_rows.append((code_file.path, *self._symbol_row(extractor, code_file)))
+                if len(batch) >= _QUERY_CHUNK_SIZE:
+                    self._insert_rows(conn, batch, symbol_rows)
+                    file_count += len(batch)
+                    batch, symbol_rows = [], []
+
+            if batch:
+                self._insert_rows(conn, batch, symbol_rows)
+                file_count += len(batch)
+
+            edge_count = self._build_graph(conn)
+
+            conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("schema_version", str(self.SCHEMA_VERSION)),
+                    ("archive", str(self.zip_path)),
+                    ("file_count", str(file_count)),
+                ],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        os.replace(tmp_path, self.db_path)
+
+        logger.info(
+            "Built codebase index",
+            zip=str(self.zip_path),
+            archive_hash=self.archive_hash[:12],
+            file_count=file_count,
+            edge_count=edge_count,
+            duration_ms=round(timer.elapsed_ms(), 2),
+        )
+
+        return self.db_path
+
+    def all_paths(self) -> list[str]:
+        """List the paths of all indexed files."""
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT path FROM files ORDER BY path")]
+
+    def find_by_names(self, names: Iterable[str]) -> list[str]:
+        """
+        Find indexed files by file name.
+
+        Args:
+            names: File names (without directories)
+
+        Returns:
+            Sorted list of matching paths
+        """
+        paths: set[str] = set()
+        with self._connect() as conn:
+            for chunk in _chunked(sorted(set(names))):
+                placeholders = ",".join("?" * len(chunk))
+                paths.update(
+                    row[0]
+                    for row in conn.execute(
+                        f"SELECT path FROM files WHERE name IN ({placeholders})", chunk
+                    )
+                )
+        return sorted(paths)
+
+    def resolve(self, dependency_paths: list[str]) -> list[str]:
+        """
+        Resolve dependency file entries to indexed paths.
+
+        Any file whose name equals a dependency entry's file name is a match
+        under match_file_path, so resolution is a lookup on the name index.
+
+        Args:
+            dependency_paths: Paths parsed from a dependency file
+
+        Returns:
+            Sorted list of matching indexed paths
+        """
+        names = {Path(normalize_path_for_matching(p)).name for p in dependency_paths}
+        paths = self.find_by_names(names)
+
+        logger.info(
+            "Resolved dependency paths against index",
+            dependency_paths=len(dependency_paths),
+            matched_files=len(paths),
+        )
+
+        return paths
+
+    def find_entry_files(self, form_name: str) -> list[str]:
+        """
+        Find the entry files of a form (e.g. ``le01.java`` and ``le01.form``).
+
+        Args:
+            form_name: Name of the form
+
+        Returns:
+            Sorted list of entry file paths
+        """
+        stem = form_name.lower()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT path FROM files WHERE lower(name) IN (?, ?) ORDER BY path",
+                (f"{stem}.java", f"{stem}.form"),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def dependency_closure(self, entry_paths: list[str], depth: int | None = None) -> list[str]:
+        """
+        Compute the transitive dependencies of entry files from the stored graph.
+
+        Args:
+            entry_paths: Indexed paths to start from
+            depth: Maximum number of hops (defaults to the code_graph_depth setting)
+
+        Returns:
+            Sorted list of paths including the entry files
+        """
+        depth = self.settings.code_graph_depth if depth is None else depth
+        visited = set(entry_paths)
+        frontier = set(entry_paths)
+
+        with self._connect() as conn:
+            for _ in range(depth):
+                if not frontier:
+                    break
+                discovered: set[str] = set()
+                for chunk in _chunked(sorted(frontier)):
+                    placeholders = ",".join("?" * len(chunk))
+                    discovered.update(
+                        row[0]
+                        for row in conn.execute(
+                            f"SELECT dst FROM edges WHERE src IN ({placeholders})", chunk
+                        )
+                    )
+                frontier = discovered - visited
+                visited.update(frontier)
+
+        logger.info(
+            "Computed dependency closure",
+            entry_files=len(entry_paths),
+            depth=depth,
+            closure_size=len(visited),
+        )
+
+        return sorted(visited)
+
+    def get_files(self, paths: list[str] | None = None) -> list[CodeFile]:
+        """
+        Load CodeFile objects from the index.
+
+        Args:
+            paths: Paths to load, or None for every indexed file
+
+        Returns:
+            List of CodeFile objects ordered by path
+        """
+        return list(self.iter_files(paths))
+
+    def iter_files(self, paths: list[str] | None = None) -> Iterator[CodeFile]:
+        """
+        Stream CodeFile objects from the index.
+
+        Args:
+            paths: Paths to load, or None for every indexed file
+
+        Yields:
+            CodeFile objects ordered by path
+        """
+        columns = (
+            "path, language, file_type, classes, methods, imports, dependencies, "
+            "line_count, content"
+        )
+        with self._connect() as conn:
+            if paths is None:
+                for row in conn.execute(f"SELECT {columns} FROM files ORDER BY path"):
+                    yield self._from_row(row)
+                return
+
+            for chunk in _chunked(sorted(set(paths))):
+                placeholders = ",".join("?" * len(chunk))
+                for row in conn.execute(
+                    f"SELECT {columns} FROM files WHERE path IN ({placeholders}) ORDER BY path",
+                    chunk,
+                ):
+                    yield self._from_row(row)
+
+    # ========== Internal Helpers ==========
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection to the index database and close it afterwards."""
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            yield conn
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Create the index tables."""
+        conn.executescript(
+            """
+            CREATE TABLE files (
+                path TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                language TEXT NOT NULL,
+                file_type TEXT NOT NULL,
+                classes TEXT NOT NULL,
+                methods TEXT NOT NULL,
+                imports TEXT NOT NULL,
+                dependencies TEXT NOT NULL,
+                line_count INTEGER NOT NULL,
+                content BLOB NOT NULL
+            );
+            CREATE INDEX idx_files_name ON files (name);
+            CREATE TABLE file_symbols (
+                path TEXT PRIMARY KEY,
+                package TEXT NOT NULL,
+                defined TEXT NOT NULL,
+                referenced TEXT NOT NULL
+            );
+            CREATE TABLE edges (
+                src TEXT NOT NULL,
+                dst TEXT NOT NULL,
+                PRIMARY KEY (src, dst)
+            ) WITHOUT ROWID;
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+
+    def _insert_rows(
+        self,
+        conn: sqlite3.Connection,
+        rows: list[tuple[Any, ...]],
+        symbol_rows: list[tuple[str, str, str, str]],
+    ) -> None:
+        """Insert a batch of file rows and their symbols."""
+        conn.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        conn.executemany("INSERT OR REPLACE INTO file_symbols VALUES (?, ?, ?, ?)", symbol_rows)
+
+    def _symbol_row(self, extractor: CodeExtractor, code_file: CodeFile) -> tuple[str, str, str]:
+        """Extract the (package, defined, referenced) symbol columns for a file."""
+        package, defined, referenced = extractor.extract_symbols(code_file)
+        return package, json.dumps(defined), json.dumps(referenced)
+
+    def _build_graph(self, conn: sqlite3.Connection) -> int:
+        """
+        Resolve referenced symbols to files and store the dependency edges.
+
+        Qualified symbols (imports, SQL tables) resolve directly. Simple class
+        names resolve to a class in the same package, then in a wildcard
+        imported package, then to the only class with that name; ambiguous
+        names are skipped rather than guessed. Java sources and their .form
+        files are linked in both directions.
+
+        Returns:
+            Number of edges stored
+        """
+        qualified: dict[str, set[str]] = defaultdict(set)
+        simple: dict[str, list[tuple[str, str]]] = defaultdict(list)
+        form_pairs: dict[str, list[str]] = defaultdict(list)
+
+        for path, package, defined_json in conn.execute(
+            "SELECT path, package, defined FROM file_symbols"
+        ):
+            for symbol in json.loads(defined_json):
+                if "." in symbol or ":" in symbol:
+                    qualified[symbol].add(path)
+                else:
+                    simple[symbol].append((package, path))
+            if path.endswith((".java", ".form")):
+                form_pairs[path.rsplit(".", 1)[0]].append(path)
+
+        edge_count = 0
+        edges: list[tuple[str, str]] = []
+        for path, package, referenced_json in conn.execute(
+            "SELECT path, package, referenced FROM file_symbols"
+        ).fetchall():
+            referenced = json.loads(referenced_json)
+            wildcard_packages = {r[:-2] for r in referenced if r.endswith(".*")}
+            # Single-type imports shadow same-package classes of the same name
+            imported_names = {
+                r.rsplit(".", 1)[1] for r in referenced if "." in r and not r.endswith(".*")
+            }
+            targets: set[str] = set(form_pairs.get(path.rsplit(".", 1)[0], []))
+
+            for symbol in referenced:
+                if symbol in qualified:
+                    targets.update(qualified[symbol])
+                elif symbol in simple and symbol not in imported_names:
+                    targets.update(_resolve_simple_name(simple[symbol], package, wildcard_packages))
+
+            targets.discard(path)
+            edges.extend((path, target) for target in targets)
+            if len(edges) >= _QUERY_CHUNK_SIZE:
+                conn.executemany("INSERT OR IGNORE INTO edges VALUES (?, ?)", edges)
+                edge_count += len(edges)
+                edges = []
+
+        if edges:
+            conn.executemany("INSERT OR IGNORE INTO edges VALUES (?, ?)", edges)
+            edge_count += len(edges)
+
+        return edge_count
+
+    def _to_row(self, code_file: CodeFile) -> tuple[Any, ...]:
+        """Convert a CodeFile to a database row."""
+        return (
+            code_file.path,
+            Path(code_file.path).name,
+            code_file.language,
+            code_file.file_type,
+            json.dumps(code_file.classes),
+            json.dumps(code_file.methods),
+            json.dumps(code_file.imports),
+            json.dumps(code_file.dependencies),
+            code_file.line_count,
+            zlib.compress(code_file.content.encode("utf-8")),
+        )
+
+    def _from_row(self, row: tuple[Any, ...]) -> CodeFile:
+        """Convert a database row back to a CodeFile."""
+        return CodeFile(
+            path=row[0],
+            language=row[1],
+            file_type=row[2],
+            classes=json.loads(row[3]),
+            methods=json.loads(row[4]),
+            imports=json.loads(row[5]),
+            dependencies=json.loads(row[6]),
+            line_count=row[7],
+            content=zlib.decompress(row[8]).decode("utf-8"),
+        )
+
+    def _lookup_archive_hash(self) -> str:
+        """
+        Get the archive hash, reusing a previous result when the file is unchanged.
+
+        Hashing gigabytes on every run would defeat the index, so hashes are
+        memoized in a small catalog keyed by absolute path, size and mtime.
+        """
+        stat = self.zip_path.stat()
+        key = (str(self.zip_path.resolve()), stat.st_size, stat.st_mtime_ns)
+
+        with closing(sqlite3.connect(self.index_dir / "catalog.sqlite")) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS archives ("
+                "path TEXT, size INTEGER, mtime_ns INTEGER, sha256 TEXT, "
+                "PRIMARY KEY (path, size, mtime_ns))"
+            )
+            row = conn.execute(
+                "SELECT sha256 FROM archives WHERE path = ? AND size = ? AND mtime_ns = ?", key
+            ).fetchone()
+            if row:
+                return row[0]
+
+            archive_hash = calculate_file_hash(self.zip_path)
+            conn.execute("INSERT OR REPLACE INTO archives VALUES (?, ?, ?, ?)", (*key, archive_hash))
+            return archive_hash
+
+
+def _resolve_simple_name(
+    candidates: list[tuple[str, str]], package: str, wildcard_packages: set[str]
+) -> list[str]:
+    """Pick the file(s) a simple class name most likely refers to."""
+    same_package = [path for pkg, path in candidates if pkg == package]
+    if same_package:
+        return same_package
+
+    imported = [path for pkg, path in candidates if pkg in wildcard_packages]
+    if imported:
+        return imported
+
+    return [candidates[0][1]] if len(candidates) == 1 else []
+
+
+def _chunked(items: list[str]) -> Iterator[list[str]]:
+    """Split a list into chunks that fit in a single SQLite statement."""
+    for i in range(0, len(items), _QUERY_CHUNK_SIZE):
+        yield items[i : i + _QUERY_CHUNK_SIZE]
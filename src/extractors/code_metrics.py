@@ -0,0 +1,405 @@
+"""
+Deterministic local code metrics for risk and technical-debt analysis.
+
+Computes LOC, comment ratio, per-method cyclomatic complexity, fan-in/fan-out
+from imports, SQL table touch counts and duplicated blocks without any LLM
+calls. Per-file measurement runs in a process pool; cross-file metrics
+(fan-in, duplication) are combined afterwards and summarized compactly so
+they can be embedded in prompts.
+"""
+
+import hashlib
+import os
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.config.settings import get_settings
+from src.extractors.code_extractor import CodeExtractor, CodeFile
+from src.utils.logging_config import ExecutionTimer, get_logger
+
+logger = get_logger(__name__)
+
+# Languages with C-style comments and braces
+_BRACE_LANGUAGES = {"java", "javascript", "typescript", "csharp"}
+
+_C_COMMENT_OR_STRING = re.compile(
+    r"//[^\n]*|/\*.*?\*/|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'", re.DOTALL
+)
+_JAVA_STRING = re.compile(r'"(?:\\.|[^"\\\n])*"')
+_JAVA_METHOD = re.compile(
+    r"(?:public|private|protected)\s+(?:static\s+)?(?:final\s+)?(?:synchronized\s+)?"
+    r"(?:[\w<>\[\],.?\s]+\s+)?(\w+)\s*\([^)]*\)\s*(?:throws\s+[\w,.\s]+)?\s*\{"
+)
+_C_DECISION = re.compile(r"\b(?:if|for|while|case|catch)\b|&&|\|\||\?(?!\?)")
+_PYTHON_DEF = re.compile(r"^([ \t]*)def\s+(\w+)\s*\(", re.MULTILINE)
+_PYTHON_DECISION = re.compile(r"\b(?:if|elif|for|while|except|and|or)\b")
+
+# Lines too generic to count towards duplicated blocks
+_TRIVIAL_LINES = {"{", "}", "};", ")", ");", "else", "} else {", "try {", "return;", "break;"}
+
+
+@dataclass
+class MethodMetrics:
+    """Metrics for a single method or function."""
+
+    name: str
+    complexity: int
+    line_count: int
+
+
+@dataclass
+class FileMetrics:
+    """Metrics for a single code file."""
+
+    path: str
+    language: str
+    loc: int
+    comment_lines: int
+    blank_lines: int
+    comment_ratio: float
+    methods: list[MethodMetrics] = field(default_factory=list)
+    sql_tables: dict[str, int] = field(default_factory=dict)
+    fan_in: int = 0
+    fan_out: int = 0
+    duplicated_lines: int = 0
+
+
+@dataclass
+class CodeMetricsReport:
+    """Per-file metrics plus a compact summary for prompts."""
+
+    files: list[FileMetrics]
+    summary: dict[str, Any]
+
+
+class CodeMetricsAnalyzer:
+    """
+    Computes code metrics across a set of parsed code files.
+
+    Usage:
+        report = CodeMetricsAnalyzer().analyze(code_files)
+        prompt_data = report.summary
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        duplicate_window: int = 6,
+        complexity_threshold: int = 10,
+        top_n: int = 10,
+    ) -> None:
+        """
+        Initialize the analyzer.
+
+        Args:
+            max_workers: Worker processes (defaults to the metrics_workers setting)
+            duplicate_window: Number of consecutive normalized lines forming a block
+            complexity_threshold: Cyclomatic complexity reported as "complex"
+            top_n: Number of entries kept in each summary list
+        """
+        settings = get_settings()
+        self.max_workers = max_workers or settings.metrics_workers or os.cpu_count() or 1
+        self.duplicate_window = duplicate_window
+        self.complexity_threshold = complexity_threshold
+        self.top_n = top_n
+
+    def analyze(self, code_files: list[CodeFile]) -> CodeMetricsReport:
+        """
+        Compute metrics for all files.
+
+        Args:
+            code_files: Parsed code files with content
+
+        Returns:
+            CodeMetricsReport with per-file metrics and a summary
+        """
+        timer = ExecutionTimer()
+        jobs = [(cf.path, cf.language, cf.content, self.duplicate_window) for cf in code_files]
+
+        # Process startup dominates for small inputs
+        if self.max_workers > 1 and len(jobs) > 32:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                measured = list(pool.map(_measure_file, jobs, chunksize=16))
+        else:
+            measured = [_measure_file(job) for job in jobs]
+
+        files = [metrics for metrics, _ in measured]
+        self._apply_fan_in_out(files, code_files)
+        duplicated_regions = self._apply_duplication(files, [blocks for _, blocks in measured])
+
+        summary = self._summarize(files, duplicated_regions)
+
+        logger.info(
+            "Computed code metrics",
+            file_count=len(files),
+            total_loc=summary["total_loc"],
+            max_complexity=summary["max_complexity"],
+            duplicated_regions=duplicated_regions,
+            duration_ms=round(timer.elapsed_ms(), 2),
+        )
+
+        return CodeMetricsReport(files=files, summary=summary)
+
+    def _apply_fan_in_out(self, files: list[FileMetrics], code_files: list[CodeFile]) -> None:
+        """Compute fan-out (distinct imports) and fan-in (internal importers) per file."""
+        class_owners: dict[str, set[str]] = defaultdict(set)
+        for cf in code_files:
+            for class_name in cf.classes:
+                class_owners[class_name].add(cf.path)
+
+        importers: dict[str, set[str]] = defaultdict(set)
+        for metrics, cf in zip(files, code_files):
+            imports = set(cf.imports)
+            metrics.fan_out = len(imports)
+            for imported in imports:
+                for owner in class_owners.get(imported.rsplit(".", 1)[-1], ()):
+                    if owner != cf.path:
+                        importers[owner].add(cf.path)
+
+        for metrics in files:
+            metrics.fan_in = len(importers.get(metrics.path, ()))
+
+    def _apply_duplication(
+        self, files: list[FileMetrics], blocks_per_file: list[list[tuple[str, list[int]]]]
+    ) -> int:
+        """
+        Mark lines covered by blocks that occur more than once.
+
+        Overlapping windows of one copied region all match, so consecutive
+        duplicated windows are merged into a single region.
+
+        Returns:
+            Number of duplicated regions (every occurrence, including the original)
+        """
+        occurrences = Counter(digest for blocks in blocks_per_file for digest, _ in blocks)
+        duplicated = {digest for digest, count in occurrences.items() if count > 1}
+
+        regions = 0
+        for metrics, blocks in zip(files, blocks_per_file):
+            covered: set[int] = set()
+            in_region = False
+            for digest, line_numbers in blocks:
+                if digest in duplicated:
+                    covered.update(line_numbers)
+                    regions += not in_region
+                    in_region = True
+                else:
+                    in_region = False
+            metrics.duplicated_lines = len(covered)
+
+        return regions
+
+    def _summarize(self, files: list[FileMetrics], duplicated_regions: int) -> dict[str, Any]:
+        """Build a compact summary suitable for prompts and activity results."""
+        total_loc = sum(f.loc for f in files)
+        comment_lines = sum(f.comment_lines for f in files)
+        methods = [(f.path, m) for f in files for m in f.methods]
+        complexities = [m.complexity for _, m in methods]
+        duplicated_lines = sum(f.duplicated_lines for f in files)
+
+        table_files: Counter[str] = Counter()
+        for f in files:
+            table_files.update(f.sql_tables.keys())
+
+        complex_methods = sorted(
+            (pm for pm in methods if pm[1].complexity >= self.complexity_threshold),
+            key=lambda pm: pm[1].complexity,
+            reverse=True,
+        )[: self.top_n]
+
+        undocumented = sorted(
+            (f for f in files if f.loc >= 200 and f.comment_ratio < 0.05),
+            key=lambda f: f.loc,
+            reverse=True,
+        )[: self.top_n]
+
+        return {
+            "file_count": len(files),
+            "total_loc": total_loc,
+            "comment_lines": comment_lines,
+            "comment_ratio": _ratio(comment_lines, total_loc + comment_lines),
+            "method_count": len(methods),
+            "avg_complexity": round(sum(complexities) / len(complexities), 1) if complexities else 0,
+            "max_complexity": max(complexities, default=0),
+            "complex_methods": [
+                {"file": path, "method": m.name, "complexity": m.complexity, "lines": m.line_count}
+                for path, m in complex_methods
+            ],
+            "undocumented_files": [
+                {"file": f.path, "loc": f.loc, "comment_ratio": f.comment_ratio}
+                for f in undocumented
+            ],
+            "top_fan_in": [
+                {"file": f.path, "fan_in": f.fan_in}
+                for f in sorted(files, key=lambda f: f.fan_in, reverse=True)[: self.top_n]
+                if f.fan_in > 0
+            ],
+            "top_fan_out": [
+                {"file": f.path, "fan_out": f.fan_out}
+                for f in sorted(files, key=lambda f: f.fan_out, reverse=True)[: self.top_n]
+                if f.fan_out > 0
+            ],
+            "table_touches": dict(table_files.most_common(self.top_n * 2)),
+            "duplicated_regions": duplicated_regions,
+            "duplicated_lines": duplicated_lines,
+            "duplication_ratio": _ratio(duplicated_lines, total_loc),
+        }
+
+
+def _ratio(part: int, total: int) -> float:
+    """Safe rounded ratio."""
+    return round(part / total, 3) if total else 0.0
+
+
+def _measure_file(job: tuple[str, str, str, int]) -> tuple[FileMetrics, list[tuple[str, list[int]]]]:
+    """
+    Measure a single file (runs in a worker process).
+
+    Args:
+        job: Tuple of (path, language, content, duplicate window)
+
+    Returns:
+        Tuple of (FileMetrics, list of (block digest, covered line numbers))
+    """
+    path, language, content, window = job
+    lines = content.splitlines()
+    code_lines, comment_lines, blank_lines = _classify_lines(lines, language)
+
+    if language in _BRACE_LANGUAGES:
+        methods = _brace_method_metrics(content)
+    elif language == "python":
+        methods = _python_method_metrics(content)
+    else:
+        methods = []
+
+    extractor = CodeExtractor()
+    if language == "sql":
+        tables = extractor.extract_sql_tables(content)
+    elif language in _BRACE_LANGUAGES:
+        tables = [t for s in _JAVA_STRING.findall(content) for t in extractor.extract_sql_tables(s)]
+    else:
+        tables = []
+
+    metrics = FileMetrics(
+        path=path,
+        language=language,
+        loc=len(code_lines),
+        comment_lines=comment_lines,
+        blank_lines=blank_lines,
+        comment_ratio=_ratio(comment_lines, len(code_lines) + comment_lines),
+        methods=methods,
+        sql_tables=dict(Counter(tables)),
+    )
+
+    return metrics, _block_digests(code_lines, window)
+
+
+def _classify_lines(lines: list[str], language: str) -> tuple[list[tuple[int, str]], int, int]:
+    """Split lines into (line number, normalized code), comment count and blank count."""
+    line_comment = {"python": "#", "properties": "#", "sql": "--"}.get(language, "//")
+    code_lines: list[tuple[int, str]] = []
+    comment_count = 0
+    blank_count = 0
+    in_block = False
+
+    for number, raw in enumerate(lines, 1):
+        line = raw.strip()
+        if not line:
+            blank_count += 1
+            continue
+        if in_block:
+            comment_count += 1
+            in_block = "*/" not in line
+            continue
+        if line.startswith(line_comment):
+            comment_count += 1
+            continue
+        if line.startswith("/*") and language != "python":
+            comment_count += 1
+            in_block = "*/" not in line
+            continue
+        code_lines.append((number, " ".join(line.split())))
+
+    return code_lines, comment_count, blank_count
+
+
+def _brace_method_metrics(content: str) -> list[MethodMetrics]:
+    """Compute per-method complexity for brace-delimited languages."""
+    # Blank out comments and literals, keeping offsets, so braces and keywords are real code
+    code = _C_COMMENT_OR_STRING.sub(lambda m: re.sub(r"[^\n]", " ", m.group(0)), content)
+    methods: list[MethodMetrics] = []
+
+    for match in _JAVA_METHOD.finditer(code):
+        name = match.group(1)
+        if name in {"if", "for", "while", "switch", "catch", "synchronized"}:
+            continue
+        body_start = match.end() - 1
+        body_end = _matching_brace(code, body_start)
+        body = code[body_start:body_end]
+        methods.append(
+            MethodMetrics(
+                name=name,
+                complexity=1 + len(_C_DECISION.findall(body)),
+                line_count=body.count("\n") + 1,
+            )
+        )
+
+    return methods
+
+
+def _matching_brace(code: str, open_index: int) -> int:
+    """Return the index just past the brace matching code[open_index]."""
+    depth = 0
+    for index in range(open_index, len(code)):
+        char = code[index]
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    return len(code)
+
+
+def _python_method_metrics(content: str) -> list[MethodMetrics]:
+    """Compute per-function complexity for Python using indentation."""
+    lines = content.splitlines()
+    methods: list[MethodMetrics] = []
+
+    for match in _PYTHON_DEF.finditer(content):
+        indent = len(match.group(1))
+        start = content.count("\n", 0, match.start())
+        end = start + 1
+        while end < len(lines):
+            line = lines[end]
+            if line.strip() and len(line) - len(line.lstrip()) <= indent:
+                break
+            end += 1
+        body = "\n".join(re.sub(r"#.*", "", line) for line in lines[start:end])
+        methods.append(
+            MethodMetrics(
+                name=match.group(2),
+                complexity=1 + len(_PYTHON_DECISION.findall(body)),
+                line_count=end - start,
+            )
+        )
+
+    return methods
+
+
+def _block_digests(code_lines: list[tuple[int, str]], window: int) -> list[tuple[str, list[int]]]:
+    """Hash every window of consecutive non-trivial code lines."""
+    meaningful = [(n, text) for n, text in code_lines if text not in _TRIVIAL_LINES]
+    digests: list[tuple[str, list[int]]] = []
+
+    for start in range(len(meaningful) - window + 1):
+        block = meaningful[start : start + window]
+        digest = hashlib.blake2b(
+            "\n".join(text for _, text in block).encode("utf-8"), digest_size=8
+        ).hexdigest()
+        digests.append((digest, [n for n, _ in block]))
+
+    return digests
@@ -0,0 +1,312 @@
+"""
+Parser for NetBeans/Swing ``.form`` definition files.
+
+The GUI builder stores each form as XML describing every component, its
+properties, layout constraints and bound event handlers. Parsing it gives an
+exact UI component inventory without any vision calls.
+"""
+
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+from typing import Any
+
+from src.utils.logging_config import get_logger
+from src.utils.serialization import to_dict_safe
+
+logger = get_logger(__name__)
+
+# Simple Swing/AWT class names (without the leading "J") to UI element types
+_ELEMENT_TYPES = {
+    "Button": "button",
+    "ToggleButton": "button",
+    "TextField": "input",
+    "FormattedTextField": "input",
+    "PasswordField": "input",
+    "TextArea": "textarea",
+    "EditorPane": "textarea",
+    "TextPane": "textarea",
+    "ComboBox": "dropdown",
+    "Choice": "dropdown",
+    "List": "list",
+    "Table": "table",
+    "Tree": "tree",
+    "Label": "label",
+    "CheckBox": "checkbox",
+    "CheckBoxMenuItem": "checkbox",
+    "RadioButton": "radio",
+    "RadioButtonMenuItem": "radio",
+    "Spinner": "spinner",
+    "Slider": "slider",
+    "ProgressBar": "progress",
+    "TabbedPane": "tabs",
+    "MenuBar": "menu",
+    "Menu": "menu",
+    "MenuItem": "menu_item",
+    "PopupMenu": "menu",
+    "ToolBar": "toolbar",
+    "Panel": "panel",
+    "ScrollPane": "panel",
+    "SplitPane": "panel",
+    "LayeredPane": "panel",
+    "InternalFrame": "panel",
+    "Separator": "separator",
+    "ButtonGroup": "button_group",
+}
+
+# Component properties reported as field constraints
+_CONSTRAINT_PROPERTIES = {
+    "editable",
+    "enabled",
+    "visible",
+    "columns",
+    "rows",
+    "maximum",
+    "minimum",
+    "toolTipText",
+    "inputVerifier",
+    "formatterFactory",
+    "selectionMode",
+    "echoChar",
+}
+
+_FORM_TYPES = {
+    "JDialogFormInfo": "dialog",
+    "DialogFormInfo": "dialog",
+    "JInternalFrameFormInfo": "dialog",
+    "JFrameFormInfo": "form",
+    "FrameFormInfo": "form",
+    "JPanelFormInfo": "panel",
+    "PanelFormInfo": "panel",
+    "JAppletFormInfo": "form",
+}
+
+_INPUT_TYPES = {"input", "textarea", "dropdown", "list", "checkbox", "radio", "spinner", "slider"}
+
+
+@dataclass
+class FormComponent:
+    """A component declared in a form definition."""
+
+    name: str
+    component_class: str
+    element_type: str
+    label: str = ""
+    parent: str | None = None
+    depth: int = 0
+    layout: str | None = None
+    events: dict[str, str] = field(default_factory=dict)
+    constraints: dict[str, str] = field(default_factory=dict)
+    options: list[str] = field(default_factory=list)
+
+
+@dataclass
+class FormDefinition:
+    """A parsed ``.form`` file."""
+
+    source_file: str
+    form_type: str
+    title: str
+    layout: str | None = None
+    components: list[FormComponent] = field(default_factory=list)
+
+    @property
+    def screen_name(self) -> str:
+        """Human-readable screen name."""
+        return self.title or PurePosixPath(self.source_file).stem
+
+
+@dataclass
+class FormInventory:
+    """Component inventory across all form definitions of a form."""
+
+    forms: list[FormDefinition] = field(default_factory=list)
+
+    def component_counts(self) -> dict[str, int]:
+        """Count components by element type."""
+        counts: dict[str, int] = {}
+        for form in self.forms:
+            for component in form.components:
+                counts[component.element_type] = counts.get(component.element_type, 0) + 1
+        return counts
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize for activity results."""
+        return {"forms": [to_dict_safe(form) for form in self.forms]}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any] | None) -> "FormInventory":
+        """Rebuild an inventory from its serialized form."""
+        forms = []
+        for form in (data or {}).get("forms", []):
+            components = [FormComponent(**c) for c in form.get("components", [])]
+            forms.append(
+                FormDefinition(
+                    source_file=form.get("source_file", ""),
+                    form_type=form.get("form_type", "form"),
+                    title=form.get("title", ""),
+                    layout=form.get("layout"),
+                    components=components,
+                )
+            )
+        return cls(forms=forms)
+
+
+class FormDefinitionParser:
+    """
+    Parses NetBeans GUI builder ``.form`` XML into a FormDefinition.
+
+    Usage:
+        parser = FormDefinitionParser()
+        definition = parser.parse(xml_text, source_file="ui/CustomerForm.form")
+    """
+
+    def parse(self, content: str, source_file: str = "") -> FormDefinition | None:
+        """
+        Parse a form definition.
+
+        Args:
+            content: ``.form`` XML text
+            source_file: Path of the file the XML came from
+
+        Returns:
+            FormDefinition, or None when the XML is not a form definition
+        """
+        try:
+            root = ET.fromstring(content.encode("utf-8"))
+        except ET.ParseError as e:
+            logger.warning("Failed to parse form definition", source_file=source_file, error=str(e))
+            return None
+
+        if root.tag != "Form":
+            return None
+
+        form_info = root.get("type", "").rsplit(".", 1)[-1]
+        properties = _read_properties(root)
+        definition = FormDefinition(
+            source_file=source_file,
+            form_type=_FORM_TYPES.get(form_info, "form"),
+            title=properties.get("title", ""),
+            layout=_layout_name(root),
+        )
+
+        for section in ("NonVisualComponents", "SubComponents"):
+            container = root.find(section)
+            if container is not None:
+                self._walk(container, definition, parent=None, depth=0)
+
+        self._apply_label_for(root, definition)
+        return definition
+
+    def _walk(
+        self, container: ET.Element, definition: FormDefinition, parent: str | None, depth: int
+    ) -> None:
+        """Collect components recursively, recording the layout hierarchy."""
+        for element in container:
+            if element.tag not in ("Component", "Container", "Menu", "MenuItem"):
+                continue
+
+            component_class = element.get("class", "")
+            properties = _read_properties(element)
+            component = FormComponent(
+                name=element.get("name", ""),
+                component_class=component_class,
+                element_type=_element_type(component_class),
+                label=properties.get("text") or properties.get("title") or _border_title(element),
+                parent=parent,
+                depth=depth,
+                layout=_layout_name(element),
+                events={
+                    handler.get("event", ""): handler.get("handler", "")
+                    for handler in element.findall("Events/EventHandler")
+                },
+                constraints={
+                    name: value for name, value in properties.items() if name in _CONSTRAINT_PROPERTIES
+                },
+                options=_read_options(element),
+            )
+            definition.components.append(component)
+
+            children = element.find("SubComponents")
+            if children is not None:
+                self._walk(children, definition, parent=component.name, depth=depth + 1)
+
+    def _apply_label_for(self, root: ET.Element, definition: FormDefinition) -> None:
+        """Label unlabeled inputs using ``labelFor`` references and adjacent labels."""
+        by_name = {c.name: c for c in definition.components}
+
+        for element in root.iter("Component"):
+            for prop in element.findall("Properties/Property"):
+                if prop.get("name") != "labelFor":
+                    continue
+                ref = prop.find("ComponentRef")
+                label = by_name.get(element.get("name", ""))
+                target = by_name.get(ref.get("name", "")) if ref is not None else None
+                if label and target and not target.label:
+                    target.label = label.label
+
+        # GUI builder forms usually declare each label right before its field
+        previous: FormComponent | None = None
+        for component in definition.components:
+            if (
+                component.element_type in _INPUT_TYPES
+                and not component.label
+                and previous is not None
+                and previous.element_type == "label"
+                and previous.parent == component.parent
+            ):
+                component.label = previous.label.rstrip(": ")
+            previous = component
+
+
+def _element_type(component_class: str) -> str:
+    """Map a component class to a UI element type."""
+    simple = component_class.rsplit(".", 1)[-1]
+    if simple.startswith("J") and simple[1:2].isupper():
+        simple = simple[1:]
+    return _ELEMENT_TYPES.get(simple, simple.lower() or "unknown")
+
+
+def _read_properties(element: ET.Element) -> dict[str, str]:
+    """Read the simple-valued properties of a component."""
+    properties: dict[str, str] = {}
+    for prop in element.findall("Properties/Property"):
+        name = prop.get("name", "")
+        value = prop.get("value")
+        if value is None:
+            resource = prop.find("ResourceString")
+            if resource is not None:
+                value = resource.get("key")
+        if value is not None:
+            properties[name] = value
+    return properties
+
+
+def _read_options(element: ET.Element) -> list[str]:
+    """Read combo/list model items and table column titles."""
+    options = [
+        item.get("value", "")
+        for item in element.findall("Properties/Property/StringArray/StringItem")
+    ]
+    options.extend(
+        column.get("title", "") for column in element.findall("Properties/Property/Table/Column")
+    )
+    return [option for option in options if option]
+
+
+def _border_title(element: ET.Element) -> str:
+    """Title of a titled border, commonly used to caption panels."""
+    border = element.find("Properties/Property/Border/TitledBorder")
+    return border.get("title", "") if border is not None else ""
+
+
+def _layout_name(element: ET.Element) -> str | None:
+    """Name of the layout manager used by a container."""
+    layout = element.find("Layout")
+    if layout is None:
+        return None
+    layout_class = layout.get("class")
+    if not layout_class:
+        return "GroupLayout"
+    return layout_class.rsplit(".", 1)[-1].removeprefix("Design")
+
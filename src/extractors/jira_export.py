@@ -0,0 +1,352 @@
+"""
+Offline Jira export ingestion.
+
+Full XML (RSS) or JSON exports of a project are much faster to obtain than
+paging a large historical backlog through the REST API. Exports are streamed
+with incremental parsers, mapped to the REST issue shape so the regular
+JiraExtractor parsing applies, and indexed once in SQLite by label, summary
+token and component for form matching.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import xml.etree.ElementTree as ET
+from collections.abc import Callable, Iterator
+from contextlib import closing, contextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any
+
+from src.config.settings import get_settings
+from src.extractors.jira_extractor import JiraIssue
+from src.utils.file_utils import ensure_directory
+from src.utils.logging_config import ExecutionTimer, get_logger
+
+logger = get_logger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_]+")
+_ISSUES_ARRAY_PATTERN = re.compile(r'"issues"\s*:\s*\[')
+_SEPARATOR_PATTERN = re.compile(r"[\s,]*")
+_READ_CHUNK_SIZE = 1024 * 1024
+_INSERT_BATCH_SIZE = 500
+
+
+def iter_export_issues(path: str | Path) -> Iterator[dict[str, Any]]:
+    """
+    Stream raw issues from a Jira export in the REST API issue shape.
+
+    Supports the XML (RSS) export, JSON search results (``{"issues": [...]}``
+    or a top-level array) and JSON Lines with one issue per line.
+
+    Args:
+        path: Path to the export file
+
+    Yields:
+        Issue dictionaries with ``key`` and ``fields``
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        head = f.read(512).lstrip()
+
+    if head.startswith(b"<"):
+        yield from _iter_xml_issues(path)
+    else:
+        yield from _iter_json_issues(path)
+
+
+def _iter_xml_issues(path: Path) -> Iterator[dict[str, Any]]:
+    """Stream ``<item>`` elements of an RSS export, clearing each after use."""
+    for _, element in ET.iterparse(path, events=("end",)):
+        if element.tag == "item":
+            yield _xml_item_to_issue(element)
+            element.clear()
+
+
+def _xml_item_to_issue(item: ET.Element) -> dict[str, Any]:
+    """Map an RSS ``<item>`` to the REST issue shape."""
+
+    def text(tag: str) -> str:
+        return (item.findtext(tag) or "").strip()
+
+    fields: dict[str, Any] = {
+        "summary": text("summary"),
+        "description": text("description"),
+        "issuetype": {"name": text("type")},
+        "status": {"name": text("status")},
+        "priority": {"name": text("priority")},
+        "created": _rss_date(text("created")),
+        "updated": _rss_date(text("updated")),
+        "labels": [label.text.strip() for label in item.iter("label") if label.text],
+        "components": [{"name": c.text.strip()} for c in item.findall("component") if c.text],
+        "attachment": [
+            {"filename": a.get("name"), "size": a.get("size")}
+            for a in item.iter("attachment")
+        ],
+        "comment": {
+            "comments": [
+                {
+                    "author": {"displayName": c.get("author", "")},
+                    "body": (c.text or "").strip(),
+                    "created": c.get("created", ""),
+                }
+                for c in item.iter("comment")
+            ]
+        },
+    }
+
+    for custom_field in item.iter("customfield"):
+        field_id = custom_field.get("id", "")
+        values = [v.text.strip() for v in custom_field.iter("customfieldvalue") if v.text]
+        if field_id and values:
+            fields[field_id] = _custom_value(values[0]) if len(values) == 1 else values
+
+    return {"key": text("key"), "fields": fields}
+
+
+def _rss_date(value: str) -> str:
+    """Convert an RSS date (RFC 2822) to ISO 8601."""
+    try:
+        return parsedate_to_datetime(value).isoformat()
+    except (TypeError, ValueError):
+        return value
+
+
+def _custom_value(value: str) -> Any:
+    """Numbers in custom fields (e.g. story points) as floats."""
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _iter_json_issues(path: Path) -> Iterator[dict[str, Any]]:
+    """Stream issue objects from a JSON Lines or JSON export."""
+    if path.suffix.lower() in (".jsonl", ".ndjson"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    yield from _iter_json_array(path)
+
+
+def _iter_json_array(path: Path) -> Iterator[dict[str, Any]]:
+    """
+    Stream the elements of the issue array of a JSON export.
+
+    The file is read in chunks and each element is decoded on its own, so
+    memory stays bounded by the chunk size and the largest issue rather than
+    the size of the export.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer = ""
+        position = None
+        while position is None:
+            chunk = f.read(_READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            buffer += chunk
+            stripped = buffer.lstrip()
+            if stripped.startswith("["):
+                position = len(buffer) - len(stripped) + 1
+            elif match := _ISSUES_ARRAY_PATTERN.search(buffer):
+                position = match.end()
+
+        while True:
+            position = _SEPARATOR_PATTERN.match(buffer, position).end()
+            if buffer.startswith("]", position):
+                return
+            try:
+                issue, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Element continues in the next chunk
+                chunk = f.read(_READ_CHUNK_SIZE)
+                if not chunk:
+                    raise
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield issue
+
+
+class JiraExportIndex:
+    """
+    On-disk index of the issues in a Jira export file.
+
+    Usage:
+        index = JiraExportIndex("jira-export.xml")
+        index.build(extractor._parse_issue)  # no-op when already indexed
+        issues = index.find("le01", project_key="LE")
+    """
+
+    SCHEMA_VERSION = 2
+
+    def __init__(self, export_path: str | Path, index_dir: str | Path | None = None) -> None:
+        """
+        Initialize the index for an export file.
+
+        Args:
+            export_path: Path to the XML or JSON export
+            index_dir: Optional directory for index files (defaults to <cache_dir>/jira_export)
+        """
+        settings = get_settings()
+        self.export_path = Path(export_path)
+        self.index_dir = ensure_directory(index_dir or Path(settings.cache_dir) / "jira_export")
+
+    @property
+    def db_path(self) -> Path:
+        """Index file, keyed by the export's path, size and modification time."""
+        stat = self.export_path.stat()
+        raw = f"{self.export_path.resolve()}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+        return self.index_dir / f"{digest}-v{self.SCHEMA_VERSION}.sqlite"
+
+    def exists(self) -> bool:
+        """Check whether the export has already been indexed."""
+        return self.db_path.exists()
+
+    def build(
+        self, parse_issue: Callable[[dict[str, Any]], JiraIssue | None], force: bool = False
+    ) -> Path:
+        """
+        Stream the export into the index.
+
+        The index is written to a temporary file and atomically moved into
+        place, so concurrent workers never observe a partial index.
+
+        Args:
+            parse_issue: Maps a raw REST-shaped issue to a JiraIssue (JiraExtractor._parse_issue)
+            force: Rebuild even if an index already exists
+
+        Returns:
+            Path to the index file
+        """
+        db_path = self.db_path
+        if not force and db_path.exists():
+            return db_path
+
+        timer = ExecutionTimer()
+        tmp_path = db_path.with_suffix(f".tmp-{os.getpid()}")
+        tmp_path.unlink(missing_ok=True)
+
+        issue_count = 0
+        conn = sqlite3.connect(tmp_path)
+        try:
+            self._create_schema(conn)
+            issue_rows: list[tuple[str, str, str]] = []
+            term_rows: list[tuple[str, str]] = []
+
+            for raw_issue in iter_export_issues(self.export_path):
+                issue = parse_issue(raw_issue)
+                if issue is None or not issue.key:
+                    continue
+                project = issue.key.rsplit("-", 1)[0]
+                issue_rows.append((issue.key, project, json.dumps(issue.to_dict())))
+                term_rows.extend((term, issue.key) for term in self._terms(issue))
+                issue_count += 1
+
+                if len(issue_rows) >= _INSERT_BATCH_SIZE:
+                    self._insert(conn, issue_rows, term_rows)
+                    issue_rows, term_rows = [], []
+
+            self._insert(conn, issue_rows, term_rows)
+            conn.commit()
+        finally:
+            conn.close()
+
+        os.replace(tmp_path, db_path)
+
+        logger.info(
+            "Indexed Jira export",
+            export=str(self.export_path),
+            issue_count=issue_count,
+            duration_ms=round(timer.elapsed_ms(), 2),
+        )
+        return db_path
+
+    def find(self, form_name: str, project_key: str | None = None) -> list[JiraIssue]:
+        """
+        Find the issues of a form, mirroring the live form JQL.
+
+        Matches issues labelled with the form name, or whose summary or
+        components contain every token of it.
+
+        Args:
+            form_name: Name of the form (e.g., 'le01')
+            project_key: Optional project key filter
+
+        Returns:
+            Matching issues, most recently updated first
+        """
+        tokens = sorted(set(_TOKEN_PATTERN.findall(form_name.lower())))
+        subqueries = ["SELECT key FROM terms WHERE term = ?"]
+        params: list[Any] = [f"label:{form_name.lower()}"]
+        for kind in ("summary", "component") if tokens else ():
+            # A multi-token name such as "user-admin" must match all of its tokens
+            placeholders = ", ".join("?" for _ in tokens)
+            subqueries.append(
+                f"SELECT key FROM terms WHERE term IN ({placeholders}) "
+                "GROUP BY key HAVING COUNT(DISTINCT term) = ?"
+            )
+            params.extend(f"{kind}:{token}" for token in tokens)
+            params.append(len(tokens))
+
+        query = f"SELECT i.data FROM issues i WHERE i.key IN ({' UNION '.join(subqueries)})"
+        if project_key:
+            query += " AND i.project = ?"
+            params.append(project_key)
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        issues = [JiraIssue.from_dict(json.loads(row[0])) for row in rows]
+        issues.sort(key=lambda issue: issue.updated, reverse=True)
+        return issues
+
+    # ========== Internal Helpers ==========
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection to the index and close it afterwards."""
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            yield conn
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Create the index tables."""
+        conn.executescript(
+            """
+            CREATE TABLE issues (
+                key TEXT PRIMARY KEY,
+                project TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE terms (
+                term TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (term, key)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def _insert(
+        self,
+        conn: sqlite3.Connection,
+        issue_rows: list[tuple[str, str, str]],
+        term_rows: list[tuple[str, str]],
+    ) -> None:
+        """Insert a batch of issues and their index terms."""
+        conn.executemany("INSERT OR REPLACE INTO issues VALUES (?, ?, ?)", issue_rows)
+        conn.executemany("INSERT OR IGNORE INTO terms VALUES (?, ?)", term_rows)
+
+    def _terms(self, issue: JiraIssue) -> set[str]:
+        """Index terms of an issue: labels, summary tokens and component tokens."""
+        terms = {f"label:{label.lower()}" for label in issue.labels}
+        terms.update(f"summary:{t}" for t in _TOKEN_PATTERN.findall(issue.summary.lower()))
+        for component in issue.components:
+            terms.update(f"component:{t}" for t in _TOKEN_PATTERN.findall(component.lower()))
+        return terms
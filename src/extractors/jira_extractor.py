@@ -2,15 +2,24 @@
 Jira Extractor for retrieving documentation and requirements from Atlassian Jira.
 """
 
-from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Any
+import math
+import sqlite3
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from dataclasses import fields as dataclass_fields
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING, Any
 
 from atlassian import Jira
 from langchain_core.documents import Document
 
 from src.config.settings import get_settings
-from src.utils.logging_config import get_logger
+from src.extractors.jira_text import JiraTextNormalizer
+from src.utils.logging_config import ExecutionTimer, get_logger
+
+if TYPE_CHECKING:
+    from src.extractors.jira_store import JiraIssueStore
 
 logger = get_logger(__name__)
 
@@ -35,6 +44,24 @@ class JiraIssue:
     acceptance_criteria: str = ""
     story_points: float | None = None
     epic_link: str | None = None
+    changelog: list[dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize to JSON-compatible types."""
+        data = asdict(self)
+        data["created"] = self.created.isoformat()
+        data["updated"] = self.updated.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "JiraIssue":
+        """Rebuild from to_dict() output or a Temporal-serialized issue."""
+        valid_fields = {f.name for f in dataclass_fields(cls)}
+        values = {k: v for k, v in data.items() if k in valid_fields}
+        for name in ("created", "updated"):
+            if isinstance(values.get(name), str):
+                values[name] = datetime.fromisoformat(values[name])
+        return cls(**values)
 
 
 @dataclass
@@ -49,16 +76,47 @@ class JiraRequirement:
     acceptance_criteria: list[str]
 
 
+@dataclass
+class JiraSyncResult:
+    """Outcome of syncing a form's issues into the local store."""
+
+    issues: list[JiraIssue]
+    fetched: int
+    deleted: int
+    full: bool
+    deletion_checked: bool
+
+
 class JiraExtractor:
     """
     Extracts requirements and documentation from Jira for a given form.
     Supports querying by form name, labels, or custom JQL.
     """
 
+    # Fields read by _parse_issue; searches request only these
+    ISSUE_FIELDS = [
+        "summary",
+        "description",
+        "issuetype",
+        "status",
+        "priority",
+        "created",
+        "updated",
+        "labels",
+        "components",
+        "attachment",
+        "comment",
+        "customfield_10014",  # Epic link
+        "customfield_10020",  # Story points
+    ]
+
     def __init__(self) -> None:
         """Initialize the Jira extractor."""
         self.settings = get_settings()
         self._client: Jira | None = None
+        self._store: JiraIssueStore | None = None
+        self._custom_text_fields: dict[str, str] | None = None
+        self.normalizer = JiraTextNormalizer()
 
     @property
     def client(self) -> Jira:
@@ -72,12 +130,22 @@ class JiraExtractor:
             logger.info("Connected to Jira", url=self.settings.jira.url)
         return self._client
 
+    @property
+    def store(self) -> "JiraIssueStore":
+        """Get or create the local issue store."""
+        if self._store is None:
+            from src.extractors.jira_store import JiraIssueStore
+
+            self._store = JiraIssueStore()
+        return self._store
+
     def get_form_issues(
         self,
         form_name: str,
         project_key: str | None = None,
         additional_jql: str | None = None,
-        max_results: int = 100,
+        max_results: int | None = None,
+        include_changelog: bool = False,
     ) -> list[JiraIssue]:
         """
         Retrieve all Jira issues related to a form.
@@ -86,14 +154,242 @@ class JiraExtractor:
             form_name: Name of the form (e.g., 'le01')
             project_key: Optional project key (defaults to configured project)
             additional_jql: Optional additional JQL conditions
-            max_results: Maximum number of results
+            max_results: Optional maximum number of results (all matches by default)
+            include_changelog: Whether to fetch each issue's change history
+
+        Returns:
+            List of JiraIssue objects
+        """
+        jql = self.build_form_jql(form_name, project_key, additional_jql)
+
+        logger.info("Querying Jira", jql=jql)
+
+        try:
+            issues: list[JiraIssue] = []
+
+            for issue_data in self._search(
+                jql, max_results=max_results, expand="changelog" if include_changelog else None
+            ):
+                issue = self._parse_issue(issue_data)
+                if issue:
+                    issues.append(issue)
+
+            self.normalizer.dedupe_comments(issues)
+            logger.info(
+                "Retrieved Jira issues",
+                form_name=form_name,
+                count=len(issues),
+                **self.text_stats,
+            )
+
+            return issues
+
+        except Exception as e:
+            logger.error("Failed to query Jira", error=str(e))
+            raise
+
+    def sync_form_issues(
+        self,
+        form_name: str,
+        project_key: str | None = None,
+        additional_jql: str | None = None,
+        full: bool = False,
+    ) -> JiraSyncResult:
+        """
+        Bring the local store up to date for a form and return its issues.
+
+        The first sync fetches every matching issue. Later syncs only fetch
+        issues updated since the previous sync (plus a small overlap), and
+        every JIRA_DELETION_CHECK_HOURS list the matching keys to drop issues
+        that were deleted or no longer match.
+
+        Args:
+            form_name: Name of the form (e.g., 'le01')
+            project_key: Optional project key (defaults to configured project)
+            additional_jql: Optional additional JQL conditions
+            full: Re-fetch every issue instead of syncing incrementally
+
+        Returns:
+            JiraSyncResult with all stored issues of the form
+        """
+        timer = ExecutionTimer()
+        jira_settings = self.settings.jira
+        jql = self.build_form_jql(form_name, project_key, additional_jql)
+        scope = self.store.scope_for(jql)
+        state = self.store.get_sync_state(scope)
+        started_at = datetime.now(UTC)
+
+        full = full or state is None
+        deletion_checked = full or (
+            started_at - state["last_full_sync"]
+            >= timedelta(hours=jira_settings.deletion_check_hours)
+        )
+
+        if full:
+            changed = self._parse_issues(self._search(jql))
+            self.store.upsert(scope, changed)
+            deleted = self.store.retain(scope, [issue.key for issue in changed])
+        else:
+            # Relative dates avoid depending on the Jira user's time zone
+            minutes = (
+                math.ceil((started_at - state["last_sync"]).total_seconds() / 60)
+                + jira_settings.sync_overlap_minutes
+            )
+            changed = self._parse_issues(self._search(f"({jql}) AND updated >= -{minutes}m"))
+            self.store.upsert(scope, changed)
+            deleted = 0
+            if deletion_checked:
+                keys = [data.get("key", "") for data in self._search(jql, fields=["key"])]
+                deleted = self.store.retain(scope, keys)
+
+        self.store.mark_synced(scope, jql, started_at, full=deletion_checked)
+        issues = self.store.get_issues(scope)
+        self.normalizer.dedupe_comments(issues)
+
+        logger.info(
+            "Synced Jira issues",
+            form_name=form_name,
+            full=full,
+            fetched=len(changed),
+            deleted=deleted,
+            stored=len(issues),
+            duration_ms=round(timer.elapsed_ms(), 2),
+        )
+
+        return JiraSyncResult(
+            issues=issues,
+            fetched=len(changed),
+            deleted=deleted,
+            full=full,
+            deletion_checked=deletion_checked,
+        )
+
+    def get_export_issues(
+        self, export_path: str, form_name: str, project_key: str | None = None
+    ) -> list[JiraIssue]:
+        """
+        Retrieve a form's issues from an offline XML or JSON export.
+
+        The export is streamed into an on-disk index on first use; later
+        calls only query the index.
+
+        Args:
+            export_path: Path to the Jira export file
+            form_name: Name of the form (e.g., 'le01')
+            project_key: Optional project key (defaults to configured project)
 
         Returns:
             List of JiraIssue objects
         """
+        from src.extractors.jira_export import JiraExportIndex
+
+        index = JiraExportIndex(export_path)
+        index.build(self._parse_issue)
+        issues = index.find(form_name, project_key or self.settings.jira.project_key)
+        self.normalizer.dedupe_comments(issues)
+
+        logger.info("Retrieved Jira issues from export", form_name=form_name, count=len(issues))
+        return issues
+
+    def resolve_issues(self, ref: dict[str, Any]) -> list[JiraIssue]:
+        """
+        Load the issues behind a reference passed between activities.
+
+        Issues of the "export" source are read back from the export index
+        and those of the "store" source from the local issue store. Keys not
+        available on this host (another worker, or the "api" source, which
+        keeps nothing locally) are fetched from Jira by key.
+
+        Args:
+            ref: Reference with the source, issue keys and scope or export location
+
+        Returns:
+            The referenced issues that could be loaded, in reference order
+        """
+        keys = list(ref.get("keys", []))
+        candidates: list[JiraIssue] = []
+        try:
+            if ref.get("source") == "export":
+                from src.extractors.jira_export import JiraExportIndex
+
+                index = JiraExportIndex(ref["export_path"])
+                index.build(self._parse_issue)
+                candidates = index.find(
+                    ref["form_name"], ref.get("project_key") or self.settings.jira.project_key
+                )
+            elif ref.get("scope"):
+                candidates = self.store.get_issues(ref["scope"])
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(
+                "Local Jira issues unavailable", source=ref.get("source"), error=str(e)
+            )
+
+        by_key = {issue.key: issue for issue in candidates}
+        missing = [key for key in keys if key not in by_key]
+        if missing:
+            by_key.update((issue.key, issue) for issue in self.get_issues_by_keys(missing))
+
+        issues = [by_key[key] for key in keys if key in by_key]
+        self.normalizer.dedupe_comments(issues)
+
+        if len(issues) < len(keys):
+            logger.warning(
+                "Some Jira issue references could not be resolved",
+                source=ref.get("source"),
+                expected=len(keys),
+                resolved=len(issues),
+            )
+        return issues
+
+    def get_issues_by_keys(self, keys: list[str]) -> list[JiraIssue]:
+        """
+        Fetch issues by key, in batches of one search page.
+
+        Args:
+            keys: Issue keys
+
+        Returns:
+            The issues that could be fetched (failures are logged, not raised)
+        """
+        batch_size = max(1, self.settings.jira.page_size)
+        issues: list[JiraIssue] = []
+        try:
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start : start + batch_size]
+                issues.extend(self.search_by_jql(f"key in ({', '.join(batch)})"))
+        except Exception as e:
+            logger.warning("Failed to fetch Jira issues by key", count=len(keys), error=str(e))
+        return issues
+
+    def _parse_issues(self, issues_data: list[dict[str, Any]]) -> list[JiraIssue]:
+        """Parse raw issues, skipping those that fail to parse."""
+        issues = [self._parse_issue(issue_data) for issue_data in issues_data]
+        return [issue for issue in issues if issue is not None]
+
+    @property
+    def text_stats(self) -> dict[str, Any]:
+        """Text normalization statistics of the issues parsed by this extractor."""
+        return self.normalizer.stats.to_dict()
+
+    def build_form_jql(
+        self,
+        form_name: str,
+        project_key: str | None = None,
+        additional_jql: str | None = None,
+    ) -> str:
+        """
+        Build the JQL query matching a form's issues.
+
+        Args:
+            form_name: Name of the form (e.g., 'le01')
+            project_key: Optional project key (defaults to configured project)
+            additional_jql: Optional additional JQL conditions
+
+        Returns:
+            JQL query string
+        """
         project_key = project_key or self.settings.jira.project_key
 
-        # Build JQL query
         jql_parts = []
 
         if project_key:
@@ -106,31 +402,114 @@ class JiraExtractor:
         if additional_jql:
             jql_parts.append(f"({additional_jql})")
 
-        jql = " AND ".join(jql_parts)
+        return " AND ".join(jql_parts)
 
-        logger.info("Querying Jira", jql=jql)
+    @property
+    def custom_text_fields(self) -> dict[str, str]:
+        """
+        Names of the instance's text custom fields by ID, from Jira's field metadata.
 
-        try:
-            results = self.client.jql(
-                jql,
-                limit=max_results,
-                expand="renderedFields,changelog",
-            )
+        _parse_issue reads acceptance criteria and custom_fields from text
+        custom fields, whose IDs differ per instance, so they are looked up
+        once and added to the search projection.
+        """
+        if self._custom_text_fields is None:
+            try:
+                metadata = self.client.get_all_fields() or []
+            except Exception as e:
+                logger.warning("Failed to read Jira field metadata", error=str(e))
+                metadata = []
+            self._custom_text_fields = {
+                field_data["id"]: field_data.get("name", "")
+                for field_data in metadata
+                if isinstance(field_data, dict)
+                and str(field_data.get("id", "")).startswith("customfield_")
+                and (field_data.get("schema") or {}).get("type") == "string"
+            }
+        return self._custom_text_fields
 
-            issues: list[JiraIssue] = []
+    @property
+    def search_fields(self) -> list[str]:
+        """Field projection for searches: parsed fields, text custom fields and extras."""
+        extra = [f.strip() for f in self.settings.jira.extra_fields.split(",") if f.strip()]
+        fields = self.ISSUE_FIELDS + list(self.custom_text_fields)
+        return fields + [f for f in extra if f not in fields]
 
-            for issue_data in results.get("issues", []):
-                issue = self._parse_issue(issue_data)
-                if issue:
-                    issues.append(issue)
+    def _search(
+        self,
+        jql: str,
+        max_results: int | None = None,
+        expand: str | None = None,
+        fields: list[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Run a JQL search across all result pages.
 
-            logger.info("Retrieved Jira issues", form_name=form_name, count=len(issues))
+        Server and Data Center report the total on the first page, so the
+        remaining pages are fetched concurrently by ``startAt``. Jira Cloud
+        pages by token and is fetched sequentially.
 
-            return issues
+        Args:
+            jql: JQL query string
+            max_results: Optional maximum number of issues
+            expand: Optional expand parameter (e.g. "changelog")
+            fields: Optional field projection (defaults to search_fields)
 
-        except Exception as e:
-            logger.error("Failed to query Jira", error=str(e))
-            raise
+        Returns:
+            Raw issue data in result order
+        """
+        fields = fields or self.search_fields
+        page_size = max(1, self.settings.jira.page_size)
+        if max_results is not None:
+            page_size = min(page_size, max_results)
+
+        if self.client.cloud:
+            return self._search_cloud(jql, fields, page_size, max_results, expand)
+
+        first = self.client.jql(jql, fields=fields, start=0, limit=page_size, expand=expand)
+        issues = list(first.get("issues", []))
+        total = first.get("total", len(issues))
+        if max_results is not None:
+            total = min(total, max_results)
+        # The server may cap maxResults below the requested page size
+        page_size = len(issues) or page_size
+
+        starts = list(range(len(issues), total, page_size))
+        if starts:
+            workers = max(1, min(self.settings.jira.fetch_workers, len(starts)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pages = executor.map(
+                    lambda start: self.client.jql(
+                        jql, fields=fields, start=start, limit=page_size, expand=expand
+                    ),
+                    starts,
+                )
+                for page in pages:
+                    issues.extend(page.get("issues", []))
+
+        logger.debug("Fetched JQL pages", pages=len(starts) + 1, total=total, issues=len(issues))
+        return issues[:total]
+
+    def _search_cloud(
+        self,
+        jql: str,
+        fields: list[str],
+        page_size: int,
+        max_results: int | None,
+        expand: str | None,
+    ) -> list[dict[str, Any]]:
+        """Page through Jira Cloud's token-based search."""
+        issues: list[dict[str, Any]] = []
+        token = None
+        while max_results is None or len(issues) < max_results:
+            page = self.client.enhanced_jql(
+                jql, fields=fields, nextPageToken=token, limit=page_size, expand=expand
+            )
+            issues.extend(page.get("issues", []))
+            token = page.get("nextPageToken")
+            if not token or page.get("isLast", False):
+                break
+        return issues[:max_results] if max_results is not None else issues
 
     def _parse_issue(self, issue_data: dict[str, Any]) -> JiraIssue | None:
         """
@@ -168,14 +547,17 @@ class JiraExtractor:
 
             # Extract comments
             comment_data = fields.get("comment", {})
-            comments = [
-                {
-                    "author": c.get("author", {}).get("displayName", ""),
-                    "body": c.get("body", ""),
-                    "created": c.get("created", ""),
-                }
-                for c in comment_data.get("comments", [])
-            ]
+            comments = []
+            for c in comment_data.get("comments", []):
+                body = self.normalizer.normalize_comment(c.get("body", ""))
+                if body:
+                    comments.append(
+                        {
+                            "author": c.get("author", {}).get("displayName", ""),
+                            "body": body,
+                            "created": c.get("created", ""),
+                        }
+                    )
 
             # Extract acceptance criteria (common custom field)
             acceptance_criteria = ""
@@ -184,16 +566,28 @@ class JiraExtractor:
             for key, value in fields.items():
                 if key.startswith("customfield_"):
                     if value and isinstance(value, str):
-                        if "acceptance" in key.lower() or (
-                            isinstance(value, str) and "given" in value.lower()
-                        ):
+                        name = (self._custom_text_fields or {}).get(key, key)
+                        if "acceptance" in name.lower() or "given" in value.lower():
                             acceptance_criteria = value
                         custom_fields[key] = value
 
+            # Change history, present when the search expanded it
+            changelog = [
+                {
+                    "author": history.get("author", {}).get("displayName", ""),
+                    "created": history.get("created", ""),
+                    "field": item.get("field", ""),
+                    "from": item.get("fromString"),
+                    "to": item.get("toString"),
+                }
+                for history in (issue_data.get("changelog") or {}).get("histories", [])
+                for item in history.get("items", [])
+            ]
+
             return JiraIssue(
                 key=issue_data.get("key", ""),
                 summary=fields.get("summary", ""),
-                description=fields.get("description", "") or "",
+                description=self.normalizer.normalize(fields.get("description")),
                 issue_type=fields.get("issuetype", {}).get("name", ""),
                 status=fields.get("status", {}).get("name", ""),
                 priority=fields.get("priority", {}).get("name", ""),
@@ -204,9 +598,10 @@ class JiraExtractor:
                 attachments=attachments,
                 comments=comments,
                 custom_fields=custom_fields,
-                acceptance_criteria=acceptance_criteria,
+                acceptance_criteria=self.normalizer.normalize(acceptance_criteria),
                 story_points=fields.get("customfield_10020"),  # Common story points field
                 epic_link=fields.get("customfield_10014"),  # Common epic link field
+                changelog=changelog,
             )
 
         except Exception as e:
@@ -226,14 +621,12 @@ class JiraExtractor:
             Tuple of (epic issue, list of child issues)
         """
         # Get the epic
-        epic_data = self.client.issue(epic_key, expand="renderedFields")
+        epic_data = self.client.issue(epic_key, fields=",".join(self.search_fields))
         epic = self._parse_issue({"key": epic_key, "fields": epic_data.get("fields", {})})
 
         # Get child issues
         jql = f'"Epic Link" = {epic_key}'
-        results = self.client.jql(jql, limit=200)
-
-        children = [self._parse_issue(issue_data) for issue_data in results.get("issues", [])]
+        children = [self._parse_issue(issue_data) for issue_data in self._search(jql)]
         children = [c for c in children if c is not None]
 
         return epic, children
@@ -290,18 +683,18 @@ class JiraExtractor:
             acceptance_criteria=acceptance_criteria,
         )
 
-    def to_documents(self, issues: list[JiraIssue], form_name: str) -> list[Document]:
+    def to_documents(self, issues: Iterable[JiraIssue], form_name: str) -> Iterator[Document]:
         """
         Convert Jira issues to LangChain Documents.
 
         Args:
-            issues: List of Jira issues
+            issues: Iterable of Jira issues
             form_name: Name of the form
 
-        Returns:
-            List of LangChain Documents
+        Yields:
+            LangChain Documents, one per issue
         """
-        documents: list[Document] = []
+        count = 0
 
         for issue in issues:
             content_parts = [
@@ -341,29 +734,28 @@ class JiraExtractor:
                 "doc_type": "jira",
             }
 
-            document = Document(
+            count += 1
+            yield Document(
                 page_content="\n".join(content_parts),
                 metadata=metadata,
             )
-            documents.append(document)
-
-        logger.info("Converted Jira issues to documents", count=len(documents))
 
-        return documents
+        logger.info("Converted Jira issues to documents", count=count)
 
-    def search_by_jql(self, jql: str, max_results: int = 100) -> list[JiraIssue]:
+    def search_by_jql(self, jql: str, max_results: int | None = None) -> list[JiraIssue]:
         """
         Search Jira using custom JQL.
 
         Args:
             jql: JQL query string
-            max_results: Maximum results
+            max_results: Optional maximum results (all matches by default)
 
         Returns:
             List of JiraIssue objects
         """
-        results = self.client.jql(jql, limit=max_results)
-
-        issues = [self._parse_issue(issue_data) for issue_data in results.get("issues", [])]
+        issues = [
+            self._parse_issue(issue_data)
+            for issue_data in self._search(jql, max_results=max_results)
+        ]
 
         return [i for i in issues if i is not None]
@@ -0,0 +1,190 @@
+"""
+Local SQLite store of parsed Jira issues.
+
+Every workflow run used to re-query Jira from scratch. The store keeps the
+parsed issues of each query scope (a form's JQL) together with the time of
+the last sync, so later runs only fetch issues updated since then and only
+occasionally list keys to drop deleted issues.
+"""
+
+import hashlib
+import json
+import sqlite3
+from collections.abc import Iterable, Iterator
+from contextlib import closing, contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from src.config.settings import get_settings
+from src.extractors.jira_extractor import JiraIssue
+from src.utils.file_utils import ensure_directory
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class JiraIssueStore:
+    """
+    Parsed Jira issues per query scope, with sync bookkeeping.
+
+    Usage:
+        store = JiraIssueStore()
+        scope = store.scope_for(jql)
+        store.upsert(scope, issues)
+        store.mark_synced(scope, jql, started_at, full=True)
+        issues = store.get_issues(scope)
+    """
+
+    SCHEMA_VERSION = 2
+
+    def __init__(self, store_dir: str | Path | None = None) -> None:
+        """
+        Initialize the store.
+
+        Args:
+            store_dir: Optional directory for the database (defaults to <cache_dir>/jira)
+        """
+        settings = get_settings()
+        self.store_dir = ensure_directory(store_dir or Path(settings.cache_dir) / "jira")
+        self.db_path = self.store_dir / f"issues-v{self.SCHEMA_VERSION}.sqlite"
+        with self._connect() as conn, conn:
+            self._create_schema(conn)
+
+    @staticmethod
+    def scope_for(jql: str) -> str:
+        """Scope key for a query; each distinct JQL is synced independently."""
+        return hashlib.sha256(jql.strip().encode("utf-8")).hexdigest()[:16]
+
+    def get_sync_state(self, scope: str) -> dict[str, Any] | None:
+        """
+        Get the sync bookkeeping of a scope.
+
+        Args:
+            scope: Scope key from scope_for()
+
+        Returns:
+            Dictionary with jql, last_sync and last_full_sync (datetimes), or None
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT jql, last_sync, last_full_sync FROM syncs WHERE scope = ?", (scope,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "jql": row[0],
+            "last_sync": datetime.fromisoformat(row[1]),
+            "last_full_sync": datetime.fromisoformat(row[2]),
+        }
+
+    def mark_synced(self, scope: str, jql: str, synced_at: datetime, full: bool = False) -> None:
+        """
+        Record a completed sync.
+
+        Args:
+            scope: Scope key
+            jql: Query of the scope
+            synced_at: When the sync started (changes after it are picked up next time)
+            full: Whether the sync listed every matching issue (deletions were checked)
+        """
+        with self._connect() as conn, conn:
+            if full:
+                conn.execute(
+                    "INSERT OR REPLACE INTO syncs VALUES (?, ?, ?, ?)",
+                    (scope, jql, synced_at.isoformat(), synced_at.isoformat()),
+                )
+            else:
+                conn.execute(
+                    "UPDATE syncs SET last_sync = ? WHERE scope = ?",
+                    (synced_at.isoformat(), scope),
+                )
+
+    def upsert(self, scope: str, issues: Iterable[JiraIssue]) -> int:
+        """
+        Insert or update issues of a scope.
+
+        Args:
+            scope: Scope key
+            issues: Parsed issues
+
+        Returns:
+            Number of rows written
+        """
+        rows = [
+            (scope, issue.key, issue.updated.isoformat(), json.dumps(issue.to_dict()))
+            for issue in issues
+        ]
+        with self._connect() as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def retain(self, scope: str, keys: Iterable[str]) -> int:
+        """
+        Delete issues of a scope that are not in ``keys``.
+
+        Args:
+            scope: Scope key
+            keys: Keys of every issue currently matching the scope's query
+
+        Returns:
+            Number of deleted issues
+        """
+        stale = set(self.keys(scope)) - set(keys)
+        with self._connect() as conn, conn:
+            conn.executemany(
+                "DELETE FROM issues WHERE scope = ? AND key = ?", [(scope, key) for key in stale]
+            )
+        return len(stale)
+
+    def keys(self, scope: str) -> list[str]:
+        """Keys of the stored issues of a scope."""
+        with self._connect() as conn:
+            return [
+                row[0]
+                for row in conn.execute("SELECT key FROM issues WHERE scope = ?", (scope,))
+            ]
+
+    def get_issues(self, scope: str) -> list[JiraIssue]:
+        """
+        Read the stored issues of a scope, most recently updated first.
+
+        Args:
+            scope: Scope key
+
+        Returns:
+            Parsed issues
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT data FROM issues WHERE scope = ? ORDER BY updated DESC, key", (scope,)
+            ).fetchall()
+        return [JiraIssue.from_dict(json.loads(row[0])) for row in rows]
+
+    # ========== Internal Helpers ==========
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection to the store and close it afterwards."""
+        with closing(sqlite3.connect(self.db_path, timeout=30)) as conn:
+            yield conn
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Create the store tables if missing."""
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS issues (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                updated TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (scope, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS syncs (
+                scope TEXT PRIMARY KEY,
+                jql TEXT NOT NULL,
+                last_sync TEXT NOT NULL,
+                last_full_sync TEXT NOT NULL
+            );
+            """
+        )
@@ -0,0 +1,228 @@
+"""
+Normalization of Jira issue text.
+
+Descriptions and comments arrive as wiki markup or HTML (exports, rendered
+fields), with code and noformat blocks, quoted reply chains and email
+signatures. They flow into agent prompts and embeddings, so they are
+reduced to compact plain text once at parse time, and comments repeated
+across issues are kept only once.
+"""
+
+import hashlib
+import html
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Lines kept from code/noformat blocks (logs and stack traces are long and repetitive)
+_MAX_BLOCK_LINES = 8
+
+_BLOCK_PATTERN = re.compile(
+    r"\{(code|noformat)(?::[^}]*)?\}(.*?)\{\1\}", re.DOTALL | re.IGNORECASE
+)
+_QUOTE_BLOCK_PATTERN = re.compile(r"\{quote\}.*?\{quote\}", re.DOTALL | re.IGNORECASE)
+_HTML_BLOCK_PATTERN = re.compile(r"<(pre|code)[^>]*>(.*?)</\1>", re.DOTALL | re.IGNORECASE)
+_HTML_QUOTE_PATTERN = re.compile(r"<blockquote[^>]*>.*?</blockquote>", re.DOTALL | re.IGNORECASE)
+_HTML_BREAK_PATTERN = re.compile(r"<\s*(br|/p|/div|/li|/tr|/h\d)\s*/?>", re.IGNORECASE)
+_HTML_ITEM_PATTERN = re.compile(r"<\s*li[^>]*>", re.IGNORECASE)
+_HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+_MACRO_PATTERN = re.compile(r"\{(?:color|panel|anchor|section|column)(?::[^}]*)?\}", re.IGNORECASE)
+_LINK_PATTERN = re.compile(r"\[([^|\]\n]+)\|[^\]\n]+\]")
+_BARE_LINK_PATTERN = re.compile(r"\[((?:https?|mailto):[^\]\n]+)\]")
+_MENTION_PATTERN = re.compile(r"\[~([^\]\n]+)\]")
+_IMAGE_PATTERN = re.compile(
+    r"!([^!\s|]+\.(?:png|jpe?g|gif|bmp|webp|svg))(?:\|[^!]*)?!", re.IGNORECASE
+)
+_HEADING_PATTERN = re.compile(r"^\s*h[1-6]\.\s*", re.MULTILINE)
+_BULLET_PATTERN = re.compile(r"^\s*[*#-]+\s+", re.MULTILINE)
+_QUOTE_LINE_PATTERN = re.compile(r"^\s*(?:>|bq\.).*$", re.MULTILINE)
+_TABLE_PATTERN = re.compile(r"\|\|?")
+_EMPHASIS_PATTERN = re.compile(r"(?<![\w*+])([*+^~])(\S(?:[^\n]*?\S)?)\1(?![\w*+])")
+_MONOSPACE_PATTERN = re.compile(r"\{\{(.*?)\}\}")
+_RULE_PATTERN = re.compile(r"^\s*-{4,}\s*$", re.MULTILINE)
+_SIGNATURE_PATTERN = re.compile(
+    r"^\s*(?:--\s*|(?:best |kind )?regards,?|thanks(?: and regards)?,?|cheers,?|"
+    r"sent from my .*|on .+ wrote:)\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_BLANK_LINES_PATTERN = re.compile(r"\n\s*\n+")
+_SPACES_PATTERN = re.compile(r"[ \t\u00a0]+")
+
+
+@dataclass
+class TextNormalizationStats:
+    """Size of Jira text before and after normalization."""
+
+    fields_normalized: int = 0
+    chars_before: int = 0
+    chars_after: int = 0
+    quoted_blocks_removed: int = 0
+    duplicate_comments_removed: int = 0
+    duplicate_chars_removed: int = 0
+
+    @property
+    def tokens_before(self) -> int:
+        """Estimated tokens before normalization."""
+        return _estimate_tokens(self.chars_before)
+
+    @property
+    def tokens_after(self) -> int:
+        """Estimated tokens after normalization."""
+        return _estimate_tokens(self.chars_after)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Statistics for reporting."""
+        return {
+            "fields_normalized": self.fields_normalized,
+            "chars_before": self.chars_before,
+            "chars_after": self.chars_after,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": (
+                self.tokens_before
+                - self.tokens_after
+                + _estimate_tokens(self.duplicate_chars_removed)
+            ),
+            "quoted_blocks_removed": self.quoted_blocks_removed,
+            "duplicate_comments_removed": self.duplicate_comments_removed,
+            "duplicate_chars_removed": self.duplicate_chars_removed,
+        }
+
+
+class JiraTextNormalizer:
+    """
+    Converts Jira wiki markup and HTML to compact plain text.
+
+    Usage:
+        normalizer = JiraTextNormalizer()
+        text = normalizer.normalize(issue_description)
+        body = normalizer.normalize_comment(comment_body)
+        normalizer.dedupe_comments(issues)
+        print(normalizer.stats.to_dict())
+    """
+
+    def __init__(self) -> None:
+        """Initialize the normalizer with empty statistics."""
+        self.stats = TextNormalizationStats()
+
+    def normalize(self, text: str | None) -> str:
+        """
+        Normalize a description or other rich text field.
+
+        Args:
+            text: Raw wiki markup, HTML or plain text
+
+        Returns:
+            Compact plain text
+        """
+        if not text:
+            return ""
+
+        result = _to_plain_text(text)
+        self._record(text, result)
+        return result
+
+    def normalize_comment(self, body: str | None) -> str:
+        """
+        Normalize a comment, also dropping quoted replies and signatures.
+
+        Args:
+            body: Raw comment body
+
+        Returns:
+            Compact plain text of what the comment itself adds
+        """
+        if not body:
+            return ""
+
+        text, quotes = _QUOTE_BLOCK_PATTERN.subn("", body)
+        text, html_quotes = _HTML_QUOTE_PATTERN.subn("", text)
+        text, quote_lines = _QUOTE_LINE_PATTERN.subn("", text)
+        self.stats.quoted_blocks_removed += quotes + html_quotes + (1 if quote_lines else 0)
+
+        signature = _SIGNATURE_PATTERN.search(text)
+        if signature and text[: signature.start()].strip():
+            text = text[: signature.start()]
+
+        result = _to_plain_text(text)
+        self._record(body, result)
+        return result
+
+    def dedupe_comments(self, issues: list[Any]) -> None:
+        """
+        Keep identical comments only on the first issue they appear on.
+
+        Bulk updates and bot notifications post the same text to many issues;
+        repeating it in every prompt adds nothing.
+
+        Args:
+            issues: JiraIssue objects whose comments are filtered in place
+        """
+        seen: set[str] = set()
+        for issue in issues:
+            kept = []
+            for comment in issue.comments:
+                body = comment.get("body", "")
+                if not body:
+                    continue
+                digest = hashlib.sha1(body.lower().encode("utf-8")).hexdigest()
+                if digest in seen:
+                    self.stats.duplicate_comments_removed += 1
+                    self.stats.duplicate_chars_removed += len(body)
+                    continue
+                seen.add(digest)
+                kept.append(comment)
+            issue.comments = kept
+
+    def _record(self, before: str, after: str) -> None:
+        """Add one normalized field to the statistics."""
+        self.stats.fields_normalized += 1
+        self.stats.chars_before += len(before)
+        self.stats.chars_after += len(after)
+
+
+def _to_plain_text(text: str) -> str:
+    """Convert wiki markup or HTML to plain text."""
+    text = text.replace("\r\n", "\n")
+    text = _BLOCK_PATTERN.sub(lambda m: _truncate_block(m.group(2)), text)
+
+    if _HTML_TAG_PATTERN.search(text):
+        text = _HTML_BLOCK_PATTERN.sub(lambda m: _truncate_block(m.group(2)), text)
+        text = _HTML_BREAK_PATTERN.sub("\n", text)
+        text = _HTML_ITEM_PATTERN.sub("\n- ", text)
+        text = _HTML_TAG_PATTERN.sub("", text)
+    text = html.unescape(text)
+
+    text = _MACRO_PATTERN.sub("", text)
+    text = _IMAGE_PATTERN.sub(r"[image: \1]", text)
+    text = _MENTION_PATTERN.sub(r"@\1", text)
+    text = _LINK_PATTERN.sub(r"\1", text)
+    text = _BARE_LINK_PATTERN.sub(r"\1", text)
+    text = _MONOSPACE_PATTERN.sub(r"\1", text)
+    text = _HEADING_PATTERN.sub("", text)
+    text = _RULE_PATTERN.sub("", text)
+    text = _BULLET_PATTERN.sub("- ", text)
+    text = _EMPHASIS_PATTERN.sub(r"\2", text)
+    text = "\n".join(_TABLE_PATTERN.sub(" | ", line).strip(" |") for line in text.split("\n"))
+
+    text = _SPACES_PATTERN.sub(" ", text)
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    return _BLANK_LINES_PATTERN.sub("\n\n", text).strip()
+
+
+def _truncate_block(content: str) -> str:
+    """Keep the first lines of a code or noformat block."""
+    lines = [line.rstrip() for line in content.strip("\n").split("\n") if line.strip()]
+    if len(lines) > _MAX_BLOCK_LINES:
+        omitted = len(lines) - _MAX_BLOCK_LINES
+        lines = lines[:_MAX_BLOCK_LINES] + [f"[... {omitted} more lines]"]
+    return "\n" + "\n".join(lines) + "\n"
+
+
+def _estimate_tokens(chars: int) -> int:
+    """Rough token estimate for English text (about four characters per token)."""
+    return (chars + 3) // 4
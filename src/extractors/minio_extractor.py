@@ -4,21 +4,32 @@ Minio Extractor for retrieving and processing screenshots from object storage.
 
 import base64
 import io
+import json
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+import certifi
+import urllib3
 from langchain_core.documents import Document
 from minio import Minio
 from minio.error import S3Error
 from PIL import Image
 
 from src.config.settings import get_settings
+from src.extractors.screenshot_cache import ScreenshotCache, normalize_etag
 from src.utils.file_utils import ensure_directory
+from src.utils.image_header import ImageHeader, parse_image_header
 from src.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Ranged header reads double up to this size (JPEG EXIF blocks can be large)
+_PROBE_MAX_BYTES = 256 * 1024
+
 
 @dataclass
 class Screenshot:
@@ -32,6 +43,30 @@ class Screenshot:
     content_type: str
     size: int
     metadata: dict[str, Any]
+    etag: str = ""
+
+    def to_ref(self) -> dict[str, Any]:
+        """
+        Lightweight reference to this screenshot without the image bytes.
+
+        Activities pass references instead of images; consumers resolve them
+        with MinioExtractor.resolve_screenshots, normally from the local cache.
+        """
+        return {
+            "object_name": self.object_name,
+            "bucket": self.bucket,
+            "form_name": self.form_name,
+            "screen_type": self.screen_type,
+            "content_type": self.content_type,
+            "size": self.size,
+            "metadata": self.metadata,
+            "etag": self.etag,
+            "cache_key": (
+                ScreenshotCache.cache_key(self.bucket, self.object_name, self.etag)
+                if self.etag
+                else ""
+            ),
+        }
 
 
 class MinioExtractor:
@@ -46,6 +81,7 @@ class MinioExtractor:
         """Initialize the Minio extractor."""
         self.settings = get_settings()
         self._client: Minio | None = None
+        self._cache: ScreenshotCache | None = None
 
     @property
     def client(self) -> Minio:
@@ -56,10 +92,41 @@ class MinioExtractor:
                 access_key=self.settings.minio.access_key,
                 secret_key=self.settings.minio.secret_key,
                 secure=self.settings.minio.secure,
+                http_client=self._create_http_client(),
+            )
+            logger.info(
+                "Connected to Minio",
+                endpoint=self.settings.minio.endpoint,
+                max_connections=self.settings.minio.max_connections,
             )
-            logger.info("Connected to Minio", endpoint=self.settings.minio.endpoint)
         return self._client
 
+    @property
+    def cache(self) -> ScreenshotCache:
+        """Get or create the local screenshot cache."""
+        if self._cache is None:
+            self._cache = ScreenshotCache()
+        return self._cache
+
+    def _create_http_client(self) -> urllib3.PoolManager:
+        """
+        Create the connection pool shared by all download threads.
+
+        Mirrors the Minio client defaults, but sizes the pool so concurrent
+        downloads reuse connections instead of discarding them.
+        """
+        timeout = 300
+        return urllib3.PoolManager(
+            timeout=urllib3.Timeout(connect=timeout, read=timeout),
+            maxsize=max(self.settings.minio.max_connections, self.settings.minio.download_workers),
+            block=True,
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+            retries=urllib3.Retry(
+                total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]
+            ),
+        )
+
     def get_form_screenshots(
         self, form_name: str, bucket: str | None = None, prefix: str | None = None
     ) -> list[Screenshot]:
@@ -101,49 +168,8 @@ class MinioExtractor:
                 # Try form_name/ prefix first, then fallback to all images
                 search_prefixes = [f"{form_name}/", None]
 
-            all_objects: list[Any] = []
-
-            # Collect all matching objects
-            for search_prefix in search_prefixes:
-                try:
-                    objects = list(
-                        self.client.list_objects(
-                            bucket,
-                            prefix=search_prefix,
-                            recursive=True,
-                        )
-                    )
-
-                    if objects:
-                        all_objects.extend(objects)
-                        logger.info(f"Found {len(objects)} objects with prefix '{search_prefix}'")
-                        # If we found objects with a prefix, don't try the fallback
-                        if search_prefix is not None:
-                            break
-                except S3Error as e:
-                    logger.warning(f"Error listing objects with prefix '{search_prefix}': {e}")
-                    continue
-
-            # Filter and process images
-            image_objects = []
-            for obj in all_objects:
-                # Check if it's a supported image format
-                ext = Path(obj.object_name).suffix.lower()
-                if ext in self.SUPPORTED_FORMATS:
-                    # If bucket name is form name, only include images that match form name pattern
-                    if bucket.lower() == form_name.lower():
-                        obj_name_lower = obj.object_name.lower()
-                        form_name_lower = form_name.lower()
-                        # Include if filename starts with form name or is in form_name folder
-                        if (
-                            obj_name_lower.startswith(form_name_lower)
-                            or f"/{form_name_lower}/" in obj_name_lower
-                            or obj_name_lower.startswith(f"{form_name_lower}.")
-                        ):
-                            image_objects.append(obj)
-                    else:
-                        # Include all images
-                        image_objects.append(obj)
+            # Listing is streamed; only matching image objects are kept
+            image_objects = list(self._iter_image_objects(bucket, form_name, search_prefixes))
 
             # Sort by object name to process in order
             image_objects.sort(key=lambda x: x.object_name)
@@ -154,47 +180,23 @@ class MinioExtractor:
                 bucket=bucket,
             )
 
-            # Process each image
-            for obj in image_objects:
-                try:
-                    # Get the object
-                    response = self.client.get_object(bucket, obj.object_name)
-                    image_data = response.read()
-                    response.close()
-                    response.release_conn()
-
-                    # Determine screen type from filename
-                    screen_type = self._determine_screen_type(obj.object_name)
-
-                    screenshot = Screenshot(
-                        object_name=obj.object_name,
-                        bucket=bucket,
-                        form_name=form_name,
-                        screen_type=screen_type,
-                        image_data=image_data,
-                        content_type=obj.content_type or f"image/{ext[1:]}",
-                        size=obj.size,
-                        metadata=obj.metadata or {},
-                    )
-                    screenshots.append(screenshot)
-
-                    logger.debug(
-                        "Retrieved screenshot",
-                        object_name=obj.object_name,
-                        screen_type=screen_type,
-                        size=obj.size,
-                    )
-
-                except S3Error as e:
-                    logger.warning(
-                        "Failed to retrieve screenshot", object_name=obj.object_name, error=str(e)
+            # Download concurrently; map() keeps results in object name order
+            workers = max(1, min(self.settings.minio.download_workers, len(image_objects)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                downloaded = list(
+                    executor.map(
+                        lambda obj: self._download_screenshot(bucket, form_name, obj),
+                        image_objects,
                     )
+                )
+            screenshots = [screenshot for screenshot, _ in downloaded if screenshot]
 
             logger.info(
                 "Retrieved screenshots from Minio",
                 form_name=form_name,
                 bucket=bucket,
                 count=len(screenshots),
+                cache_hits=sum(1 for screenshot, from_cache in downloaded if from_cache),
             )
 
         except S3Error as e:
@@ -203,23 +205,147 @@ class MinioExtractor:
 
         return screenshots
 
-    def get_screenshot(self, bucket: str, object_name: str) -> Screenshot | None:
+    def _iter_image_objects(
+        self, bucket: str, form_name: str, search_prefixes: list[str | None]
+    ) -> Iterator[Any]:
         """
-        Get a single screenshot from Minio.
+        Stream the image objects of a form from the bucket listing.
+
+        Args:
+            bucket: Minio bucket name
+            form_name: Name of the form
+            search_prefixes: Prefixes to try in order; the first one with matches wins
+
+        Yields:
+            Listing entries for supported images belonging to the form
+        """
+        form_name_lower = form_name.lower()
+
+        for search_prefix in search_prefixes:
+            found = 0
+            try:
+                for obj in self.client.list_objects(bucket, prefix=search_prefix, recursive=True):
+                    found += 1
+
+                    # Check if it's a supported image format
+                    obj_name_lower = obj.object_name.lower()
+                    if Path(obj_name_lower).suffix not in self.SUPPORTED_FORMATS:
+                        continue
+
+                    # If bucket name is form name, only include images that match form name pattern
+                    if bucket.lower() == form_name_lower and not (
+                        obj_name_lower.startswith(form_name_lower)
+                        or f"/{form_name_lower}/" in obj_name_lower
+                    ):
+                        continue
+
+                    yield obj
+            except S3Error as e:
+                logger.warning(f"Error listing objects with prefix '{search_prefix}': {e}")
+                continue
+
+            if found:
+                logger.info(f"Found {found} objects with prefix '{search_prefix}'")
+                # If we found objects with a prefix, don't try the fallback
+                if search_prefix is not None:
+                    break
+
+    def _download_screenshot(
+        self, bucket: str, form_name: str, obj: Any
+    ) -> tuple[Screenshot | None, bool]:
+        """
+        Fetch one listed image, from the cache when its ETag is unchanged.
+
+        Runs on a worker thread.
+
+        Returns:
+            Tuple of (screenshot or None on failure, whether it came from the cache)
+        """
+        etag = normalize_etag(getattr(obj, "etag", None))
+        try:
+            image_data, from_cache = self._fetch_image(bucket, obj.object_name, etag)
+        except S3Error as e:
+            logger.warning(
+                "Failed to retrieve screenshot", object_name=obj.object_name, error=str(e)
+            )
+            return None, False
+
+        # Determine screen type from filename
+        screen_type = self._determine_screen_type(obj.object_name)
+        ext = Path(obj.object_name).suffix.lower()
+
+        logger.debug(
+            "Retrieved screenshot",
+            object_name=obj.object_name,
+            screen_type=screen_type,
+            size=obj.size,
+        )
+
+        screenshot = Screenshot(
+            object_name=obj.object_name,
+            bucket=bucket,
+            form_name=form_name,
+            screen_type=screen_type,
+            image_data=image_data,
+            content_type=obj.content_type or f"image/{ext[1:]}",
+            size=obj.size,
+            metadata=obj.metadata or {},
+            etag=etag,
+        )
+        return screenshot, from_cache
+
+    def _fetch_image(self, bucket: str, object_name: str, etag: str) -> tuple[bytes, bool]:
+        """
+        Get an object's bytes from the cache, downloading and caching on a miss.
 
         Args:
             bucket: Minio bucket name
             object_name: Object name/path
+            etag: Current ETag of the object
 
         Returns:
-            Screenshot object or None if not found
+            Tuple of (object bytes, whether they came from the cache)
         """
+        cached = self.cache.get(bucket, object_name, etag)
+        if cached is not None:
+            return cached, True
+
+        image_data = self._read_object(bucket, object_name)
+        self.cache.put(bucket, object_name, etag, image_data)
+        return image_data, False
+
+    def _read_object(self, bucket: str, object_name: str) -> bytes:
+        """Read an object's bytes and return its connection to the pool."""
+        response = self.client.get_object(bucket, object_name)
         try:
-            response = self.client.get_object(bucket, object_name)
-            image_data = response.read()
+            return response.read()
+        finally:
             response.close()
             response.release_conn()
 
+    def get_screenshot(
+        self, bucket: str, object_name: str, etag: str | None = None
+    ) -> Screenshot | None:
+        """
+        Get a single screenshot from Minio.
+
+        Without a known ETag the object is stat'ed first, so an unchanged
+        object is served from the local cache without downloading it.
+
+        Args:
+            bucket: Minio bucket name
+            object_name: Object name/path
+            etag: Optional ETag recorded when the object was listed
+
+        Returns:
+            Screenshot object or None if not found
+        """
+        try:
+            if not etag:
+                etag = self.client.stat_object(bucket, object_name).etag
+            etag = normalize_etag(etag)
+            image_data, _ = self._fetch_image(bucket, object_name, etag)
+
             ext = Path(object_name).suffix.lower()
             screen_type = self._determine_screen_type(object_name)
 
@@ -232,6 +358,7 @@ class MinioExtractor:
                 content_type=f"image/{ext[1:]}" if ext else "image/png",
                 size=len(image_data),
                 metadata={},
+                etag=etag,
             )
         except Exception as e:
             logger.warning(
@@ -242,6 +369,129 @@ class MinioExtractor:
             )
             return None
 
+    def probe_image(
+        self, bucket: str, object_name: str, etag: str | None = None
+    ) -> ImageHeader | None:
+        """
+        Get an image's format and dimensions without downloading it.
+
+        Uses the cached header for the ETag, then the locally cached image,
+        and only then ranged GETs of the first few KB. Results are cached
+        next to the object's ETag.
+
+        Args:
+            bucket: Minio bucket name
+            object_name: Object name/path
+            etag: Optional ETag recorded when the object was listed
+
+        Returns:
+            ImageHeader, or None if the header cannot be read
+        """
+        try:
+            if not etag:
+                etag = self.client.stat_object(bucket, object_name).etag
+            etag = normalize_etag(etag)
+
+            variant = f"{object_name}#header"
+            cached = self.cache.get(bucket, variant, etag)
+            if cached is not None:
+                return ImageHeader.from_dict(json.loads(cached))
+
+            image_data = self.cache.get(bucket, object_name, etag)
+            if image_data is not None:
+                header = parse_image_header(image_data)
+            else:
+                header = self._probe_header(bucket, object_name)
+
+            if header:
+                self.cache.put(bucket, variant, etag, json.dumps(header.to_dict()).encode("utf-8"))
+            return header
+        except Exception as e:
+            logger.warning(
+                "Failed to probe image header",
+                bucket=bucket,
+                object_name=object_name,
+                error=str(e),
+            )
+            return None
+
+    def _probe_header(self, bucket: str, object_name: str) -> ImageHeader | None:
+        """Parse an image header from ranged reads, widening the range as needed."""
+        length = max(64, self.settings.minio.probe_bytes)
+        while True:
+            response = self.client.get_object(bucket, object_name, offset=0, length=length)
+            try:
+                data = response.read()
+            finally:
+                response.close()
+                response.release_conn()
+
+            header = parse_image_header(data)
+            # A short read means the whole object was returned
+            if header or len(data) < length or length >= _PROBE_MAX_BYTES:
+                return header
+            length = min(length * 4, _PROBE_MAX_BYTES)
+
+    def resolve_screenshot(
+        self, ref: dict[str, Any], form_name: str | None = None
+    ) -> Screenshot | None:
+        """
+        Resolve a screenshot reference to a Screenshot with image bytes.
+
+        Args:
+            ref: Reference produced by Screenshot.to_ref()
+            form_name: Optional form name overriding the one in the reference
+
+        Returns:
+            Screenshot object or None if the image cannot be fetched
+        """
+        bucket = ref.get("bucket", "")
+        object_name = ref.get("object_name", "")
+        etag = normalize_etag(ref.get("etag"))
+
+        image_data = self.cache.get_by_key(ref["cache_key"]) if ref.get("cache_key") else None
+        if image_data is None:
+            if not (bucket and object_name):
+                return None
+            fetched = self.get_screenshot(bucket, object_name, etag=etag or None)
+            if not fetched or not fetched.image_data:
+                return None
+            image_data, etag = fetched.image_data, fetched.etag
+
+        return Screenshot(
+            object_name=object_name,
+            bucket=bucket,
+            form_name=form_name or ref.get("form_name", ""),
+            screen_type=ref.get("screen_type") or self._determine_screen_type(object_name),
+            image_data=image_data,
+            content_type=ref.get("content_type", "image/png"),
+            size=len(image_data),
+            metadata=ref.get("metadata") or {},
+            etag=etag,
+        )
+
+    def resolve_screenshots(
+        self, refs: list[dict[str, Any]], form_name: str | None = None
+    ) -> list[Screenshot]:
+        """
+        Resolve screenshot references concurrently, preserving their order.
+
+        Args:
+            refs: References produced by Screenshot.to_ref()
+            form_name: Optional form name overriding the ones in the references
+
+        Returns:
+            Screenshots that could be resolved
+        """
+        if not refs:
+            return []
+
+        workers = max(1, min(self.settings.minio.download_workers, len(refs)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            resolved = list(executor.map(lambda ref: self.resolve_screenshot(ref, form_name), refs))
+
+        return [screenshot for screenshot in resolved if screenshot]
+
     def _determine_screen_type(self, object_name: str) -> str:
         """Determine the type of screen from the object name."""
         name_lower = object_name.lower()
@@ -313,7 +563,7 @@ class MinioExtractor:
 
     def get_image_dimensions(self, screenshot: Screenshot) -> tuple[int, int]:
         """
-        Get dimensions of a screenshot.
+        Get dimensions of a screenshot from its header, decoding only unknown formats.
 
         Args:
             screenshot: Screenshot object
@@ -321,23 +571,26 @@ class MinioExtractor:
         Returns:
             Tuple of (width, height)
         """
+        header = parse_image_header(screenshot.image_data)
+        if header:
+            return header.width, header.height
         image = Image.open(io.BytesIO(screenshot.image_data))
         return image.size
 
     def to_documents(
-        self, screenshots: list[Screenshot], include_base64: bool = False
-    ) -> list[Document]:
+        self, screenshots: Iterable[Screenshot], include_base64: bool = False
+    ) -> Iterator[Document]:
         """
         Convert screenshots to LangChain Documents.
 
         Args:
-            screenshots: List of screenshots
+            screenshots: Iterable of screenshots
             include_base64: Whether to include base64 data in content
 
-        Returns:
-            List of LangChain Documents
+        Yields:
+            LangChain Documents, one per screenshot
         """
-        documents: list[Document] = []
+        count = 0
 
         for screenshot in screenshots:
             width, height = self.get_image_dimensions(screenshot)
@@ -364,15 +617,13 @@ class MinioExtractor:
                 "doc_type": "screenshot",
             }
 
-            document = Document(
+            count += 1
+            yield Document(
                 page_content="\n".join(content_parts),
                 metadata=metadata,
             )
-            documents.append(document)
-
-        logger.info("Converted screenshots to documents", count=len(documents))
 
-        return documents
+        logger.info("Converted screenshots to documents", count=count)
 
     def upload_screenshot(
         self, file_path: str | Path, form_name: str, bucket: str | None = None
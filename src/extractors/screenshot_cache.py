@@ -0,0 +1,161 @@
+"""
+Local content cache for screenshots stored in Minio.
+
+The same images are read several times per run (extraction, vector storage,
+reconstruction in later activities) and again on every rerun. Entries are
+keyed by (bucket, object name, ETag), so a changed object gets a new key and
+a stale copy is never served. The cache is bounded in size and evicts the
+least recently used entries first.
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from src.config.settings import get_settings
+from src.utils.file_utils import ensure_directory
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def normalize_etag(etag: str | None) -> str:
+    """Strip the quotes S3 puts around ETags."""
+    return (etag or "").strip().strip('"')
+
+
+class ScreenshotCache:
+    """
+    Size-bounded, ETag-keyed cache of screenshot bytes on local disk.
+
+    Usage:
+        cache = ScreenshotCache()
+        data = cache.get(bucket, object_name, etag)
+        if data is None:
+            data = download()
+            cache.put(bucket, object_name, etag, data)
+    """
+
+    def __init__(self, cache_dir: str | Path | None = None, max_bytes: int | None = None) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Optional cache directory (defaults to <cache_dir>/screenshots)
+            max_bytes: Optional size bound (defaults to MINIO_CACHE_MAX_MB)
+        """
+        settings = get_settings()
+        self.cache_dir = ensure_directory(
+            cache_dir or Path(settings.cache_dir) / "screenshots"
+        )
+        self.max_bytes = (
+            max_bytes if max_bytes is not None else settings.minio.cache_max_mb * 1024 * 1024
+        )
+        self._lock = threading.Lock()
+        self._size: int | None = None
+
+    @staticmethod
+    def cache_key(bucket: str, object_name: str, etag: str) -> str:
+        """Key for an object version."""
+        raw = f"{bucket}\0{object_name}\0{normalize_etag(etag)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        """Path of the file holding a cache entry."""
+        return self.cache_dir / key[:2] / key
+
+    def get(self, bucket: str, object_name: str, etag: str | None) -> bytes | None:
+        """
+        Read an object version from the cache.
+
+        Args:
+            bucket: Minio bucket name
+            object_name: Object name/path
+            etag: Current ETag of the object
+
+        Returns:
+            Cached bytes, or None on a miss
+        """
+        if not etag:
+            return None
+        return self.get_by_key(self.cache_key(bucket, object_name, etag))
+
+    def get_by_key(self, key: str) -> bytes | None:
+        """
+        Read a cache entry by its key.
+
+        Args:
+            key: Key returned by cache_key()
+
+        Returns:
+            Cached bytes, or None on a miss
+        """
+        path = self.path_for(key)
+        try:
+            data = path.read_bytes()
+            # Bump the access time used for LRU eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, bucket: str, object_name: str, etag: str | None, data: bytes) -> None:
+        """
+        Store an object version and evict old entries when over the size bound.
+
+        Args:
+            bucket: Minio bucket name
+            object_name: Object name/path
+            etag: ETag the data was read at
+            data: Object bytes
+        """
+        if not etag or not data or len(data) > self.max_bytes:
+            return
+
+        path = self.path_for(self.cache_key(bucket, object_name, etag))
+        ensure_directory(path.parent)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        try:
+            # Re-storing an entry replaces it rather than adding to the cache
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _scan_size(self) -> int:
+        """Total size of the cache entries on disk."""
+        return sum(p.stat().st_size for p in self.cache_dir.glob("*/*") if p.is_file())
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache is below 90% of its bound."""
+        entries = []
+        for path in self.cache_dir.glob("*/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        size = sum(entry[1] for entry in entries)
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+            evicted += 1
+
+        self._size = size
+        logger.debug("Evicted screenshot cache entries", evicted=evicted, size_bytes=size)
@@ -0,0 +1,339 @@
+"""
+Local OCR pre-pass over screenshots.
+
+Tesseract extracts the visible text of each screenshot (labels, button text,
+table headers) as lines with bounding boxes. The text grounds vision prompts
+so images can be sent at low detail, is stored as searchable
+``screenshot_text`` chunks, and lets text-only screens (messages, reports)
+be analyzed without a vision call. Results are cached by image hash.
+"""
+
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from langchain_core.documents import Document
+from PIL import Image, ImageChops, ImageDraw
+
+from src.config.settings import get_settings
+from src.utils.file_utils import ensure_directory
+from src.utils.logging_config import ExecutionTimer, get_logger
+
+logger = get_logger(__name__)
+
+# Pixels differing from the background by more than this count as ink
+_INK_THRESHOLD = 40
+
+
+@dataclass
+class TextLine:
+    """A line of text found by OCR, with its bounding box in pixels."""
+
+    text: str
+    left: int
+    top: int
+    width: int
+    height: int
+    confidence: float
+
+
+@dataclass
+class ScreenshotText:
+    """OCR result for one screenshot."""
+
+    image_hash: str
+    width: int
+    height: int
+    lines: list[TextLine] = field(default_factory=list)
+    ink_outside_text: float = 1.0
+
+    @property
+    def text(self) -> str:
+        """All recognized text, one line per row."""
+        return "\n".join(line.text for line in self.lines)
+
+    def format_for_prompt(self, limit: int = 80) -> str:
+        """Lines with their positions, for grounding vision prompts."""
+        return "\n".join(
+            f'- "{line.text}" at x={line.left}, y={line.top}, {line.width}x{line.height}'
+            for line in self.lines[:limit]
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize for the cache."""
+        return {
+            "image_hash": self.image_hash,
+            "width": self.width,
+            "height": self.height,
+            "lines": [vars(line) for line in self.lines],
+            "ink_outside_text": self.ink_outside_text,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ScreenshotText":
+        """Rebuild from the cached form."""
+        return cls(
+            image_hash=data["image_hash"],
+            width=data.get("width", 0),
+            height=data.get("height", 0),
+            lines=[TextLine(**line) for line in data.get("lines", [])],
+            ink_outside_text=data.get("ink_outside_text", 1.0),
+        )
+
+
+class ScreenshotOCR:
+    """
+    Runs Tesseract over screenshots in a process pool, with an on-disk cache.
+
+    Usage:
+        ocr = ScreenshotOCR()
+        texts = ocr.extract(screenshots)  # {object_name: ScreenshotText}
+    """
+
+    def __init__(self, cache_dir: str | Path | None = None, max_workers: int | None = None) -> None:
+        """
+        Initialize the OCR stage.
+
+        Args:
+            cache_dir: Optional cache directory (defaults to <cache_dir>/ocr)
+            max_workers: Worker processes (defaults to the VISION_OCR_WORKERS setting)
+        """
+        settings = get_settings()
+        self.vision = settings.vision
+        self.cache_dir = ensure_directory(cache_dir or Path(settings.cache_dir) / "ocr")
+        self.max_workers = max_workers or self.vision.ocr_workers or os.cpu_count() or 1
+        self._available: bool | None = None
+
+    @property
+    def available(self) -> bool:
+        """Whether OCR is enabled and the Tesseract binary can be found."""
+        if self._available is None:
+            self._available = False
+            if self.vision.ocr_enabled:
+                try:
+                    import pytesseract
+
+                    pytesseract.get_tesseract_version()
+                    self._available = True
+                except Exception as e:
+                    logger.warning("Tesseract OCR is not available", error=str(e))
+        return self._available
+
+    def extract(self, screenshots: list[Any]) -> dict[str, ScreenshotText]:
+        """
+        OCR screenshots, reusing cached results for identical images.
+
+        Args:
+            screenshots: Screenshot objects with image data
+
+        Returns:
+            Mapping of object name to its OCR result
+        """
+        results: dict[str, ScreenshotText] = {}
+        pending: dict[str, tuple[str, bytes]] = {}
+
+        for screenshot in screenshots:
+            if not screenshot.image_data:
+                continue
+            image_hash = hashlib.sha256(screenshot.image_data).hexdigest()
+            cached = self._read_cache(image_hash)
+            if cached:
+                results[screenshot.object_name] = cached
+            else:
+                pending[screenshot.object_name] = (image_hash, screenshot.image_data)
+
+        if pending and self.available:
+            timer = ExecutionTimer()
+            jobs = [
+                (image_hash, data, self.vision.ocr_language, self.vision.ocr_min_confidence)
+                for image_hash, data in pending.values()
+            ]
+
+            # Process startup dominates for a couple of images
+            if self.max_workers > 1 and len(jobs) > 2:
+                with ProcessPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as pool:
+                    recognized = list(pool.map(_recognize, jobs))
+            else:
+                recognized = [_recognize(job) for job in jobs]
+
+            for object_name, text in zip(pending, recognized):
+                if text:
+                    self._write_cache(text)
+                    results[object_name] = text
+
+            logger.info(
+                "OCR complete",
+                screenshots=len(jobs),
+                cached=len(results) - sum(1 for t in recognized if t),
+                duration_ms=round(timer.elapsed_ms(), 2),
+            )
+
+        return results
+
+    def is_text_only(self, text: ScreenshotText | None) -> bool:
+        """Whether a screen's content is almost entirely text OCR already captured."""
+        return bool(
+            text
+            and text.lines
+            and text.ink_outside_text <= self.vision.text_only_max_ink_ratio
+        )
+
+    def to_documents(
+        self, screenshots: list[Any], texts: dict[str, ScreenshotText], form_name: str
+    ) -> list[Document]:
+        """
+        Build searchable ``screenshot_text`` documents from OCR results.
+
+        Args:
+            screenshots: Screenshot objects the texts belong to
+            texts: OCR results keyed by object name
+            form_name: Name of the form
+
+        Returns:
+            One document per screenshot with recognized text
+        """
+        documents = []
+        for screenshot in screenshots:
+            document = self.to_document(
+                screenshot.object_name,
+                screenshot.screen_type,
+                texts.get(screenshot.object_name),
+                form_name,
+            )
+            if document:
+                documents.append(document)
+        return documents
+
+    def to_document(
+        self, object_name: str, screen_type: str, text: ScreenshotText | None, form_name: str
+    ) -> Document | None:
+        """
+        Build the ``screenshot_text`` document for one screenshot.
+
+        Args:
+            object_name: Object name of the screenshot
+            screen_type: Screen type of the screenshot
+            text: OCR result (None or empty yields no document)
+            form_name: Name of the form
+
+        Returns:
+            Document, or None when no text was recognized
+        """
+        if not text or not text.lines:
+            return None
+        return Document(
+            page_content=f"Text visible on screenshot {object_name}:\n{text.text}",
+            metadata={
+                "form_name": form_name,
+                "object_name": object_name,
+                "screen_type": screen_type,
+                "line_count": len(text.lines),
+                "doc_type": "screenshot_text",
+            },
+        )
+
+    def get_cached(self, image_hash: str | None) -> ScreenshotText | None:
+        """
+        Read a cached OCR result by image hash, without the image.
+
+        Args:
+            image_hash: SHA-256 of the image bytes (ScreenshotText.image_hash)
+
+        Returns:
+            Cached result, or None on a miss
+        """
+        return self._read_cache(image_hash) if image_hash else None
+
+    def _cache_path(self, image_hash: str) -> Path:
+        """Path of the cached result for an image hash."""
+        return self.cache_dir / f"{image_hash}.json"
+
+    def _read_cache(self, image_hash: str) -> ScreenshotText | None:
+        """Read a cached OCR result."""
+        try:
+            return ScreenshotText.from_dict(json.loads(self._cache_path(image_hash).read_text()))
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _write_cache(self, text: ScreenshotText) -> None:
+        """Write an OCR result atomically."""
+        path = self._cache_path(text.image_hash)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(text.to_dict()))
+        os.replace(tmp_path, path)
+
+
+def _recognize(job: tuple[str, bytes, str, int]) -> ScreenshotText | None:
+    """OCR one image; runs in a worker process."""
+    import pytesseract
+
+    image_hash, data, language, min_confidence = job
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            image = source.convert("RGB")
+        ocr = pytesseract.image_to_data(
+            image, lang=language, output_type=pytesseract.Output.DICT
+        )
+    except Exception as e:
+        logger.warning("OCR failed", image_hash=image_hash, error=str(e))
+        return None
+
+    # Group words into lines by Tesseract's block/paragraph/line numbering
+    grouped: dict[tuple[int, int, int], list[int]] = {}
+    for i, word in enumerate(ocr["text"]):
+        if word.strip() and float(ocr["conf"][i]) >= min_confidence:
+            key = (ocr["block_num"][i], ocr["par_num"][i], ocr["line_num"][i])
+            grouped.setdefault(key, []).append(i)
+
+    lines = []
+    for indexes in grouped.values():
+        left = min(ocr["left"][i] for i in indexes)
+        top = min(ocr["top"][i] for i in indexes)
+        right = max(ocr["left"][i] + ocr["width"][i] for i in indexes)
+        bottom = max(ocr["top"][i] + ocr["height"][i] for i in indexes)
+        lines.append(
+            TextLine(
+                text=" ".join(ocr["text"][i].strip() for i in indexes),
+                left=left,
+                top=top,
+                width=right - left,
+                height=bottom - top,
+                confidence=round(sum(float(ocr["conf"][i]) for i in indexes) / len(indexes), 1),
+            )
+        )
+    lines.sort(key=lambda line: (line.top, line.left))
+
+    return ScreenshotText(
+        image_hash=image_hash,
+        width=image.width,
+        height=image.height,
+        lines=lines,
+        ink_outside_text=_ink_outside_text(image, lines),
+    )
+
+
+def _ink_outside_text(image: Image.Image, lines: list[TextLine]) -> float:
+    """Share of the image's non-background pixels that lie outside text boxes."""
+    gray = image.convert("L")
+    background = max(range(256), key=gray.histogram().__getitem__)
+    ink = ImageChops.difference(gray, Image.new("L", gray.size, background)).point(
+        lambda p: 255 if p > _INK_THRESHOLD else 0
+    )
+    total = ink.histogram()[255]
+    if not total:
+        return 0.0
+
+    mask = Image.new("L", gray.size, 255)
+    draw = ImageDraw.Draw(mask)
+    for line in lines:
+        draw.rectangle(
+            [line.left - 2, line.top - 2, line.left + line.width + 2, line.top + line.height + 2],
+            fill=0,
+        )
+    outside = ImageChops.multiply(ink, mask).histogram()[255]
+    return round(outside / total, 4)
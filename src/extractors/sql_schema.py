@@ -0,0 +1,444 @@
+"""
+SQL DDL parser that builds a structured schema index.
+
+Parses CREATE TABLE, CREATE INDEX and ALTER TABLE ... ADD statements from
+legacy DDL scripts (Oracle, SQL Server, MySQL and PostgreSQL dialects are
+handled on a best-effort basis) into tables, columns, keys and indexes, so
+data requirements can be produced without asking an LLM to guess them.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.utils.logging_config import get_logger
+from src.utils.serialization import to_dict_safe
+
+logger = get_logger(__name__)
+
+_COMMENT_OR_STRING = re.compile(r"--[^\n]*|/\*.*?\*/|'(?:''|[^'])*'", re.DOTALL)
+_TOKEN = re.compile(r"\((?:[^()]|\([^()]*\))*\)|'(?:''|[^'])*'|\"[^\"]*\"|`[^`]*`|\[[^\]]*\]|[^\s(]+")
+_IDENTIFIER = r"(?:\"[^\"]+\"|`[^`]+`|\[[^\]]+\]|[\w$#]+)"
+_QUALIFIED = rf"{_IDENTIFIER}(?:\s*\.\s*{_IDENTIFIER})*"
+
+_CREATE_TABLE = re.compile(
+    rf"^CREATE\s+(?:OR\s+REPLACE\s+)?(?:(?:GLOBAL|LOCAL)\s+)?(?:TEMPORARY\s+|TEMP\s+)?TABLE\s+"
+    rf"(?:IF\s+NOT\s+EXISTS\s+)?({_QUALIFIED})\s*\(",
+    re.IGNORECASE,
+)
+_CREATE_INDEX = re.compile(
+    rf"^CREATE\s+(UNIQUE\s+)?(?:CLUSTERED\s+|NONCLUSTERED\s+|BITMAP\s+)?INDEX\s+"
+    rf"(?:IF\s+NOT\s+EXISTS\s+)?({_QUALIFIED})\s+ON\s+({_QUALIFIED})\s*(\(.*?\))",
+    re.IGNORECASE | re.DOTALL,
+)
+_ALTER_TABLE_ADD = re.compile(
+    rf"^ALTER\s+TABLE\s+(?:ONLY\s+)?({_QUALIFIED})\s+ADD\s+(.*)$", re.IGNORECASE | re.DOTALL
+)
+
+# Keywords that end a column's data type
+_COLUMN_KEYWORDS = {
+    "NOT",
+    "NULL",
+    "DEFAULT",
+    "PRIMARY",
+    "UNIQUE",
+    "REFERENCES",
+    "CHECK",
+    "CONSTRAINT",
+    "COLLATE",
+    "GENERATED",
+    "AUTO_INCREMENT",
+    "AUTOINCREMENT",
+    "IDENTITY",
+    "COMMENT",
+    "ENABLE",
+    "DISABLE",
+}
+
+_TYPE_CATEGORIES = [
+    (("bool", "bit"), "boolean"),
+    (("date", "time", "year", "interval"), "date"),
+    (
+        ("int", "number", "numeric", "decimal", "dec", "float", "double", "real", "money", "serial"),
+        "number",
+    ),
+    (("blob", "binary", "raw", "image", "bytea", "bfile"), "binary"),
+]
+
+
+@dataclass
+class ColumnDefinition:
+    """A table column."""
+
+    name: str
+    data_type: str
+    nullable: bool = True
+    default: str | None = None
+    primary_key: bool = False
+    unique: bool = False
+
+
+@dataclass
+class ForeignKeyDefinition:
+    """A foreign key from one table to another."""
+
+    columns: list[str]
+    ref_table: str
+    ref_columns: list[str] = field(default_factory=list)
+    name: str | None = None
+
+
+@dataclass
+class IndexDefinition:
+    """A table index."""
+
+    name: str
+    columns: list[str]
+    unique: bool = False
+
+
+@dataclass
+class TableSchema:
+    """A parsed table definition."""
+
+    name: str
+    columns: list[ColumnDefinition] = field(default_factory=list)
+    primary_key: list[str] = field(default_factory=list)
+    foreign_keys: list[ForeignKeyDefinition] = field(default_factory=list)
+    unique_constraints: list[list[str]] = field(default_factory=list)
+    indexes: list[IndexDefinition] = field(default_factory=list)
+    check_constraints: list[str] = field(default_factory=list)
+    source_file: str = ""
+
+    def get_column(self, name: str) -> ColumnDefinition | None:
+        """Find a column by case-insensitive name."""
+        lowered = name.lower()
+        return next((c for c in self.columns if c.name.lower() == lowered), None)
+
+    def add_foreign_key(self, foreign_key: ForeignKeyDefinition) -> None:
+        """Add a foreign key unless the same columns already reference the same table."""
+        for existing in self.foreign_keys:
+            if (
+                [c.lower() for c in existing.columns] == [c.lower() for c in foreign_key.columns]
+                and existing.ref_table.lower() == foreign_key.ref_table.lower()
+            ):
+                existing.name = existing.name or foreign_key.name
+                return
+        self.foreign_keys.append(foreign_key)
+
+
+@dataclass
+class SchemaIndex:
+    """All tables parsed from a set of DDL files, keyed by lowercase name."""
+
+    tables: dict[str, TableSchema] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize for activity results."""
+        return {"tables": [to_dict_safe(t) for t in self.tables.values()]}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any] | None) -> "SchemaIndex":
+        """Rebuild a schema index from its serialized form."""
+        index = cls()
+        for table in (data or {}).get("tables", []):
+            schema = TableSchema(
+                name=table["name"],
+                columns=[ColumnDefinition(**c) for c in table.get("columns", [])],
+                primary_key=table.get("primary_key", []),
+                foreign_keys=[ForeignKeyDefinition(**fk) for fk in table.get("foreign_keys", [])],
+                unique_constraints=table.get("unique_constraints", []),
+                indexes=[IndexDefinition(**ix) for ix in table.get("indexes", [])],
+                check_constraints=table.get("check_constraints", []),
+                source_file=table.get("source_file", ""),
+            )
+            index.tables[schema.name.lower()] = schema
+        return index
+
+    def referenced_by(self, table_name: str) -> list[tuple[str, ForeignKeyDefinition]]:
+        """List (table, foreign key) pairs that point at the given table."""
+        lowered = table_name.lower()
+        return [
+            (table.name, fk)
+            for table in self.tables.values()
+            for fk in table.foreign_keys
+            if fk.ref_table.lower() == lowered
+        ]
+
+
+def generic_type(data_type: str) -> str:
+    """
+    Map a SQL data type to a generic type name.
+
+    Args:
+        data_type: SQL type, e.g. ``VARCHAR2(30)`` or ``NUMBER(10,2)``
+
+    Returns:
+        One of string, number, date, boolean or binary
+    """
+    lowered = data_type.lower()
+    for prefixes, category in _TYPE_CATEGORIES:
+        if lowered.startswith(prefixes):
+            return category
+    return "string"
+
+
+class SQLSchemaParser:
+    """
+    Parses DDL scripts into a SchemaIndex.
+
+    Usage:
+        parser = SQLSchemaParser()
+        parser.parse(ddl_text, source_file="schema/customer.sql")
+        schema = parser.schema
+    """
+
+    def __init__(self) -> None:
+        """Initialize the parser with an empty schema."""
+        self.schema = SchemaIndex()
+
+    def parse(self, sql: str, source_file: str = "") -> SchemaIndex:
+        """
+        Parse a DDL script and merge its definitions into the schema.
+
+        Args:
+            sql: DDL text
+            source_file: Path of the file the DDL came from
+
+        Returns:
+            The accumulated SchemaIndex
+        """
+        for statement in _split_statements(sql):
+            try:
+                self._parse_statement(statement, source_file)
+            except Exception as e:
+                logger.debug(
+                    "Skipping unparseable DDL statement",
+                    source_file=source_file,
+                    statement=statement[:80],
+                    error=str(e),
+                )
+        return self.schema
+
+    def _parse_statement(self, statement: str, source_file: str) -> None:
+        """Dispatch a single statement to its handler."""
+        create_table = _CREATE_TABLE.match(statement)
+        if create_table:
+            body_start = create_table.end() - 1
+            body = statement[body_start + 1 : _matching_paren(statement, body_start)]
+            table = TableSchema(name=_unquote(create_table.group(1)), source_file=source_file)
+            for item in _split_top_level(body):
+                self._parse_table_item(table, item)
+            self.schema.tables[table.name.lower()] = table
+            return
+
+        create_index = _CREATE_INDEX.match(statement)
+        if create_index:
+            table = self._get_or_create(_unquote(create_index.group(3)), source_file)
+            table.indexes.append(
+                IndexDefinition(
+                    name=_unquote(create_index.group(2)),
+                    columns=_column_list(create_index.group(4)),
+                    unique=bool(create_index.group(1)),
+                )
+            )
+            return
+
+        alter = _ALTER_TABLE_ADD.match(statement)
+        if alter:
+            table = self._get_or_create(_unquote(alter.group(1)), source_file)
+            addition = alter.group(2).strip()
+            if addition.startswith("(") and _matching_paren(addition, 0) == len(addition) - 1:
+                items = _split_top_level(addition[1:-1])
+            else:
+                items = [re.sub(r"^COLUMN\s+", "", addition, flags=re.IGNORECASE)]
+            for item in items:
+                self._parse_table_item(table, item)
+
+    def _get_or_create(self, name: str, source_file: str) -> TableSchema:
+        """Get a table, creating a placeholder if DDL references it before creation."""
+        key = name.lower()
+        if key not in self.schema.tables:
+            self.schema.tables[key] = TableSchema(name=name, source_file=source_file)
+        return self.schema.tables[key]
+
+    def _parse_table_item(self, table: TableSchema, item: str) -> None:
+        """Parse a column definition or table-level constraint."""
+        item = item.strip()
+        constraint_name = None
+        named = re.match(rf"CONSTRAINT\s+({_IDENTIFIER})\s+(.*)$", item, re.IGNORECASE | re.DOTALL)
+        if named:
+            constraint_name = _unquote(named.group(1))
+            item = named.group(2).strip()
+
+        upper = item.upper()
+        if upper.startswith("PRIMARY KEY"):
+            table.primary_key = _column_list(item[len("PRIMARY KEY") :])
+            for column_name in table.primary_key:
+                column = table.get_column(column_name)
+                if column:
+                    column.primary_key = True
+                    column.nullable = False
+        elif upper.startswith("FOREIGN KEY"):
+            match = re.match(
+                rf"FOREIGN\s+KEY\s*(\(.*?\))\s*REFERENCES\s+({_QUALIFIED})\s*(\(.*?\))?",
+                item,
+                re.IGNORECASE | re.DOTALL,
+            )
+            if match:
+                table.add_foreign_key(
+                    ForeignKeyDefinition(
+                        columns=_column_list(match.group(1)),
+                        ref_table=_unquote(match.group(2)),
+                        ref_columns=_column_list(match.group(3) or ""),
+                        name=constraint_name,
+                    )
+                )
+        elif upper.startswith("UNIQUE"):
+            columns = _column_list(re.sub(r"^UNIQUE\s+(?:KEY|INDEX)?\s*(\w+\s*)?", "", item, flags=re.I))
+            if columns:
+                table.unique_constraints.append(columns)
+        elif upper.startswith("CHECK"):
+            table.check_constraints.append(" ".join(item[len("CHECK") :].split()))
+        elif re.match(r"^(?:KEY|INDEX)\b", upper):
+            match = re.match(rf"^(?:KEY|INDEX)\s+({_IDENTIFIER})?\s*(\(.*\))", item, re.I | re.S)
+            if match:
+                table.indexes.append(
+                    IndexDefinition(
+                        name=_unquote(match.group(1) or ""), columns=_column_list(match.group(2))
+                    )
+                )
+        else:
+            self._parse_column(table, item)
+
+    def _parse_column(self, table: TableSchema, item: str) -> None:
+        """Parse a column definition with inline constraints."""
+        tokens = _TOKEN.findall(item)
+        if len(tokens) < 2:
+            return
+
+        column = ColumnDefinition(name=_unquote(tokens[0]), data_type="")
+        type_parts: list[str] = []
+        index = 1
+        while index < len(tokens) and tokens[index].upper() not in _COLUMN_KEYWORDS:
+            token = tokens[index]
+            if token.startswith("(") and type_parts:
+                type_parts[-1] += token.replace(" ", "")
+            else:
+                type_parts.append(token)
+            index += 1
+        column.data_type = " ".join(type_parts).upper()
+
+        rest = tokens[index:]
+        upper_rest = [t.upper() for t in rest]
+        for position, token in enumerate(upper_rest):
+            following = upper_rest[position + 1] if position + 1 < len(rest) else ""
+            if token == "NOT" and following == "NULL":
+                column.nullable = False
+            elif token == "PRIMARY" and following == "KEY":
+                column.primary_key = True
+                column.nullable = False
+                if column.name not in table.primary_key:
+                    table.primary_key.append(column.name)
+            elif token == "UNIQUE":
+                column.unique = True
+            elif token == "DEFAULT" and position + 1 < len(rest):
+                column.default = rest[position + 1]
+            elif token == "REFERENCES" and position + 1 < len(rest):
+                ref_columns = rest[position + 2] if position + 2 < len(rest) else ""
+                table.add_foreign_key(
+                    ForeignKeyDefinition(
+                        columns=[column.name],
+                        ref_table=_unquote(rest[position + 1]),
+                        ref_columns=_column_list(ref_columns) if ref_columns.startswith("(") else [],
+                    )
+                )
+            elif token == "CHECK" and position + 1 < len(rest):
+                table.check_constraints.append(rest[position + 1])
+
+        table.columns.append(column)
+
+
+def _split_statements(sql: str) -> list[str]:
+    """Remove comments and split a script into statements."""
+    cleaned = _COMMENT_OR_STRING.sub(
+        lambda m: m.group(0) if m.group(0).startswith("'") else " ", sql
+    )
+    # Oracle scripts terminate PL/SQL blocks with a lone slash
+    cleaned = re.sub(r"^\s*/\s*$", ";", cleaned, flags=re.MULTILINE)
+
+    statements: list[str] = []
+    depth = 0
+    in_string = False
+    current: list[str] = []
+    for char in cleaned:
+        if char == "'":
+            in_string = not in_string
+        elif not in_string:
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth = max(0, depth - 1)
+            elif char == ";" and depth == 0:
+                statements.append("".join(current).strip())
+                current = []
+                continue
+        current.append(char)
+    statements.append("".join(current).strip())
+
+    return [" ".join(s.split()) for s in statements if s.strip()]
+
+
+def _split_top_level(body: str) -> list[str]:
+    """Split a parenthesized body on commas that are not nested."""
+    items: list[str] = []
+    depth = 0
+    in_string = False
+    current: list[str] = []
+    for char in body:
+        if char == "'":
+            in_string = not in_string
+        elif not in_string:
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            elif char == "," and depth == 0:
+                items.append("".join(current).strip())
+                current = []
+                continue
+        current.append(char)
+    items.append("".join(current).strip())
+    return [item for item in items if item]
+
+
+def _matching_paren(text: str, open_index: int) -> int:
+    """Return the index of the parenthesis closing text[open_index]."""
+    depth = 0
+    for index in range(open_index, len(text)):
+        if text[index] == "(":
+            depth += 1
+        elif text[index] == ")":
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(text)
+
+
+def _column_list(text: str) -> list[str]:
+    """Parse ``(a, b DESC, "c")`` into column names."""
+    text = text.strip()
+    if text.startswith("("):
+        text = text[1 : _matching_paren(text, 0)]
+    columns = []
+    for part in _split_top_level(text):
+        name = part.split()[0] if part.split() else ""
+        if name:
+            columns.append(_unquote(name))
+    return columns
+
+
+def _unquote(identifier: str) -> str:
+    """Strip quoting and schema prefixes from an identifier."""
+    last = re.split(r"\s*\.\s*(?=(?:[^\"]*\"[^\"]*\")*[^\"]*$)", identifier.strip())[-1]
+    return last.strip("\"`[]")
@@ -0,0 +1,210 @@
+"""
+Adaptive concurrency of LLM calls.
+
+A fixed cap on in-flight requests is either too timid off-peak or triggers
+throttling at peak. The controller keeps a congestion window per model that
+grows additively while calls succeed quickly and shrinks multiplicatively on
+429s, timeouts and calls slower than the latency target (AIMD), bounded by a
+hard ceiling.
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+import openai
+
+from src.config.settings import get_settings
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class ConcurrencyWindow:
+    """Congestion window and counters of one model."""
+
+    window: float
+    in_flight: int = 0
+    successes: int = 0
+    throttled: int = 0
+    timeouts: int = 0
+    slow: int = 0
+    last_decrease: float = 0.0
+    waiters: deque[asyncio.Future[None]] = field(default_factory=deque)
+
+    @property
+    def limit(self) -> int:
+        """Number of calls allowed in flight."""
+        return max(1, int(self.window))
+
+    def to_dict(self) -> dict[str, Any]:
+        """Metrics for reporting."""
+        return {
+            "window": round(self.window, 2),
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self.waiters),
+            "successes": self.successes,
+            "throttled": self.throttled,
+            "timeouts": self.timeouts,
+            "slow": self.slow,
+        }
+
+
+def is_timeout(error: BaseException) -> bool:
+    """Whether an error is a request timeout."""
+    return isinstance(error, openai.APITimeoutError | asyncio.TimeoutError | TimeoutError)
+
+
+class ConcurrencyController:
+    """
+    AIMD limit on in-flight LLM calls per model.
+
+    Usage:
+        controller = get_concurrency_controller()
+        async with controller.slot("gpt-4o"):
+            response = await llm.ainvoke(messages)
+        print(controller.metrics())
+    """
+
+    def __init__(
+        self,
+        initial: int | None = None,
+        minimum: int | None = None,
+        maximum: int | None = None,
+        backoff: float | None = None,
+        latency_target_seconds: float | None = None,
+    ) -> None:
+        """
+        Initialize the controller (unset arguments default to the LLM settings).
+
+        Args:
+            initial: Starting window
+            minimum: Lowest window after backing off
+            maximum: Hard ceiling on in-flight calls
+            backoff: Factor applied to the window on congestion
+            latency_target_seconds: Calls slower than this count as congestion (0 disables)
+        """
+        llm = get_settings().llm
+        self.enabled = llm.concurrency_enabled
+        self.maximum = maximum or llm.concurrency_max
+        self.minimum = min(minimum or llm.concurrency_min, self.maximum)
+        self.initial = min(initial or llm.concurrency_initial, self.maximum)
+        self.backoff = backoff or llm.concurrency_backoff
+        if latency_target_seconds is None:
+            latency_target_seconds = llm.latency_target_seconds
+        self.latency_target_seconds = latency_target_seconds
+        self._windows: dict[str, ConcurrencyWindow] = {}
+
+    def window(self, model: str) -> ConcurrencyWindow:
+        """Get the window of a model, creating it at the initial size."""
+        if model not in self._windows:
+            self._windows[model] = ConcurrencyWindow(window=float(self.initial))
+        return self._windows[model]
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """Current window and counters per model."""
+        return {model: window.to_dict() for model, window in self._windows.items()}
+
+    @asynccontextmanager
+    async def slot(self, model: str) -> AsyncIterator[None]:
+        """
+        Hold one in-flight slot of a model for the duration of a call.
+
+        The outcome of the call adjusts the window: quick successes grow it,
+        429s, timeouts and slow calls shrink it.
+
+        Args:
+            model: Model name
+        """
+        if not self.enabled:
+            yield
+            return
+
+        state = self.window(model)
+        await self._acquire(state)
+        started = time.monotonic()
+        try:
+            yield
+        except openai.RateLimitError:
+            state.throttled += 1
+            self._decrease(model, state, started, "throttled")
+            raise
+        except Exception as e:
+            if is_timeout(e):
+                state.timeouts += 1
+                self._decrease(model, state, started, "timeout")
+            raise
+        else:
+            latency = time.monotonic() - started
+            state.successes += 1
+            if self.latency_target_seconds and latency > self.latency_target_seconds:
+                state.slow += 1
+                self._decrease(model, state, started, "slow")
+            elif state.window < self.maximum:
+                # Additive increase: about one more slot per window of successful calls
+                state.window = min(float(self.maximum), state.window + 1 / state.limit)
+        finally:
+            state.in_flight -= 1
+            self._wake(state)
+
+    # ========== Internal Helpers ==========
+
+    async def _acquire(self, state: ConcurrencyWindow) -> None:
+        """Wait for a free slot in the window."""
+        while state.in_flight >= state.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            state.waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Pass on a wake-up this waiter may already have received
+                self._wake(state)
+                raise
+            finally:
+                if waiter in state.waiters:
+                    state.waiters.remove(waiter)
+        state.in_flight += 1
+
+    def _wake(self, state: ConcurrencyWindow) -> None:
+        """Wake as many waiters as there are free slots."""
+        free = state.limit - state.in_flight
+        while free > 0 and state.waiters:
+            waiter = state.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def _decrease(
+        self, model: str, state: ConcurrencyWindow, started: float, reason: str
+    ) -> None:
+        """
+        Multiplicatively shrink the window.
+
+        Calls started before the last decrease were admitted under the old
+        window, so their failures do not shrink it again.
+        """
+        if started < state.last_decrease:
+            return
+        previous = state.window
+        state.window = max(float(self.minimum), state.window * self.backoff)
+        state.last_decrease = time.monotonic()
+        logger.info(
+            "Reduced LLM concurrency",
+            model=model,
+            reason=reason,
+            window=round(state.window, 2),
+            previous=round(previous, 2),
+        )
+
+
+@lru_cache
+def get_concurrency_controller() -> ConcurrencyController:
+    """Get the process-wide concurrency controller."""
+    return ConcurrencyController()
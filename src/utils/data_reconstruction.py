@@ -5,6 +5,7 @@ Handles converting serialized dictionaries back to dataclass instances
 after Temporal workflow serialization/deserialization.
 """
 
+import sqlite3
 from typing import Any
 
 from src.utils.logging_config import get_logger
@@ -55,6 +56,7 @@ def reconstruct_screenshot_analysis(data: dict[str, Any] | None, form_name: str)
                 data_displayed=sa_dict.get("data_displayed", []),
                 validation_rules=sa_dict.get("validation_rules", []),
                 accessibility_notes=sa_dict.get("accessibility_notes", []),
+                screenshots=sa_dict.get("screenshots", []),
             )
         )
 
@@ -66,6 +68,8 @@ def reconstruct_screenshot_analysis(data: dict[str, Any] | None, form_name: str)
         common_patterns=data.get("common_patterns", []),
         component_inventory=data.get("component_inventory", {}),
         recommendations=data.get("recommendations", []),
+        vision_calls_skipped=data.get("vision_calls_skipped", 0),
+        text_only_screens=data.get("text_only_screens", 0),
     )
 
 
@@ -372,7 +376,11 @@ def reconstruct_code_files(data: dict[str, Any] | None) -> list:
 
 def reconstruct_screenshots(data: dict[str, Any] | None, form_name: str) -> list:
     """
-    Reconstruct Screenshot objects from serialized dict.
+    Resolve screenshot references from serialized extraction data.
+
+    Activities only pass references (bucket, object, ETag, cache key); the
+    image bytes are read here from the local screenshot cache, or from Minio
+    on a cache miss.
 
     Args:
         data: Serialized screenshot data
@@ -384,94 +392,57 @@ def reconstruct_screenshots(data: dict[str, Any] | None, form_name: str) -> list
     if not data:
         return []
 
-    from src.extractors.minio_extractor import Screenshot
-
-    raw_screenshots = data.get("raw_screenshots", [])
-    screenshots = []
-    minio_extractor = None  # Lazy initialization
-
-    for item in raw_screenshots:
-        if isinstance(item, Screenshot):
-            screenshots.append(item)
-            continue
-
-        if not isinstance(item, dict):
-            continue
-
-        # Handle image_data serialization
-        image_data = _restore_image_data(item, minio_extractor, form_name)
-
-        screenshots.append(
-            Screenshot(
-                object_name=item.get("object_name", ""),
-                bucket=item.get("bucket", ""),
-                form_name=item.get("form_name", form_name),
-                screen_type=item.get("screen_type", "general"),
-                image_data=image_data,
-                content_type=item.get("content_type", "image/png"),
-                size=len(image_data) if image_data else item.get("size", 0),
-                metadata=item.get("metadata", {}),
-            )
+    from src.extractors.minio_extractor import MinioExtractor
+
+    refs = [ref for ref in data.get("screenshot_refs", []) if isinstance(ref, dict)]
+    screenshots = MinioExtractor().resolve_screenshots(refs, form_name)
+
+    if len(screenshots) < len(refs):
+        logger.warning(
+            "Some screenshot references could not be resolved",
+            form_name=form_name,
+            expected=len(refs),
+            resolved=len(screenshots),
         )
 
     return screenshots
 
 
-def _restore_image_data(item: dict[str, Any], minio_extractor: Any, form_name: str) -> bytes:
+def reconstruct_jira_issues(data: dict[str, Any] | None) -> list:
     """
-    Restore image data from various serialization formats.
+    Reconstruct JiraIssue objects from serialized extraction data.
+
+    Activities pass an issue reference (store scope or export location plus
+    keys); the issues are loaded here. Inline ``raw_issues`` are still
+    accepted.
 
     Args:
-        item: Screenshot dict
-        minio_extractor: Optional MinioExtractor instance
-        form_name: Form name for logging
+        data: Serialized Jira extraction data
 
     Returns:
-        Image data as bytes
+        List of JiraIssue objects
     """
-    import base64
-
-    from src.extractors.minio_extractor import MinioExtractor
-
-    image_data = item.get("image_data", b"")
+    if not data:
+        return []
 
-    # Handle list of integers
-    if isinstance(image_data, list):
-        return bytes(image_data)
+    from src.extractors.jira_extractor import JiraExtractor, JiraIssue
 
-    # Handle base64 string
-    if isinstance(image_data, str):
+    if data.get("issues_ref"):
         try:
-            return base64.b64decode(image_data)
-        except Exception:
-            pass
-
-    # Handle bytes
-    if isinstance(image_data, bytes) and len(image_data) > 0:
-        return image_data
-
-    # Fetch from Minio as fallback
-    try:
-        bucket = item.get("bucket", "")
-        object_name = item.get("object_name", "")
-        if bucket and object_name:
-            if minio_extractor is None:
-                minio_extractor = MinioExtractor()
-            screenshot_obj = minio_extractor.get_screenshot(bucket, object_name)
-            if screenshot_obj and screenshot_obj.image_data:
-                logger.debug(
-                    "Fetched image from Minio",
-                    form_name=form_name,
-                    object_name=object_name,
-                    size=len(screenshot_obj.image_data),
+            return JiraExtractor().resolve_issues(data["issues_ref"])
+        except (OSError, KeyError, ValueError, sqlite3.Error) as e:
+            logger.warning("Failed to resolve Jira issue reference", error=str(e))
+            return []
+
+    issues = []
+    for issue_data in data.get("raw_issues", []):
+        if isinstance(issue_data, JiraIssue):
+            issues.append(issue_data)
+        elif isinstance(issue_data, dict):
+            try:
+                issues.append(JiraIssue.from_dict(issue_data))
+            except (TypeError, ValueError) as e:
+                logger.warning(
+                    "Failed to reconstruct Jira issue", key=issue_data.get("key"), error=str(e)
                 )
-                return screenshot_obj.image_data
-    except Exception as e:
-        logger.warning(
-            "Failed to fetch image from Minio",
-            form_name=form_name,
-            object_name=item.get("object_name", ""),
-            error=str(e),
-        )
-
-    return b""
+    return issues
@@ -4,6 +4,7 @@ File utility functions for handling code files, archives, and documents.
 
 import json
 import zipfile
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
@@ -105,6 +106,49 @@ def extract_zip(
     return extracted_files
 
 
+def iter_zip_members(
+    zip_path: str | Path, filter_extensions: set[str] | None = None
+) -> Iterator[tuple[str, bytes]]:
+    """
+    Iterate over the files of a ZIP archive without extracting them to disk.
+
+    Args:
+        zip_path: Path to the ZIP file
+        filter_extensions: Optional set of extensions to filter (e.g., {'.java', '.py'})
+
+    Yields:
+        Tuples of (member path inside the archive, raw file bytes)
+    """
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        for file_info in zip_ref.infolist():
+            if file_info.is_dir():
+                continue
+
+            if filter_extensions:
+                ext = get_file_extension(file_info.filename)
+                if ext not in filter_extensions:
+                    continue
+
+            yield file_info.filename, zip_ref.read(file_info)
+
+
+def decode_content(data: bytes, encoding: str = "utf-8") -> str:
+    """
+    Decode raw file bytes with the same fallback as read_file_content.
+
+    Args:
+        data: Raw file bytes
+        encoding: Text encoding to try first
+
+    Returns:
+        Decoded text
+    """
+    try:
+        return data.decode(encoding)
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
 def read_file_content(file_path: str | Path, encoding: str = "utf-8") -> str:
     """
     Read file content with proper encoding handling.
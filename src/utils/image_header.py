@@ -0,0 +1,118 @@
+"""
+Image dimensions from file headers.
+
+Reads width and height straight from the leading bytes of PNG, JPEG, GIF,
+WebP and BMP files, so metadata can be built from a small ranged read
+instead of downloading and decoding the whole image.
+"""
+
+import struct
+from dataclasses import dataclass
+from typing import Any
+
+# JPEG start-of-frame markers carry the dimensions (C4, C8 and CC are not frames)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# JPEG markers without a length field
+_JPEG_STANDALONE_MARKERS = {0x01, 0xD8, *range(0xD0, 0xD8)}
+
+
+@dataclass
+class ImageHeader:
+    """Format and dimensions read from an image header."""
+
+    format: str
+    width: int
+    height: int
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize for caching."""
+        return {"format": self.format, "width": self.width, "height": self.height}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ImageHeader":
+        """Rebuild from the cached form."""
+        return cls(format=data["format"], width=data["width"], height=data["height"])
+
+
+def parse_image_header(data: bytes) -> ImageHeader | None:
+    """
+    Parse image dimensions from the leading bytes of an image file.
+
+    Args:
+        data: The first bytes of the file (a few KB is usually enough; JPEGs
+            with large EXIF blocks may need more)
+
+    Returns:
+        ImageHeader, or None when the format is unknown or more bytes are needed
+    """
+    try:
+        if data.startswith(b"\x89PNG\r\n\x1a\n") and data[12:16] == b"IHDR":
+            width, height = struct.unpack(">II", data[16:24])
+            return ImageHeader("png", width, height)
+
+        if data[:6] in (b"GIF87a", b"GIF89a"):
+            width, height = struct.unpack("<HH", data[6:10])
+            return ImageHeader("gif", width, height)
+
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return _parse_webp(data)
+
+        if data[:2] == b"BM":
+            return _parse_bmp(data)
+
+        if data[:2] == b"\xff\xd8":
+            return _parse_jpeg(data)
+    except struct.error:
+        # Truncated header
+        return None
+
+    return None
+
+
+def _parse_webp(data: bytes) -> ImageHeader | None:
+    """Dimensions from the first WebP chunk."""
+    chunk = data[12:16]
+    if chunk == b"VP8 " and data[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", data[26:30])
+        return ImageHeader("webp", width & 0x3FFF, height & 0x3FFF)
+    if chunk == b"VP8L" and data[20:21] == b"\x2f":
+        bits = int.from_bytes(data[21:25], "little")
+        return ImageHeader("webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    if chunk == b"VP8X" and len(data) >= 30:
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return ImageHeader("webp", width, height)
+    return None
+
+
+def _parse_bmp(data: bytes) -> ImageHeader | None:
+    """Dimensions from the BMP DIB header."""
+    (header_size,) = struct.unpack("<I", data[14:18])
+    if header_size == 12:
+        width, height = struct.unpack("<HH", data[18:22])
+    else:
+        # Negative height marks a top-down bitmap
+        width, height = struct.unpack("<ii", data[18:26])
+    return ImageHeader("bmp", abs(width), abs(height))
+
+
+def _parse_jpeg(data: bytes) -> ImageHeader | None:
+    """Dimensions from the first JPEG start-of-frame segment."""
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            offset += 1
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            offset += 2
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[offset + 5 : offset + 9])
+            return ImageHeader("jpeg", width, height)
+        (length,) = struct.unpack(">H", data[offset + 2 : offset + 4])
+        offset += 2 + length
+    return None
@@ -0,0 +1,364 @@
+"""
+Image preprocessing for vision model inputs.
+
+Screenshots are the largest LLM cost line: every image is billed by its
+512px tiles at high detail, and full-resolution PNGs inflate request size.
+Images are cropped to their content, downscaled, re-encoded in an efficient
+format and sent with an explicit detail level. Results are cached by the
+source object's ETag and the preprocessing settings.
+"""
+
+import base64
+import hashlib
+import io
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from PIL import Image, ImageChops
+
+from src.config.settings import VisionSettings, get_settings
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# OpenAI vision pricing: base tokens plus tokens per 512px tile at high detail
+_BASE_IMAGE_TOKENS = 85
+_TILE_TOKENS = 170
+_TILE_SIZE = 512
+
+_MIME_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+_PIL_FORMATS = {"webp": "WEBP", "jpeg": "JPEG", "png": "PNG"}
+
+
+@dataclass
+class VisionImage:
+    """A base64 image ready for a vision request."""
+
+    data: str
+    mime_type: str = "image/png"
+    detail: str = "auto"
+
+    @property
+    def data_url(self) -> str:
+        """Data URL for the image_url content part."""
+        return f"data:{self.mime_type};base64,{self.data}"
+
+
+@dataclass
+class PreparedImage:
+    """A preprocessed image with before/after cost statistics."""
+
+    image: VisionImage
+    original_bytes: int
+    processed_bytes: int
+    original_size: tuple[int, int]
+    processed_size: tuple[int, int]
+    original_tokens: int
+    processed_tokens: int
+    from_cache: bool = False
+
+    def stats(self) -> dict[str, Any]:
+        """Per-image statistics for reporting."""
+        return {
+            "original_bytes": self.original_bytes,
+            "processed_bytes": self.processed_bytes,
+            "original_size": list(self.original_size),
+            "processed_size": list(self.processed_size),
+            "original_tokens": self.original_tokens,
+            "processed_tokens": self.processed_tokens,
+            "detail": self.image.detail,
+            "mime_type": self.image.mime_type,
+            "from_cache": self.from_cache,
+        }
+
+
+def estimate_image_tokens(width: int, height: int, detail: str = "high") -> int:
+    """
+    Estimate the input tokens an image costs with OpenAI vision models.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        detail: Detail level (low, high or auto; auto is estimated as high)
+
+    Returns:
+        Estimated input tokens
+    """
+    if detail == "low" or width <= 0 or height <= 0:
+        return _BASE_IMAGE_TOKENS
+
+    # Fit within 2048x2048, then scale the shortest side down to 768
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+
+    tiles = math.ceil(width / _TILE_SIZE) * math.ceil(height / _TILE_SIZE)
+    return _BASE_IMAGE_TOKENS + _TILE_TOKENS * tiles
+
+
+def summarize_image_stats(stats: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Total before/after bytes and tokens over per-image statistics.
+
+    Args:
+        stats: PreparedImage.stats() dictionaries
+
+    Returns:
+        Totals and savings across all images
+    """
+    totals = {
+        key: sum(s.get(key, 0) for s in stats)
+        for key in ("original_bytes", "processed_bytes", "original_tokens", "processed_tokens")
+    }
+    return {
+        "images": len(stats),
+        **totals,
+        "bytes_saved": totals["original_bytes"] - totals["processed_bytes"],
+        "tokens_saved": totals["original_tokens"] - totals["processed_tokens"],
+    }
+
+
+def difference_hash(image_data: bytes, hash_size: int = 8) -> int:
+    """
+    Compute a perceptual difference hash (dHash) of an image.
+
+    Each bit records whether a pixel is brighter than its right neighbour in a
+    grayscale thumbnail, so re-encodes, small data changes and rescaling keep
+    most bits while different screens differ in many.
+
+    Args:
+        image_data: Encoded image bytes
+        hash_size: Hash width/height in bits (64-bit hash by default)
+
+    Returns:
+        Hash as an integer
+    """
+    with Image.open(io.BytesIO(image_data)) as image:
+        thumbnail = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+
+    pixels = thumbnail.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(left: int, right: int) -> int:
+    """Number of differing bits between two hashes."""
+    return (left ^ right).bit_count()
+
+
+def cluster_by_hash(hashes: list[int | None], threshold: int) -> list[list[int]]:
+    """
+    Group near-identical images by Hamming distance between their hashes.
+
+    Clusters are formed greedily in input order; the first image of each
+    cluster is its representative. Images without a hash stay on their own.
+
+    Args:
+        hashes: Perceptual hash per image (None when it could not be computed)
+        threshold: Maximum Hamming distance to a representative (negative disables)
+
+    Returns:
+        Clusters as lists of indexes into ``hashes``, representative first
+    """
+    clusters: list[list[int]] = []
+    for index, value in enumerate(hashes):
+        if value is not None and threshold >= 0:
+            for cluster in clusters:
+                representative = hashes[cluster[0]]
+                if representative is not None and hamming_distance(value, representative) <= threshold:
+                    cluster.append(index)
+                    break
+            else:
+                clusters.append([index])
+        else:
+            clusters.append([index])
+    return clusters
+
+
+class ImagePreprocessor:
+    """
+    Crops, downscales and re-encodes images for vision calls.
+
+    Usage:
+        preprocessor = ImagePreprocessor()
+        prepared = preprocessor.prepare(image_bytes, cache_id=(bucket, object_name, etag))
+        await agent.invoke_llm(context, prompt, images=[prepared.image])
+    """
+
+    def __init__(self, settings: VisionSettings | None = None, cache: Any = None) -> None:
+        """
+        Initialize the preprocessor.
+
+        Args:
+            settings: Optional vision settings (defaults to the application settings)
+            cache: Optional ScreenshotCache for processed images (defaults to <cache_dir>/vision)
+        """
+        self.settings = settings or get_settings().vision
+        self._cache = cache
+
+    @property
+    def cache(self) -> Any:
+        """Get or create the cache for processed images."""
+        if self._cache is None:
+            from src.extractors.screenshot_cache import ScreenshotCache
+
+            self._cache = ScreenshotCache(Path(get_settings().cache_dir) / "vision")
+        return self._cache
+
+    @property
+    def profile(self) -> str:
+        """Fingerprint of the settings that affect the output."""
+        raw = repr(sorted(self.settings.model_dump().items()))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+    def prepare(
+        self,
+        image_data: bytes,
+        mime_type: str = "image/png",
+        cache_id: tuple[str, str, str] | None = None,
+    ) -> PreparedImage:
+        """
+        Prepare an image for a vision request.
+
+        Args:
+            image_data: Original image bytes
+            mime_type: MIME type of the original image
+            cache_id: Optional (bucket, object name, ETag) of the source object;
+                processed output is cached under it
+
+        Returns:
+            PreparedImage with the request image and before/after statistics
+        """
+        with Image.open(io.BytesIO(image_data)) as original:
+            original_size = original.size
+        original_tokens = estimate_image_tokens(*original_size, detail="high")
+
+        if not self.settings.enabled:
+            image = VisionImage(base64.b64encode(image_data).decode("utf-8"), mime_type, "auto")
+            return PreparedImage(
+                image=image,
+                original_bytes=len(image_data),
+                processed_bytes=len(image_data),
+                original_size=original_size,
+                processed_size=original_size,
+                original_tokens=original_tokens,
+                processed_tokens=original_tokens,
+            )
+
+        processed, processed_mime, from_cache = self._processed_bytes(
+            image_data, mime_type, cache_id
+        )
+        with Image.open(io.BytesIO(processed)) as result:
+            processed_size = result.size
+
+        detail = self._choose_detail(processed_size)
+        return PreparedImage(
+            image=VisionImage(base64.b64encode(processed).decode("utf-8"), processed_mime, detail),
+            original_bytes=len(image_data),
+            processed_bytes=len(processed),
+            original_size=original_size,
+            processed_size=processed_size,
+            original_tokens=original_tokens,
+            processed_tokens=estimate_image_tokens(*processed_size, detail=detail),
+            from_cache=from_cache,
+        )
+
+    def _processed_bytes(
+        self, image_data: bytes, mime_type: str, cache_id: tuple[str, str, str] | None
+    ) -> tuple[bytes, str, bool]:
+        """Get processed bytes from the cache or by processing the image."""
+        output_mime = _MIME_TYPES.get(self.settings.image_format, "image/webp")
+
+        if cache_id and cache_id[2]:
+            bucket, object_name, etag = cache_id
+            variant = f"{object_name}#vision-{self.profile}"
+            cached = self.cache.get(bucket, variant, etag)
+            if cached is not None:
+                return cached, self._sniff_mime(cached, output_mime), True
+
+        processed, processed_mime = self._process(image_data, mime_type)
+
+        if cache_id and cache_id[2]:
+            self.cache.put(bucket, variant, etag, processed)
+        return processed, processed_mime, False
+
+    def _process(self, image_data: bytes, mime_type: str) -> tuple[bytes, str]:
+        """Crop, downscale and re-encode an image."""
+        with Image.open(io.BytesIO(image_data)) as source:
+            image = source.convert("RGBA" if _has_alpha(source) else "RGB")
+
+        if self.settings.crop_borders:
+            image = self._crop_uniform_border(image)
+
+        long_edge = max(image.size)
+        if long_edge > self.settings.max_long_edge:
+            scale = self.settings.max_long_edge / long_edge
+            new_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(new_size, Image.Resampling.LANCZOS)
+
+        image_format = self.settings.image_format.lower()
+        if image_format not in _PIL_FORMATS:
+            image_format = "webp"
+        if image_format == "jpeg" and image.mode != "RGB":
+            image = image.convert("RGB")
+
+        buffer = io.BytesIO()
+        save_kwargs: dict[str, Any] = {"optimize": True}
+        if image_format in ("webp", "jpeg"):
+            save_kwargs["quality"] = self.settings.quality
+        image.save(buffer, format=_PIL_FORMATS[image_format], **save_kwargs)
+        processed = buffer.getvalue()
+
+        # Keep the original when re-encoding did not help and nothing was cropped or scaled
+        if len(processed) >= len(image_data) and image.size == _image_size(image_data):
+            return image_data, mime_type
+        return processed, _MIME_TYPES[image_format]
+
+    def _crop_uniform_border(self, image: Image.Image) -> Image.Image:
+        """Crop borders that have the same color as the top-left pixel."""
+        rgb = image.convert("RGB")
+        background = Image.new("RGB", rgb.size, rgb.getpixel((0, 0)))
+        diff = ImageChops.difference(rgb, background)
+        # Treat near-identical colors (compression noise) as border
+        diff = ImageChops.add(diff, diff, 2.0, -self.settings.border_tolerance)
+        bbox = diff.getbbox()
+        if bbox and bbox != (0, 0, *image.size):
+            return image.crop(bbox)
+        return image
+
+    def _choose_detail(self, size: tuple[int, int]) -> str:
+        """Pick the detail level for the processed image."""
+        if self.settings.detail in ("low", "high"):
+            return self.settings.detail
+        return "low" if max(size) <= self.settings.low_detail_max_edge else "high"
+
+    @staticmethod
+    def _sniff_mime(data: bytes, default: str) -> str:
+        """MIME type of cached bytes (the original may have been kept)."""
+        if data.startswith(b"\x89PNG"):
+            return "image/png"
+        if data.startswith(b"\xff\xd8"):
+            return "image/jpeg"
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return "image/webp"
+        if data[:3] == b"GIF":
+            return "image/gif"
+        return default
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    """Whether an image carries transparency."""
+    return image.mode in ("RGBA", "LA") or "transparency" in image.info
+
+
+def _image_size(image_data: bytes) -> tuple[int, int]:
+    """Dimensions of encoded image bytes."""
+    with Image.open(io.BytesIO(image_data)) as image:
+        return image.size
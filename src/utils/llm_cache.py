@@ -0,0 +1,199 @@
+"""
+Disk-backed cache of LLM responses.
+
+Reruns after a crash or a small configuration change repeat every agent
+call, and most prompts are identical for identical inputs at the low
+temperatures used here. Responses are keyed by a fingerprint of everything
+that determines them (model, sampling parameters, prompts and image
+contents) and kept in SQLite with a time-to-live and a size bound that
+evicts the least recently used entries first.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from collections.abc import Iterator
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any
+
+from src.config.settings import get_settings
+from src.utils.file_utils import ensure_directory
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class LLMResponseCache:
+    """
+    Fingerprint-keyed LLM responses with TTL and LRU eviction.
+
+    Usage:
+        cache = LLMResponseCache()
+        key = cache.cache_key(model, temperature, max_tokens, system_prompt, user_prompt)
+        response = cache.get(key)
+        if response is None:
+            response = await call_llm()
+            cache.put(key, model, response)
+    """
+
+    SCHEMA_VERSION = 1
+
+    def __init__(
+        self,
+        cache_dir: str | Path | None = None,
+        ttl_seconds: float | None = None,
+        max_bytes: int | None = None,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Optional cache directory (defaults to <cache_dir>/llm)
+            ttl_seconds: Optional entry lifetime (defaults to LLM_CACHE_TTL_HOURS)
+            max_bytes: Optional size bound (defaults to LLM_CACHE_MAX_MB)
+        """
+        settings = get_settings()
+        self.cache_dir = ensure_directory(cache_dir or Path(settings.cache_dir) / "llm")
+        self.db_path = self.cache_dir / f"responses-v{self.SCHEMA_VERSION}.sqlite"
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None else settings.llm.cache_ttl_hours * 3600
+        )
+        self.max_bytes = (
+            max_bytes if max_bytes is not None else settings.llm.cache_max_mb * 1024 * 1024
+        )
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as conn, conn:
+            self._create_schema(conn)
+
+    @staticmethod
+    def cache_key(
+        model: str,
+        temperature: float | None,
+        max_tokens: int | None,
+        system_prompt: str,
+        user_prompt: str,
+        image_hashes: list[str] | None = None,
+        response_format: dict[str, Any] | None = None,
+    ) -> str:
+        """
+        Fingerprint of a call.
+
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            system_prompt: System message
+            user_prompt: User message text
+            image_hashes: Content hashes of attached images, in order
+            response_format: Response format (JSON schema) requested from the API
+
+        Returns:
+            Hex digest identifying the call
+        """
+        raw = json.dumps(
+            [
+                model,
+                temperature,
+                max_tokens,
+                system_prompt,
+                user_prompt,
+                image_hashes or [],
+                response_format,
+            ],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+        Read a response from the cache.
+
+        Args:
+            key: Key returned by cache_key()
+
+        Returns:
+            Cached response text, or None on a miss or an expired entry
+        """
+        now = time.time()
+        with self._connect() as conn, conn:
+            row = conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """
+        Store a response, dropping expired entries and evicting when over the size bound.
+
+        Args:
+            key: Key returned by cache_key()
+            model: Model that produced the response
+            response: Response text
+        """
+        size = len(response.encode("utf-8"))
+        if not response or size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._connect() as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, now, now, size, response),
+            )
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(conn, total)
+
+    def stats(self) -> dict[str, Any]:
+        """Hit and miss counts of this instance."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    # ========== Internal Helpers ==========
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection to the cache and close it afterwards."""
+        with closing(sqlite3.connect(self.db_path, timeout=30)) as conn:
+            yield conn
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Create the cache table if missing."""
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                size INTEGER NOT NULL,
+                response TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+            """
+        )
+
+    def _evict(self, conn: sqlite3.Connection, total: int) -> None:
+        """Delete least recently used entries until the cache is below 90% of its bound."""
+        target = int(self.max_bytes * 0.9)
+        evicted = []
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        for key, size in rows:
+            if total <= target:
+                break
+            evicted.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        logger.debug("Evicted LLM cache entries", evicted=len(evicted), size_bytes=total)
@@ -0,0 +1,167 @@
+"""
+Token, cost and latency accounting of LLM calls.
+
+Every agent call is recorded with its call site, so per-form breakdowns
+show which prompts are slow or expensive. Records are summarized per agent
+and merged across agents for the workflow output and PRD metadata.
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+# USD per million tokens: (input, cached input, output)
+MODEL_PRICES: dict[str, tuple[float, float, float]] = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "text-embedding-3-small": (0.02, 0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.13, 0.0),
+}
+
+_SUMMED_FIELDS = (
+    "calls",
+    "cache_hits",
+    "failures",
+    "retries",
+    "prompt_tokens",
+    "completion_tokens",
+    "cached_tokens",
+    "latency_ms",
+    "cost_usd",
+)
+
+
+def model_prices(model: str) -> tuple[float, float, float] | None:
+    """Prices of a model, matching dated snapshots by the longest known prefix."""
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_PRICES[name]
+    return None
+
+
+@dataclass
+class LLMCallRecord:
+    """Usage of one LLM call."""
+
+    agent: str
+    call_site: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    latency_ms: float = 0.0
+    retries: int = 0
+    from_cache: bool = False
+    success: bool = True
+
+    @property
+    def cost_usd(self) -> float:
+        """Estimated cost from list prices (0 for cache hits and unknown models)."""
+        prices = model_prices(self.model)
+        if prices is None or self.from_cache:
+            return 0.0
+        input_price, cached_price, output_price = prices
+        uncached = self.prompt_tokens - self.cached_tokens
+        return (
+            uncached * input_price
+            + self.cached_tokens * cached_price
+            + self.completion_tokens * output_price
+        ) / 1_000_000
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize for reporting."""
+        return {
+            "agent": self.agent,
+            "call_site": self.call_site,
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "latency_ms": round(self.latency_ms, 2),
+            "retries": self.retries,
+            "from_cache": self.from_cache,
+            "success": self.success,
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+def summarize_llm_calls(records: list[LLMCallRecord]) -> dict[str, Any]:
+    """
+    Aggregate call records into totals and a per call site breakdown.
+
+    Args:
+        records: Calls of one agent run
+
+    Returns:
+        Totals with a ``by_call_site`` mapping of the same totals
+    """
+    summary = _empty_totals()
+    by_call_site: dict[str, dict[str, Any]] = {}
+    for record in records:
+        totals = {
+            "calls": 1,
+            "cache_hits": int(record.from_cache),
+            "failures": int(not record.success),
+            "retries": record.retries,
+            "prompt_tokens": record.prompt_tokens,
+            "completion_tokens": record.completion_tokens,
+            "cached_tokens": record.cached_tokens,
+            "latency_ms": record.latency_ms,
+            "cost_usd": record.cost_usd,
+        }
+        _add(summary, totals)
+        site = by_call_site.setdefault(record.call_site, {**_empty_totals(), "model": record.model})
+        _add(site, totals)
+
+    summary["by_call_site"] = {site: _rounded(t) for site, t in by_call_site.items()}
+    return _rounded(summary)
+
+
+def merge_llm_usage(usages: dict[str, dict[str, Any] | None]) -> dict[str, Any]:
+    """
+    Merge the usage summaries of several agents.
+
+    Args:
+        usages: Summaries from summarize_llm_calls() keyed by workflow step
+
+    Returns:
+        Overall totals with ``by_agent`` totals and the merged ``by_call_site`` breakdown
+    """
+    merged = _empty_totals()
+    by_call_site: dict[str, dict[str, Any]] = {}
+    by_agent: dict[str, dict[str, Any]] = {}
+    for step, usage in usages.items():
+        if not usage:
+            continue
+        _add(merged, usage)
+        by_agent[step] = _rounded({k: usage.get(k, 0) for k in _SUMMED_FIELDS})
+        for site, totals in usage.get("by_call_site", {}).items():
+            target = by_call_site.setdefault(site, {**_empty_totals(), "model": totals.get("model")})
+            _add(target, totals)
+
+    merged["by_agent"] = by_agent
+    merged["by_call_site"] = {site: _rounded(t) for site, t in by_call_site.items()}
+    return _rounded(merged)
+
+
+# ========== Internal Helpers ==========
+
+
+def _empty_totals() -> dict[str, Any]:
+    """Zeroed totals."""
+    return {name: 0 for name in _SUMMED_FIELDS}
+
+
+def _add(target: dict[str, Any], source: dict[str, Any]) -> None:
+    """Add the summed fields of ``source`` to ``target``."""
+    for name in _SUMMED_FIELDS:
+        target[name] += source.get(name, 0)
+
+
+def _rounded(totals: dict[str, Any]) -> dict[str, Any]:
+    """Round latency and cost for reporting."""
+    totals["latency_ms"] = round(totals["latency_ms"], 2)
+    totals["cost_usd"] = round(totals["cost_usd"], 6)
+    return totals
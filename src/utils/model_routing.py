@@ -0,0 +1,145 @@
+"""
+Per-call-site model routing.
+
+Most agent calls are list-style extractions (actors, success factors,
+integration points) that a small model answers as well as the default one,
+faster and at a fraction of the cost. Calls are routed by their call site
+(``Agent._method``) to a tier with its own model, completion limit and
+temperature. A tier can escalate to a stronger one when its answer fails
+the caller's validation.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+from src.config.settings import get_settings
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+STANDARD_TIER = "standard"
+FAST_TIER = "fast"
+VISION_TIER = "vision"
+
+# Call sites answered well by the fast tier: short lists and simple sections.
+# Combined section calls are routed by their own call site. The user flow
+# context call only holds fast-tier lists; the risk sections call also writes
+# the recommended approach and executive summary, so it stays on the standard
+# tier (one standard call instead of two standard and three fast ones).
+DEFAULT_ROUTES: dict[str, str] = {
+    "UserFlowAgent._generate_context_sections": FAST_TIER,
+    "UserFlowAgent._identify_actors": FAST_TIER,
+    "UserFlowAgent._identify_flow_boundaries": FAST_TIER,
+    "UserFlowAgent._identify_cross_module_flows": FAST_TIER,
+    "RiskAnalysisAgent._identify_dependency_risks": FAST_TIER,
+    "RiskAnalysisAgent._identify_technical_debt": FAST_TIER,
+    "RiskAnalysisAgent._identify_success_factors": FAST_TIER,
+    "RequirementsGeneratorAgent._extract_integration_requirements": FAST_TIER,
+    "RequirementsGeneratorAgent._identify_assumptions": FAST_TIER,
+    "AtlassianIntegrationAgent._extract_business_rules": FAST_TIER,
+}
+
+
+@dataclass
+class ModelTier:
+    """Model and sampling parameters of a routing tier."""
+
+    name: str
+    model: str
+    max_tokens: int
+    temperature: float
+    escalate_to: str | None = None
+
+
+class ModelRouter:
+    """
+    Routing table from call sites to model tiers.
+
+    Usage:
+        router = get_model_router()
+        tier = router.route("UserFlowAgent._identify_actors", default="standard")
+        llm = ChatOpenAI(model=tier.model, max_tokens=tier.max_tokens)
+    """
+
+    def __init__(
+        self,
+        tiers: dict[str, ModelTier] | None = None,
+        routes: dict[str, str] | None = None,
+        enabled: bool | None = None,
+    ) -> None:
+        """
+        Initialize the router (unset arguments default to the settings).
+
+        Args:
+            tiers: Tiers by name; must include the standard tier
+            routes: Tier name per call site
+            enabled: Whether call sites are routed (otherwise agents use their default tier)
+        """
+        settings = get_settings()
+        self.tiers = tiers or _default_tiers()
+        if routes is None:
+            routes = {**DEFAULT_ROUTES, **_parse_routes(settings.llm.routes)}
+        self.routes = {site: tier for site, tier in routes.items() if tier in self.tiers}
+        for site in routes.keys() - self.routes.keys():
+            logger.warning("Ignoring route to unknown model tier", call_site=site, tier=routes[site])
+        self.enabled = settings.llm.routing_enabled if enabled is None else enabled
+
+    def tier(self, name: str) -> ModelTier:
+        """Get a tier by name, falling back to the standard tier."""
+        return self.tiers.get(name) or self.tiers[STANDARD_TIER]
+
+    def route(self, call_site: str, default: str = STANDARD_TIER) -> ModelTier:
+        """
+        Select the tier of a call.
+
+        Args:
+            call_site: Qualified name of the calling method (``Agent._method``)
+            default: Tier of the agent when the call site has no route
+
+        Returns:
+            The tier to call
+        """
+        if self.enabled and call_site in self.routes:
+            return self.tier(self.routes[call_site])
+        return self.tier(default)
+
+
+# ========== Internal Helpers ==========
+
+
+def _default_tiers() -> dict[str, ModelTier]:
+    """Tiers configured by the OpenAI and LLM settings."""
+    settings = get_settings()
+    openai, llm = settings.openai, settings.llm
+    return {
+        STANDARD_TIER: ModelTier(
+            STANDARD_TIER, openai.model, openai.max_tokens, openai.temperature
+        ),
+        FAST_TIER: ModelTier(
+            FAST_TIER,
+            llm.fast_model,
+            llm.fast_max_tokens,
+            llm.fast_temperature,
+            escalate_to=STANDARD_TIER if llm.escalation_enabled else None,
+        ),
+        VISION_TIER: ModelTier(
+            VISION_TIER, llm.vision_model, openai.max_tokens, openai.temperature
+        ),
+    }
+
+
+def _parse_routes(spec: str) -> dict[str, str]:
+    """Parse ``Agent._method=tier`` pairs separated by commas."""
+    routes: dict[str, str] = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        call_site, _, tier = item.partition("=")
+        routes[call_site.strip()] = tier.strip()
+    return routes
+
+
+@lru_cache
+def get_model_router() -> ModelRouter:
+    """Get the process-wide model router."""
+    return ModelRouter()
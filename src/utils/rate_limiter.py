@@ -0,0 +1,445 @@
+"""
+Rate limiting of OpenAI API calls.
+
+Agents and the embedding service share the organization's request and token
+per-minute limits. Each model gets two token buckets, one for requests and
+one for estimated tokens, which refill continuously at the configured rate.
+Callers reserve capacity before a call and reconcile the token estimate with
+the usage the API reports afterwards. A 429 with ``Retry-After`` pauses the
+model for every caller.
+
+By default the bucket state lives in a small SQLite file under the cache
+directory, so all worker processes on a host draw from the same budget.
+"""
+
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, TypeVar
+
+import openai
+
+from src.config.settings import get_settings
+from src.utils.file_utils import ensure_directory
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+R = TypeVar("R")
+
+# Tokens counted for an image without knowing its tile count
+LOW_DETAIL_IMAGE_TOKENS = 85
+HIGH_DETAIL_IMAGE_TOKENS = 765
+
+
+@dataclass
+class RateLimits:
+    """Per-minute limits of one model (0 disables a bucket)."""
+
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate for English text (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def usage_tokens(response: Any) -> int | None:
+    """Total tokens reported on a LangChain chat response, if any."""
+    usage = getattr(response, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+def retry_after_seconds(error: BaseException) -> float | None:
+    """
+    Read the server's requested wait from an API error.
+
+    Args:
+        error: Exception raised by the OpenAI client
+
+    Returns:
+        Seconds to wait, or None when the response carries no hint
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    if value := headers.get("retry-after-ms"):
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    if value := headers.get("retry-after"):
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an API error is transient (rate limits, timeouts, server errors)."""
+    if isinstance(error, openai.RateLimitError | openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+class RateLimiter:
+    """
+    Token buckets for requests and tokens per model.
+
+    Usage:
+        limiter = get_rate_limiter()
+        response = await limiter.run(
+            "gpt-4o",
+            estimated_tokens=1200,
+            call=lambda: llm.ainvoke(messages),
+            actual_tokens=lambda r: r.usage_metadata["total_tokens"],
+        )
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path | None = None,
+        shared: bool | None = None,
+        limits: dict[str, RateLimits] | None = None,
+    ) -> None:
+        """
+        Initialize the rate limiter.
+
+        Args:
+            db_path: Optional SQLite file for the shared state
+                (defaults to <cache_dir>/rate_limits.sqlite)
+            shared: Coordinate through SQLite across processes (defaults to settings)
+            limits: Optional per-model limits overriding the settings
+        """
+        self.settings = get_settings()
+        llm = self.settings.llm
+        self.enabled = llm.rate_limit_enabled
+        self.shared = llm.rate_limit_shared if shared is None else shared
+        self._limits = dict(limits) if limits is not None else _parse_model_limits(llm.model_limits)
+        self._memory: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+        self.db_path: Path | None = None
+        if self.shared:
+            self.db_path = Path(
+                db_path or ensure_directory(self.settings.cache_dir) / "rate_limits.sqlite"
+            )
+            with self._connect() as conn, conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS buckets ("
+                    "key TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)"
+                )
+
+    def limits_for(self, model: str) -> RateLimits:
+        """
+        Get the limits of a model.
+
+        Args:
+            model: Model name
+
+        Returns:
+            Explicit limits of the model, or the chat/embedding defaults
+        """
+        if model in self._limits:
+            return self._limits[model]
+        llm = self.settings.llm
+        if "embedding" in model:
+            return RateLimits(llm.embedding_requests_per_minute, llm.embedding_tokens_per_minute)
+        return RateLimits(llm.requests_per_minute, llm.tokens_per_minute)
+
+    def reserve(self, model: str, tokens: int) -> float:
+        """
+        Try to take one request and ``tokens`` tokens from the model's buckets.
+
+        Nothing is taken unless every bucket has enough capacity.
+
+        Args:
+            model: Model name
+            tokens: Estimated tokens of the call (prompt plus max completion)
+
+        Returns:
+            0 when the capacity was taken, otherwise seconds until it may be available
+        """
+        if not self.enabled:
+            return 0.0
+
+        limits = self.limits_for(model)
+        demands = {
+            f"{model}:requests": (limits.requests_per_minute, 1),
+            f"{model}:tokens": (limits.tokens_per_minute, min(tokens, limits.tokens_per_minute)),
+        }
+        demands = {key: demand for key, demand in demands.items() if demand[0] > 0}
+        blocked_key = f"{model}:blocked"
+
+        now = time.time()
+        with self._state([*demands, blocked_key]) as state:
+            wait = state[blocked_key][0] - now if blocked_key in state else 0.0
+            for key, (capacity, amount) in demands.items():
+                level = _refill(state.get(key), capacity, now)
+                state[key] = [level, now]
+                if level < amount:
+                    wait = max(wait, (amount - level) * 60 / capacity)
+
+            if wait > 0:
+                return wait
+
+            for key, (_, amount) in demands.items():
+                state[key][0] -= amount
+        return 0.0
+
+    async def acquire(self, model: str, tokens: int) -> float:
+        """
+        Wait until a call of ``tokens`` tokens may be made.
+
+        Args:
+            model: Model name
+            tokens: Estimated tokens of the call
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        # The reservation may wait on the SQLite lock; keep it off the event loop
+        while (wait := await asyncio.to_thread(self.reserve, model, tokens)) > 0:
+            await asyncio.sleep(wait)
+            waited += wait
+        if waited:
+            logger.debug("Rate limited", model=model, tokens=tokens, waited_s=round(waited, 2))
+        return waited
+
+    def acquire_sync(self, model: str, tokens: int) -> float:
+        """Synchronous version of acquire()."""
+        waited = 0.0
+        while (wait := self.reserve(model, tokens)) > 0:
+            time.sleep(wait)
+            waited += wait
+        if waited:
+            logger.debug("Rate limited", model=model, tokens=tokens, waited_s=round(waited, 2))
+        return waited
+
+    def reconcile(self, model: str, estimated_tokens: int, actual_tokens: int | None) -> None:
+        """
+        Correct the token bucket once the actual usage of a call is known.
+
+        Overestimates are returned to the bucket; underestimates are taken
+        from it, possibly leaving it in debt.
+
+        Args:
+            model: Model name
+            estimated_tokens: Tokens reserved before the call
+            actual_tokens: Tokens reported by the API (None leaves the estimate)
+        """
+        capacity = self.limits_for(model).tokens_per_minute
+        if not self.enabled or actual_tokens is None or capacity <= 0:
+            return
+
+        key = f"{model}:tokens"
+        now = time.time()
+        with self._state([key]) as state:
+            level = _refill(state.get(key), capacity, now)
+            level += min(estimated_tokens, capacity) - actual_tokens
+            state[key] = [min(level, float(capacity)), now]
+
+    def block(self, model: str, seconds: float) -> None:
+        """
+        Pause all calls to a model, e.g. after a 429 with Retry-After.
+
+        Args:
+            model: Model name
+            seconds: Duration of the pause
+        """
+        if not self.enabled or seconds <= 0:
+            return
+
+        key = f"{model}:blocked"
+        until = time.time() + seconds
+        with self._state([key]) as state:
+            current = state.get(key, [0.0, 0.0])[0]
+            state[key] = [max(current, until), time.time()]
+        logger.warning("Model rate limited by API", model=model, pause_s=round(seconds, 2))
+
+    async def run(
+        self,
+        model: str,
+        estimated_tokens: int,
+        call: Callable[[], Awaitable[R]],
+        actual_tokens: Callable[[R], int | None] | None = None,
+        on_retry: Callable[[Exception], None] | None = None,
+    ) -> R:
+        """
+        Make a rate-limited API call, retrying transient errors.
+
+        Args:
+            model: Model name
+            estimated_tokens: Estimated tokens of the call
+            call: Factory of the call's awaitable (invoked once per attempt)
+            actual_tokens: Optional function reading the used tokens from the result
+            on_retry: Optional callback receiving each error that is retried
+
+        Returns:
+            Result of the call
+        """
+        attempt = 0
+        while True:
+            await self.acquire(model, estimated_tokens)
+            try:
+                result = await call()
+            except Exception as e:
+                wait = await asyncio.to_thread(self._retry_wait, model, e, attempt)
+                if wait is None:
+                    raise
+                if on_retry:
+                    on_retry(e)
+                attempt += 1
+                await asyncio.sleep(wait)
+                continue
+            await asyncio.to_thread(
+                self.reconcile,
+                model,
+                estimated_tokens,
+                actual_tokens(result) if actual_tokens else None,
+            )
+            return result
+
+    def run_sync(
+        self,
+        model: str,
+        estimated_tokens: int,
+        call: Callable[[], R],
+        actual_tokens: Callable[[R], int | None] | None = None,
+        on_retry: Callable[[Exception], None] | None = None,
+    ) -> R:
+        """Synchronous version of run()."""
+        attempt = 0
+        while True:
+            self.acquire_sync(model, estimated_tokens)
+            try:
+                result = call()
+            except Exception as e:
+                wait = self._retry_wait(model, e, attempt)
+                if wait is None:
+                    raise
+                if on_retry:
+                    on_retry(e)
+                attempt += 1
+                time.sleep(wait)
+                continue
+            self.reconcile(
+                model, estimated_tokens, actual_tokens(result) if actual_tokens else None
+            )
+            return result
+
+    # ========== Internal Helpers ==========
+
+    def _retry_wait(self, model: str, error: Exception, attempt: int) -> float | None:
+        """Seconds to wait before retrying a failed call, or None to give up."""
+        if not is_retryable(error) or attempt >= self.settings.max_retries:
+            return None
+
+        max_wait = self.settings.llm.retry_max_wait_seconds
+        wait = retry_after_seconds(error)
+        if wait is None:
+            # Exponential backoff with jitter
+            wait = min(max_wait, 2**attempt) * random.uniform(0.5, 1.0)
+        wait = min(wait, max_wait)
+
+        if isinstance(error, openai.RateLimitError):
+            self.block(model, wait)
+
+        logger.warning(
+            "Retrying API call",
+            model=model,
+            attempt=attempt + 1,
+            wait_s=round(wait, 2),
+            error=type(error).__name__,
+        )
+        return wait
+
+    @contextmanager
+    def _state(self, keys: list[str]) -> Iterator[dict[str, list[float]]]:
+        """
+        Load bucket rows under a lock and write back the changed ones.
+
+        Yields:
+            Mapping of bucket key to ``[level, updated]``
+        """
+        if not self.shared:
+            with self._lock:
+                state = {key: list(self._memory[key]) for key in keys if key in self._memory}
+                yield state
+                self._memory.update(state)
+            return
+
+        with self._connect() as conn:
+            # BEGIN IMMEDIATE serializes concurrent read-modify-write cycles across processes
+            conn.execute("BEGIN IMMEDIATE")
+            placeholders = ", ".join("?" for _ in keys)
+            rows = conn.execute(
+                f"SELECT key, level, updated FROM buckets WHERE key IN ({placeholders})", keys
+            ).fetchall()
+            state = {key: [level, updated] for key, level, updated in rows}
+            try:
+                yield state
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.executemany(
+                "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)",
+                [(key, level, updated) for key, (level, updated) in state.items()],
+            )
+            conn.commit()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection to the shared state and close it afterwards."""
+        with closing(
+            sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        ) as conn:
+            yield conn
+
+
+def _refill(row: list[float] | None, capacity: int, now: float) -> float:
+    """Bucket level after refilling since the last update (new buckets start full)."""
+    if row is None:
+        return float(capacity)
+    level, updated = row
+    return min(float(capacity), level + max(0.0, now - updated) * capacity / 60)
+
+
+def _parse_model_limits(spec: str) -> dict[str, RateLimits]:
+    """Parse ``model=rpm:tpm`` pairs separated by commas."""
+    limits: dict[str, RateLimits] = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        model, _, values = item.partition("=")
+        rpm, _, tpm = values.partition(":")
+        try:
+            limits[model.strip()] = RateLimits(int(rpm or 0), int(tpm or 0))
+        except ValueError:
+            logger.warning("Ignoring invalid model rate limit", entry=item.strip())
+    return limits
+
+
+@lru_cache
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter."""
+    return RateLimiter()
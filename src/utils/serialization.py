@@ -5,9 +5,10 @@ Provides type-safe serialization for Temporal activities and data persistence.
 """
 
 import json
-import re
+import types
 from dataclasses import asdict, fields, is_dataclass
-from typing import Any, TypeVar
+from enum import Enum
+from typing import Any, TypeVar, Union, get_args, get_origin, get_type_hints
 
 from src.utils.logging_config import get_logger
 
@@ -103,7 +104,9 @@ def extract_json_from_response(response: str) -> dict[str, Any] | list[Any] | No
     """
     Extract JSON object or array from LLM response text.
 
-    Handles common cases where JSON is embedded in markdown or prose.
+    Handles common cases where JSON is embedded in markdown or prose. The
+    first complete JSON value is decoded in place, so trailing prose or a
+    second JSON block does not break parsing.
 
     Args:
         response: LLM response text
@@ -114,28 +117,17 @@ def extract_json_from_response(response: str) -> dict[str, Any] | list[Any] | No
     if not response:
         return None
 
-    # Try to find JSON array first (most common for lists)
-    array_match = re.search(r"\[[\s\S]*\]", response)
-    if array_match:
+    decoder = json.JSONDecoder()
+    start = _next_json_start(response, 0)
+    while start != -1:
         try:
-            return json.loads(array_match.group())
+            value, _ = decoder.raw_decode(response, start)
+            return value
         except json.JSONDecodeError:
-            pass
+            start = _next_json_start(response, start + 1)
 
-    # Try to find JSON object
-    object_match = re.search(r"\{[\s\S]*\}", response)
-    if object_match:
-        try:
-            return json.loads(object_match.group())
-        except json.JSONDecodeError:
-            pass
-
-    # Try parsing the entire response as JSON
-    try:
-        return json.loads(response)
-    except json.JSONDecodeError:
-        logger.debug("No valid JSON found in response", response_length=len(response))
-        return None
+    logger.debug("No valid JSON found in response", response_length=len(response))
+    return None
 
 
 def extract_json_array(response: str) -> list[dict[str, Any]]:
@@ -149,6 +141,9 @@ def extract_json_array(response: str) -> list[dict[str, Any]]:
         List of dictionaries (empty if extraction fails)
     """
     result = extract_json_from_response(response)
+    if isinstance(result, dict) and isinstance(result.get("items"), list):
+        # Structured outputs wrap lists in an object
+        result = result["items"]
     if isinstance(result, list):
         return result
     return []
@@ -202,3 +197,103 @@ def parse_list_response(response: str, prefix: str = "") -> list[str]:
             items.append(cleaned.strip())
 
     return items
+
+
+def dataclass_json_schema(cls: type, exclude: tuple[str, ...] = ()) -> dict[str, Any]:
+    """
+    Derive a strict JSON schema from a dataclass.
+
+    Every field is required and no additional properties are allowed, as
+    required by OpenAI structured outputs. Nested dataclasses, lists,
+    enums and optional fields are supported.
+
+    Args:
+        cls: Dataclass type
+        exclude: Top-level field names to leave out (e.g. fields filled in by the caller)
+
+    Returns:
+        JSON schema of an object with the dataclass fields
+    """
+    hints = get_type_hints(cls)
+    properties = {
+        f.name: _json_schema_for_type(hints[f.name])
+        for f in fields(cls)
+        if f.name not in exclude
+    }
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def json_schema_response_format(
+    cls: type, many: bool = False, exclude: tuple[str, ...] = ()
+) -> dict[str, Any]:
+    """
+    Build an OpenAI ``json_schema`` response format for a dataclass.
+
+    The schema root must be an object, so a list of results is wrapped in
+    an ``items`` property.
+
+    Args:
+        cls: Dataclass type of the result
+        many: Whether the response is a list of results
+        exclude: Top-level field names to leave out of the schema
+
+    Returns:
+        Response format for the chat completions API
+    """
+    schema = dataclass_json_schema(cls, exclude)
+    name = cls.__name__
+    if many:
+        name += "List"
+        schema = {
+            "type": "object",
+            "properties": {"items": {"type": "array", "items": schema}},
+            "required": ["items"],
+            "additionalProperties": False,
+        }
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": schema},
+    }
+
+
+# ========== Internal Helpers ==========
+
+
+_JSON_PRIMITIVES: dict[type, str] = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+}
+
+
+def _json_schema_for_type(tp: Any) -> dict[str, Any]:
+    """JSON schema of a field type."""
+    origin = get_origin(tp)
+    if origin in (Union, types.UnionType):
+        args = [arg for arg in get_args(tp) if arg is not type(None)]
+        if len(args) != 1:
+            raise TypeError(f"Unsupported union type for JSON schema: {tp}")
+        return {"anyOf": [_json_schema_for_type(args[0]), {"type": "null"}]}
+    if origin is list:
+        (item_type,) = get_args(tp) or (str,)
+        return {"type": "array", "items": _json_schema_for_type(item_type)}
+    if isinstance(tp, type) and issubclass(tp, Enum):
+        return {"type": "string", "enum": [member.value for member in tp]}
+    if tp in _JSON_PRIMITIVES:
+        return {"type": _JSON_PRIMITIVES[tp]}
+    if is_dataclass(tp):
+        return dataclass_json_schema(tp)
+    # Free-form mappings cannot be expressed in strict mode
+    raise TypeError(f"Unsupported type for JSON schema: {tp}")
+
+
+def _next_json_start(text: str, start: int) -> int:
+    """Position of the next ``{`` or ``[`` at or after ``start``, or -1."""
+    positions = [pos for pos in (text.find("{", start), text.find("[", start)) if pos != -1]
+    return min(positions, default=-1)
@@ -0,0 +1,239 @@
+"""
+Token counting and prompt budgeting.
+
+Prompts used to be assembled with fixed truncations (first five methods,
+fifteen files, ten issues, 500 characters) that either waste context or
+overflow it. Tokens are counted locally with the model's tokenizer, and
+variable context is packed into a per-call token budget by relevance.
+When the tokenizer's encoding cannot be loaded (e.g. offline workers), a
+characters-per-token estimate is used instead.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Context windows in tokens, matched by the longest model name prefix
+MODEL_CONTEXT_WINDOWS: dict[str, int] = {
+    "gpt-4.1": 1_047_576,
+    "gpt-4o": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+}
+DEFAULT_CONTEXT_WINDOW = 128_000
+
+# Tokens added per chat message by the API's message framing
+_MESSAGE_OVERHEAD_TOKENS = 4
+_CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class ContextItem:
+    """A piece of prompt context with its relevance score."""
+
+    text: str
+    score: float = 0.0
+    metadata: dict[str, Any] | None = None
+
+
+def context_window(model: str) -> int:
+    """Context window of a model in tokens."""
+    for name in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_CONTEXT_WINDOWS[name]
+    return DEFAULT_CONTEXT_WINDOW
+
+
+@lru_cache(maxsize=16)
+def _encoding(model: str) -> Any:
+    """Tokenizer of a model, or None when it cannot be loaded."""
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning("Tokenizer unavailable, estimating tokens", model=model, error=str(e))
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    Count the tokens of a text.
+
+    Args:
+        text: Text to count
+        model: Model whose tokenizer is used
+
+    Returns:
+        Token count (estimated from characters without a tokenizer)
+    """
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4o") -> str:
+    """
+    Cut a text to at most ``max_tokens`` tokens.
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token limit
+        model: Model whose tokenizer is used
+
+    Returns:
+        The text, or its leading part with a trailing ellipsis
+    """
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        limit = max_tokens * _CHARS_PER_TOKEN
+        return text if len(text) <= limit else text[: limit - 3].rstrip() + "..."
+
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[: max_tokens - 1]).rstrip() + "..."
+
+
+class TokenBudget:
+    """
+    Token budget of one LLM call.
+
+    Usage:
+        budget = TokenBudget("gpt-4o", max_completion_tokens=4096)
+        available = budget.available(system_prompt, prompt_template)
+        items = budget.pack(contexts, min(available, 6000))
+    """
+
+    def __init__(self, model: str, max_completion_tokens: int = 0, headroom: int = 1024) -> None:
+        """
+        Initialize the budget.
+
+        Args:
+            model: Model name (selects tokenizer and context window)
+            max_completion_tokens: Tokens reserved for the response
+            headroom: Safety margin for message framing and tokenizer differences
+        """
+        self.model = model
+        self.max_completion_tokens = max_completion_tokens
+        self.headroom = headroom
+
+    @property
+    def prompt_limit(self) -> int:
+        """Tokens available to all prompt messages together."""
+        return context_window(self.model) - self.max_completion_tokens - self.headroom
+
+    def count(self, text: str) -> int:
+        """Count the tokens of a text with this budget's tokenizer."""
+        return count_tokens(text, self.model)
+
+    def available(self, *fixed_texts: str) -> int:
+        """
+        Tokens left for variable context once the fixed prompt parts are counted.
+
+        Args:
+            *fixed_texts: System prompt, prompt template and other fixed parts
+
+        Returns:
+            Remaining tokens (never negative)
+        """
+        used = sum(self.count(text) + _MESSAGE_OVERHEAD_TOKENS for text in fixed_texts)
+        return max(0, self.prompt_limit - used)
+
+    def fit(self, text: str, max_tokens: int) -> str:
+        """Truncate a text to a token limit with this budget's tokenizer."""
+        return truncate_to_tokens(text, max_tokens, self.model)
+
+    def pack(
+        self,
+        items: Sequence[ContextItem | str],
+        max_tokens: int,
+        separator_tokens: int = 2,
+        max_items: int | None = None,
+    ) -> list[ContextItem]:
+        """
+        Select the most relevant items that fit into a token budget.
+
+        A knapsack-style selection: items are considered in order of score per
+        token, so several short relevant items win over one long one of similar
+        score. If not even the best item fits, it is truncated to the budget.
+        Plain strings are scored by position (earlier is more relevant).
+
+        Args:
+            items: Candidate contexts
+            max_tokens: Token budget for the selected items
+            separator_tokens: Tokens added between items by the caller's formatting
+            max_items: Optional cap on the number of selected items
+
+        Returns:
+            Selected items, most relevant first
+        """
+        candidates = [
+            item if isinstance(item, ContextItem) else ContextItem(text=item, score=-index)
+            for index, item in enumerate(items)
+        ]
+        candidates = [item for item in candidates if item.text]
+        if not candidates or max_tokens <= 0:
+            return []
+
+        # Shift scores to be positive so the density ordering is well defined
+        offset = 1 - min(item.score for item in candidates)
+        sized = [(item, self.count(item.text) + separator_tokens) for item in candidates]
+        by_density = sorted(
+            sized, key=lambda pair: (pair[0].score + offset) / max(pair[1], 1), reverse=True
+        )
+
+        selected: list[ContextItem] = []
+        remaining = max_tokens
+        for item, tokens in by_density:
+            if max_items is not None and len(selected) >= max_items:
+                break
+            if tokens <= remaining:
+                selected.append(item)
+                remaining -= tokens
+
+        if not selected:
+            best = max(candidates, key=lambda item: item.score)
+            text = self.fit(best.text, max_tokens - separator_tokens)
+            return [ContextItem(text=text, score=best.score, metadata=best.metadata)] if text else []
+
+        selected.sort(key=lambda item: item.score, reverse=True)
+        return selected
+
+    def pack_lines(self, lines: Sequence[str], max_tokens: int) -> list[str]:
+        """
+        Keep lines, in order, that fit into a token budget.
+
+        A line too long for the remaining budget is skipped, so one large
+        entry does not drop every line after it.
+
+        Args:
+            lines: Lines ordered by importance
+            max_tokens: Token budget
+
+        Returns:
+            The lines that fit
+        """
+        kept: list[str] = []
+        remaining = max_tokens
+        for line in lines:
+            tokens = self.count(line) + 1
+            if tokens > remaining:
+                continue
+            kept.append(line)
+            remaining -= tokens
+        return kept
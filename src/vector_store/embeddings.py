@@ -3,10 +3,10 @@ OpenAI Embeddings service for generating vector embeddings.
 """
 
 from langchain_openai import OpenAIEmbeddings
-from tenacity import retry, stop_after_attempt, wait_exponential
 
 from src.config.settings import get_settings
 from src.utils.logging_config import get_logger
+from src.utils.rate_limiter import RateLimiter, estimate_tokens, get_rate_limiter
 
 logger = get_logger(__name__)
 
@@ -14,13 +14,15 @@ logger = get_logger(__name__)
 class EmbeddingService:
     """
     Service for generating embeddings using OpenAI's embedding models.
-    Provides caching and batch processing capabilities.
+    Provides caching and batch processing capabilities. Calls are made
+    through the shared rate limiter, which also retries transient errors.
     """
 
     def __init__(self) -> None:
         """Initialize the embedding service."""
         self.settings = get_settings()
         self._embeddings: OpenAIEmbeddings | None = None
+        self._rate_limiter: RateLimiter | None = None
 
     @property
     def embeddings(self) -> OpenAIEmbeddings:
@@ -30,6 +32,7 @@ class EmbeddingService:
                 model=self.settings.openai.embedding_model,
                 openai_api_key=self.settings.openai.api_key,
                 dimensions=self.settings.qdrant.vector_size,
+                max_retries=0,
             )
             logger.info(
                 "Initialized OpenAI embeddings",
@@ -38,7 +41,13 @@ class EmbeddingService:
             )
         return self._embeddings
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        """Get the process-wide rate limiter."""
+        if self._rate_limiter is None:
+            self._rate_limiter = get_rate_limiter()
+        return self._rate_limiter
+
     async def embed_text(self, text: str) -> list[float]:
         """
         Generate embedding for a single text.
@@ -50,10 +59,12 @@ class EmbeddingService:
             Embedding vector as list of floats
         """
         logger.debug("Generating embedding", text_length=len(text))
-        embedding = await self.embeddings.aembed_query(text)
-        return embedding
+        return await self.rate_limiter.run(
+            self.settings.openai.embedding_model,
+            estimate_tokens(text),
+            lambda: self.embeddings.aembed_query(text),
+        )
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     async def embed_texts(self, texts: list[str]) -> list[list[float]]:
         """
         Generate embeddings for multiple texts in batch.
@@ -65,8 +76,11 @@ class EmbeddingService:
             List of embedding vectors
         """
         logger.info("Generating batch embeddings", count=len(texts))
-        embeddings = await self.embeddings.aembed_documents(texts)
-        return embeddings
+        return await self.rate_limiter.run(
+            self.settings.openai.embedding_model,
+            sum(estimate_tokens(text) for text in texts),
+            lambda: self.embeddings.aembed_documents(texts),
+        )
 
     def embed_text_sync(self, text: str) -> list[float]:
         """
@@ -78,7 +92,11 @@ class EmbeddingService:
         Returns:
             Embedding vector as list of floats
         """
-        return self.embeddings.embed_query(text)
+        return self.rate_limiter.run_sync(
+            self.settings.openai.embedding_model,
+            estimate_tokens(text),
+            lambda: self.embeddings.embed_query(text),
+        )
 
     def embed_texts_sync(self, texts: list[str]) -> list[list[float]]:
         """
@@ -90,8 +108,16 @@ class EmbeddingService:
         Returns:
             List of embedding vectors
         """
-        return self.embeddings.embed_documents(texts)
+        return self.rate_limiter.run_sync(
+            self.settings.openai.embedding_model,
+            sum(estimate_tokens(text) for text in texts),
+            lambda: self.embeddings.embed_documents(texts),
+        )
 
     def get_langchain_embeddings(self) -> OpenAIEmbeddings:
-        """Get the underlying LangChain embeddings instance for use with vectorstores."""
+        """
+        Get the underlying LangChain embeddings instance for use with vectorstores.
+
+        Calls made directly through this instance bypass the rate limiter.
+        """
         return self.embeddings
@@ -2,6 +2,7 @@
 Qdrant Vector Store Manager for knowledge base operations.
 """
 
+from collections.abc import Iterable
 from dataclasses import dataclass
 from typing import Any
 from uuid import uuid4
@@ -142,15 +143,19 @@ class QdrantManager:
         return collection_name
 
     def add_documents(
-        self, form_name: str, documents: list[Document], batch_size: int = 100
+        self, form_name: str, documents: Iterable[Document], batch_size: int = 100
     ) -> int:
         """
         Add documents to the collection with chunking and embedding.
 
+        Documents are consumed lazily and split one at a time; chunks are
+        embedded and upserted every ``batch_size`` chunks, so peak memory
+        depends on the batch size rather than on the number of documents.
+
         Args:
             form_name: Name of the form/collection
-            documents: List of LangChain Documents to add
-            batch_size: Number of documents to process at once
+            documents: Iterable (list, generator, ...) of LangChain Documents to add
+            batch_size: Number of chunks to embed and upsert at once
 
         Returns:
             Number of chunks added
@@ -160,53 +165,68 @@ class QdrantManager:
         # Ensure collection exists
         self.create_collection(form_name, recreate=False)
 
-        # Split documents into chunks
-        all_chunks: list[Document] = []
+        total_docs = 0
+        total_added = 0
+        batch: list[Document] = []
+
         for doc in documents:
-            chunks = self.text_splitter.split_documents([doc])
-            all_chunks.extend(chunks)
+            total_docs += 1
+            for chunk in self.text_splitter.split_documents([doc]):
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    total_added += self._upsert_chunks(collection_name, form_name, batch)
+                    batch = []
+
+        if batch:
+            total_added += self._upsert_chunks(collection_name, form_name, batch)
 
         logger.info(
-            "Split documents into chunks", original_docs=len(documents), chunks=len(all_chunks)
+            "Finished adding documents",
+            collection=collection_name,
+            original_docs=total_docs,
+            total_chunks=total_added,
         )
 
-        # Process in batches
-        total_added = 0
-        for i in range(0, len(all_chunks), batch_size):
-            batch = all_chunks[i : i + batch_size]
-
-            # Generate embeddings
-            texts = [chunk.page_content for chunk in batch]
-            embeddings = self.embedding_service.embed_texts_sync(texts)
-
-            # Create points for Qdrant
-            points = [
-                models.PointStruct(
-                    id=str(uuid4()),
-                    vector=embedding,
-                    payload={
-                        "content": chunk.page_content,
-                        "metadata": chunk.metadata,
-                        "form_name": form_name,
-                    },
-                )
-                for chunk, embedding in zip(batch, embeddings)
-            ]
+        return total_added
 
-            # Upsert to Qdrant
-            self.client.upsert(
-                collection_name=collection_name,
-                points=points,
-            )
+    def _upsert_chunks(self, collection_name: str, form_name: str, batch: list[Document]) -> int:
+        """
+        Embed a batch of chunks and upsert them into the collection.
 
-            total_added += len(points)
-            logger.debug("Added batch to collection", batch_size=len(points), total=total_added)
+        Args:
+            collection_name: Target collection name
+            form_name: Name of the form the chunks belong to
+            batch: Chunks to embed and store
 
-        logger.info(
-            "Finished adding documents", collection=collection_name, total_chunks=total_added
+        Returns:
+            Number of points upserted
+        """
+        # Generate embeddings
+        texts = [chunk.page_content for chunk in batch]
+        embeddings = self.embedding_service.embed_texts_sync(texts)
+
+        # Create points for Qdrant
+        points = [
+            models.PointStruct(
+                id=str(uuid4()),
+                vector=embedding,
+                payload={
+                    "content": chunk.page_content,
+                    "metadata": chunk.metadata,
+                    "form_name": form_name,
+                },
+            )
+            for chunk, embedding in zip(batch, embeddings)
+        ]
+
+        # Upsert to Qdrant
+        self.client.upsert(
+            collection_name=collection_name,
+            points=points,
         )
 
-        return total_added
+        logger.debug("Added batch to collection", batch_size=len(points))
+        return len(points)
 
     def add_text(
         self,
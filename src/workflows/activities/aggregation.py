@@ -52,10 +52,12 @@ async def aggregate_prd_activity(
             "section_count": result.data.section_count,
             "generation_metrics": result.data.generation_metrics,
             "execution_time_ms": result.execution_time_ms,
+            "llm_usage": result.metadata.get("llm_usage", {}),
         }
 
     return {
         "success": False,
         "error": result.error,
         "execution_time_ms": result.execution_time_ms,
+        "llm_usage": result.metadata.get("llm_usage", {}),
     }
@@ -10,7 +10,11 @@ from src.agents.requirements_generator_agent import RequirementsGeneratorAgent
 from src.agents.risk_analysis_agent import RiskAnalysisAgent
 from src.agents.screenshot_analysis_agent import ScreenshotAnalysisAgent
 from src.agents.user_flow_agent import UserFlowAgent
-from src.utils.data_reconstruction import reconstruct_code_files, reconstruct_screenshots
+from src.utils.data_reconstruction import (
+    reconstruct_code_files,
+    reconstruct_jira_issues,
+    reconstruct_screenshots,
+)
 from src.utils.logging_config import get_logger
 from src.workflows.activities.common import to_dict
 
@@ -21,15 +25,20 @@ logger = get_logger(__name__)
 async def analyze_screenshots_activity(
     form_name: str,
     screenshot_data: dict[str, Any],
+    form_inventory: dict[str, Any] | None = None,
 ) -> dict[str, Any]:
-    """Analyze screenshots using the ScreenshotAnalysisAgent."""
+    """Analyze screenshots and the parsed form inventory using the ScreenshotAnalysisAgent."""
     logger.info("Starting screenshot analysis", form_name=form_name)
 
     agent = ScreenshotAnalysisAgent()
     context = AgentContext(form_name=form_name)
     screenshots = reconstruct_screenshots(screenshot_data, form_name)
 
-    result = await agent.analyze(context, screenshots=screenshots if screenshots else None)
+    result = await agent.analyze(
+        context,
+        screenshots=screenshots if screenshots or form_inventory else None,
+        form_inventory=form_inventory,
+    )
 
     if result.success and result.data:
         return {
@@ -40,13 +49,19 @@ async def analyze_screenshots_activity(
             "common_patterns": result.data.common_patterns,
             "component_inventory": result.data.component_inventory,
             "recommendations": result.data.recommendations,
+            "vision_calls_skipped": result.data.vision_calls_skipped,
+            "text_only_screens": result.data.text_only_screens,
+            "image_stats": result.metadata.get("image_stats", []),
+            "image_summary": result.metadata.get("image_summary", {}),
             "execution_time_ms": result.execution_time_ms,
+            "llm_usage": result.metadata.get("llm_usage", {}),
         }
 
     return {
         "success": False,
         "error": result.error,
         "execution_time_ms": result.execution_time_ms,
+        "llm_usage": result.metadata.get("llm_usage", {}),
     }
 
 
@@ -60,7 +75,7 @@ async def analyze_jira_activity(
 
     agent = AtlassianIntegrationAgent()
     context = AgentContext(form_name=form_name)
-    issues = jira_data.get("raw_issues", [])
+    issues = reconstruct_jira_issues(jira_data)
 
     result = await agent.analyze(context, issues=issues)
 
@@ -77,12 +92,14 @@ async def analyze_jira_activity(
             "documentation_gaps": result.data.documentation_gaps,
             "summary": result.data.summary,
             "execution_time_ms": result.execution_time_ms,
+            "llm_usage": result.metadata.get("llm_usage", {}),
         }
 
     return {
         "success": False,
         "error": result.error,
         "execution_time_ms": result.execution_time_ms,
+        "llm_usage": result.metadata.get("llm_usage", {}),
     }
 
 
@@ -105,6 +122,7 @@ async def generate_requirements_activity(
         code_files=code_files if code_files else None,
         jira_context=jira_context,
         screenshot_context=screenshot_context,
+        schema=code_data.get("schema"),
     )
 
     if result.success and result.data:
@@ -122,12 +140,14 @@ async def generate_requirements_activity(
             "out_of_scope": result.data.out_of_scope,
             "summary": result.data.summary,
             "execution_time_ms": result.execution_time_ms,
+            "llm_usage": result.metadata.get("llm_usage", {}),
         }
 
     return {
         "success": False,
         "error": result.error,
         "execution_time_ms": result.execution_time_ms,
+        "llm_usage": result.metadata.get("llm_usage", {}),
     }
 
 
@@ -158,12 +178,14 @@ async def analyze_user_flows_activity(
             "user_journey_map": result.data.user_journey_map,
             "flow_diagram_mermaid": result.data.flow_diagram_mermaid,
             "execution_time_ms": result.execution_time_ms,
+            "llm_usage": result.metadata.get("llm_usage", {}),
         }
 
     return {
         "success": False,
         "error": result.error,
         "execution_time_ms": result.execution_time_ms,
+        "llm_usage": result.metadata.get("llm_usage", {}),
     }
 
 
@@ -196,10 +218,12 @@ async def analyze_risks_activity(
             "success_factors": result.data.success_factors,
             "executive_summary": result.data.executive_summary,
             "execution_time_ms": result.execution_time_ms,
+            "llm_usage": result.metadata.get("llm_usage", {}),
         }
 
     return {
         "success": False,
         "error": result.error,
         "execution_time_ms": result.execution_time_ms,
+        "llm_usage": result.metadata.get("llm_usage", {}),
     }
@@ -7,8 +7,8 @@ from temporalio import activity
 from src.extractors.code_extractor import CodeExtractor
 from src.extractors.jira_extractor import JiraExtractor
 from src.extractors.minio_extractor import MinioExtractor
+from src.extractors.screenshot_ocr import ScreenshotOCR
 from src.utils.logging_config import get_logger
-from src.workflows.activities.common import to_dict
 
 logger = get_logger(__name__)
 
@@ -20,8 +20,9 @@ async def extract_code_activity(
     code_directory: str | None = None,
     file_mappings: list[str] | None = None,
     dependency_file: str | None = None,
+    dependency_depth: int | None = None,
 ) -> dict[str, Any]:
-    """Extract and analyze code from a ZIP file or directory."""
+    """Extract and analyze code from a ZIP file (via its codebase index) or directory."""
     logger.info(
         "Starting code extraction",
         form_name=form_name,
@@ -33,8 +34,12 @@ async def extract_code_activity(
     extractor = CodeExtractor()
 
     if zip_path:
-        code_files = extractor.extract_from_zip(
-            zip_path=zip_path, file_mappings=file_mappings, dependency_file=dependency_file
+        code_files = extractor.extract_from_index(
+            zip_path=zip_path,
+            file_mappings=file_mappings,
+            dependency_file=dependency_file,
+            form_name=form_name,
+            dependency_depth=dependency_depth,
         )
     elif code_directory:
         code_files = extractor.extract_from_directory(
@@ -59,6 +64,9 @@ async def extract_code_activity(
             for cf in code_files
         ],
         "languages": list({cf.language for cf in code_files}),
+        "metrics": extractor.compute_metrics(code_files),
+        "schema": extractor.extract_schema(code_files),
+        "form_inventory": extractor.extract_form_inventory(code_files),
         # Note: raw_files removed to avoid exceeding Temporal activity result size limit
         # Files are stored in vector store and can be retrieved from there if needed
     }
@@ -76,9 +84,19 @@ async def extract_screenshots_activity(
     extractor = MinioExtractor()
     screenshots = extractor.get_form_screenshots(form_name=form_name, bucket=bucket, prefix=prefix)
 
+    # Warm the OCR cache while the image bytes are in memory; later activities reuse it
+    ocr_texts = ScreenshotOCR().extract(screenshots)
+    refs = []
+    for screenshot in screenshots:
+        ref = screenshot.to_ref()
+        if screenshot.object_name in ocr_texts:
+            ref["ocr_hash"] = ocr_texts[screenshot.object_name].image_hash
+        refs.append(ref)
+
     return {
         "form_name": form_name,
         "screenshot_count": len(screenshots),
+        "ocr_screenshots": len(ocr_texts),
         "screenshots": [
             {
                 "object_name": s.object_name,
@@ -88,7 +106,8 @@ async def extract_screenshots_activity(
             }
             for s in screenshots
         ],
-        "raw_screenshots": [to_dict(s) for s in screenshots],
+        # References only; image bytes stay in Minio and the local screenshot cache
+        "screenshot_refs": refs,
     }
 
 
@@ -97,38 +116,69 @@ async def extract_jira_activity(
     form_name: str,
     project_key: str | None = None,
     jql: str | None = None,
+    export_path: str | None = None,
 ) -> dict[str, Any]:
-    """Extract Jira issues for a form."""
+    """
+    Extract Jira issues for a form.
+
+    Without custom JQL, an offline export (argument or JIRA_EXPORT_PATH) is
+    used instead of the API when available.
+    """
     logger.info("Starting Jira extraction", form_name=form_name, project_key=project_key)
 
     extractor = JiraExtractor()
+    export_path = export_path or extractor.settings.jira.export_path
 
     try:
-        issues = extractor.get_form_issues(
-            form_name=form_name, project_key=project_key, additional_jql=jql
-        )
+        sync_stats: dict[str, Any] = {}
+        if export_path and not jql:
+            source = "export"
+            issues = extractor.get_export_issues(export_path, form_name, project_key)
+        elif extractor.settings.jira.sync_enabled:
+            source = "store"
+            # Served from the local issue store; only changes are fetched from Jira
+            sync = extractor.sync_form_issues(
+                form_name=form_name, project_key=project_key, additional_jql=jql
+            )
+            issues = sync.issues
+            sync_stats = {
+                "fetched": sync.fetched,
+                "deleted": sync.deleted,
+                "full": sync.full,
+                "deletion_checked": sync.deletion_checked,
+            }
+        else:
+            source = "api"
+            issues = extractor.get_form_issues(
+                form_name=form_name, project_key=project_key, additional_jql=jql
+            )
+
+        # Issues are loaded by reference in later activities; their full text
+        # would exceed the Temporal payload limit for large forms. Issues not
+        # available locally to the consuming worker are re-fetched by key.
+        issues_ref: dict[str, Any] = {"source": source, "keys": [issue.key for issue in issues]}
+        if source == "export":
+            issues_ref.update(
+                export_path=str(export_path), form_name=form_name, project_key=project_key
+            )
+        elif source == "store":
+            issues_ref["scope"] = extractor.store.scope_for(
+                extractor.build_form_jql(form_name, project_key, jql)
+            )
 
         return {
             "form_name": form_name,
             "issue_count": len(issues),
-            "issues": [
-                {
-                    "key": issue.key,
-                    "summary": issue.summary,
-                    "issue_type": issue.issue_type,
-                    "status": issue.status,
-                    "priority": issue.priority,
-                }
-                for issue in issues
-            ],
-            "raw_issues": issues,
+            "source": source,
+            "sync": sync_stats,
+            "text_stats": extractor.text_stats,
+            "issues_ref": issues_ref,
         }
     except Exception as e:
         logger.warning("Jira extraction failed", error=str(e))
         return {
             "form_name": form_name,
             "issue_count": 0,
-            "issues": [],
-            "raw_issues": [],
+            "issues_ref": None,
             "error": str(e),
         }
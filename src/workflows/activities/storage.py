@@ -1,13 +1,16 @@
 """Storage activities for PRD generation workflow."""
 
+from collections.abc import Iterator
 from datetime import datetime
 from typing import Any
 
+from langchain_core.documents import Document
 from temporalio import activity
 
 from src.extractors.jira_extractor import JiraExtractor
-from src.extractors.minio_extractor import MinioExtractor, Screenshot
-from src.utils.data_reconstruction import _restore_image_data
+from src.extractors.minio_extractor import MinioExtractor
+from src.extractors.screenshot_ocr import ScreenshotOCR
+from src.utils.data_reconstruction import reconstruct_jira_issues
 from src.utils.file_utils import ensure_directory, write_json
 from src.utils.logging_config import get_logger
 from src.vector_store.qdrant_manager import QdrantManager
@@ -32,28 +35,18 @@ async def store_vectors_activity(
 
     # Store code vectors
     if code_data:
-        for file_info in code_data.get("files", []):
-            content = _format_code_for_vector(file_info)
-            count = qdrant.add_text(
-                form_name=form_name, text=content, metadata=file_info, doc_type="code"
-            )
-            total_vectors += count
+        total_vectors += qdrant.add_documents(form_name, _iter_code_documents(code_data))
 
     # Store screenshot vectors
     if screenshot_data:
-        minio_extractor = MinioExtractor()
-        for item in screenshot_data.get("raw_screenshots", []):
-            content, metadata = _format_screenshot_for_vector(item, form_name, minio_extractor)
-            if content:
-                count = qdrant.add_text(
-                    form_name=form_name, text=content, metadata=metadata, doc_type="screenshot"
-                )
-                total_vectors += count
+        total_vectors += qdrant.add_documents(
+            form_name, _iter_screenshot_documents(screenshot_data, form_name)
+        )
 
     # Store Jira vectors
     if jira_data:
         jira_extractor = JiraExtractor()
-        issues = jira_data.get("raw_issues", [])
+        issues = reconstruct_jira_issues(jira_data)
         if issues:
             documents = jira_extractor.to_documents(issues, form_name)
             count = qdrant.add_documents(form_name, documents)
@@ -69,6 +62,41 @@ async def store_vectors_activity(
     }
 
 
+def _iter_code_documents(code_data: dict[str, Any]) -> Iterator[Document]:
+    """Yield one vector document per extracted code file."""
+    for file_info in code_data.get("files", []):
+        yield Document(
+            page_content=_format_code_for_vector(file_info),
+            metadata={**file_info, "doc_type": "code"},
+        )
+
+
+def _iter_screenshot_documents(
+    screenshot_data: dict[str, Any], form_name: str
+) -> Iterator[Document]:
+    """
+    Yield vector documents per screenshot reference.
+
+    Dimensions come from header probes and OCR text from its cache, so no
+    image is downloaded. Screens with OCR text also get a searchable
+    ``screenshot_text`` document.
+    """
+    minio_extractor = MinioExtractor()
+    ocr = ScreenshotOCR()
+    for ref in screenshot_data.get("screenshot_refs", []):
+        content, metadata = _format_screenshot_for_vector(ref, form_name, minio_extractor)
+        if content:
+            yield Document(page_content=content, metadata={**metadata, "doc_type": "screenshot"})
+        text_document = ocr.to_document(
+            ref.get("object_name", ""),
+            ref.get("screen_type", "general"),
+            ocr.get_cached(ref.get("ocr_hash")),
+            form_name,
+        )
+        if text_document:
+            yield text_document
+
+
 def _format_code_for_vector(file_info: dict[str, Any]) -> str:
     """Format code file info for vectorization."""
     return f"""
@@ -81,44 +109,22 @@ Methods: {", ".join(file_info.get("methods", []))}
 
 
 def _format_screenshot_for_vector(
-    item: dict[str, Any], form_name: str, minio_extractor: MinioExtractor
+    ref: dict[str, Any], form_name: str, minio_extractor: MinioExtractor
 ) -> tuple[str, dict[str, Any]]:
-    """Format screenshot for vectorization."""
+    """Format a screenshot reference for vectorization."""
     try:
-        if isinstance(item, dict):
-            image_data = _restore_image_data(item, minio_extractor, form_name)
-
-            # Get dimensions if we have image data
-            width, height = 0, 0
-            if image_data:
-                try:
-                    screenshot_obj = Screenshot(
-                        object_name=item.get("object_name", ""),
-                        bucket=item.get("bucket", ""),
-                        form_name=form_name,
-                        screen_type=item.get("screen_type", "general"),
-                        image_data=image_data,
-                        content_type=item.get("content_type", "image/png"),
-                        size=len(image_data),
-                        metadata={},
-                    )
-                    width, height = minio_extractor.get_image_dimensions(screenshot_obj)
-                except Exception:
-                    pass
-
-            object_name = item.get("object_name", "")
-            screen_type = item.get("screen_type", "general")
-            size = item.get("size", 0)
-            content_type = item.get("content_type", "image/png")
-            bucket = item.get("bucket", "")
-        else:
-            # Screenshot object
-            width, height = minio_extractor.get_image_dimensions(item)
-            object_name = item.object_name
-            screen_type = item.screen_type
-            size = item.size
-            content_type = item.content_type
-            bucket = item.bucket
+        object_name = ref.get("object_name", "")
+        screen_type = ref.get("screen_type", "general")
+        size = ref.get("size", 0)
+        content_type = ref.get("content_type", "image/png")
+        bucket = ref.get("bucket", "")
+
+        # Dimensions from a header probe; the image itself is never downloaded
+        width, height = 0, 0
+        if bucket and object_name:
+            header = minio_extractor.probe_image(bucket, object_name, ref.get("etag") or None)
+            if header:
+                width, height = header.width, header.height
 
         content = f"""
 Screenshot Analysis for {form_name}:
@@ -310,8 +316,9 @@ async def save_prd_activity(
     form_name: str,
     prd_content: str,
     output_dir: str = "./output",
+    llm_usage: dict[str, Any] | None = None,
 ) -> dict[str, Any]:
-    """Save the generated PRD to file."""
+    """Save the generated PRD to file, with LLM usage of the run in its metadata."""
     logger.info("Saving PRD", form_name=form_name, output_dir=output_dir)
 
     output_path = ensure_directory(output_dir)
@@ -326,6 +333,7 @@ async def save_prd_activity(
         "generated_at": datetime.now().isoformat(),
         "file_path": str(md_file),
         "word_count": len(prd_content.split()),
+        "llm_usage": llm_usage or {},
     }
 
     metadata_file = output_path / f"{form_name}_PRD_metadata.json"
@@ -14,6 +14,7 @@ from temporalio.common import RetryPolicy
 
 # Import activities (will be available at runtime)
 with workflow.unsafe.imports_passed_through():
+    from src.utils.llm_usage import merge_llm_usage
     from src.workflows.activities import (
         aggregate_prd_activity,
         analyze_jira_activity,
@@ -39,10 +40,12 @@ class PRDGenerationInput:
     code_directory: str | None = None
     file_mappings: list[str] | None = None
     dependency_file: str | None = None
+    dependency_depth: int | None = None
     minio_bucket: str | None = None
     minio_prefix: str | None = None
     jira_project_key: str | None = None
     jira_jql: str | None = None
+    jira_export_path: str | None = None
     output_dir: str = "./output"
     recreate_vector_collection: bool = False
     skip_screenshots: bool = False
@@ -62,6 +65,7 @@ class PRDGenerationOutput:
     execution_time_seconds: float = 0.0
     error: str | None = None
     agent_results: dict[str, Any] | None = None
+    llm_usage: dict[str, Any] | None = None
 
 
 @workflow.defn
@@ -115,6 +119,25 @@ class PRDGenerationWorkflow:
             "risk_analysis": risk.get("success", False),
         }
 
+    def _build_llm_usage(
+        self,
+        analysis: dict[str, dict[str, Any]],
+        requirements: dict[str, Any],
+        flow_risk: dict[str, dict[str, Any]],
+        prd_result: dict[str, Any],
+    ) -> dict[str, Any]:
+        """Merge the LLM usage reported by each agent activity."""
+        return merge_llm_usage(
+            {
+                "screenshot_analysis": analysis["screenshot"].get("llm_usage"),
+                "jira_analysis": analysis["jira"].get("llm_usage"),
+                "requirements_analysis": requirements.get("llm_usage"),
+                "user_flow_analysis": flow_risk["user_flow"].get("llm_usage"),
+                "risk_analysis": flow_risk["risk"].get("llm_usage"),
+                "prd_aggregation": prd_result.get("llm_usage"),
+            }
+        )
+
     def _build_success_output(
         self,
         input: PRDGenerationInput,
@@ -122,6 +145,7 @@ class PRDGenerationWorkflow:
         save_result: dict[str, Any],
         vector_result: dict[str, Any],
         agent_results: dict[str, bool],
+        llm_usage: dict[str, Any],
     ) -> PRDGenerationOutput:
         """Build successful output response."""
         metrics = prd_result.get("generation_metrics", {})
@@ -136,6 +160,7 @@ class PRDGenerationWorkflow:
             section_count=prd_result.get("section_count", 0),
             execution_time_seconds=execution_time,
             agent_results=agent_results,
+            llm_usage=llm_usage,
         )
 
     @workflow.run
@@ -203,6 +228,7 @@ class PRDGenerationWorkflow:
                     input.code_directory,
                     input.file_mappings,
                     input.dependency_file,
+                    input.dependency_depth,
                 ],
                 **opts,
             )
@@ -219,7 +245,12 @@ class PRDGenerationWorkflow:
         if not input.skip_jira:
             jira_data = await workflow.execute_activity(
                 extract_jira_activity,
-                args=[input.form_name, input.jira_project_key, input.jira_jql],
+                args=[
+                    input.form_name,
+                    input.jira_project_key,
+                    input.jira_jql,
+                    input.jira_export_path,
+                ],
                 **opts,
             )
 
@@ -267,11 +298,18 @@ class PRDGenerationWorkflow:
         """Phase 3: Run screenshot and Jira analysis."""
         workflow.logger.info("Phase 3: Running initial analysis agents")
 
+        # Parsed .form definitions give a UI inventory even without screenshots
+        form_inventory = extraction["code"].get("form_inventory") or {}
+        has_screenshots = (
+            not input.skip_screenshots
+            and extraction["screenshots"].get("screenshot_count", 0) > 0
+        )
+
         screenshot_analysis = self._empty_result("screenshot_analysis")
-        if not input.skip_screenshots and extraction["screenshots"].get("screenshot_count", 0) > 0:
+        if has_screenshots or form_inventory.get("forms"):
             screenshot_analysis = await workflow.execute_activity(
                 analyze_screenshots_activity,
-                args=[input.form_name, extraction["screenshots"]],
+                args=[input.form_name, extraction["screenshots"], form_inventory or None],
                 **opts,
             )
 
@@ -385,18 +423,31 @@ class PRDGenerationWorkflow:
             **long_opts,
         )
 
+        llm_usage = self._build_llm_usage(analysis, requirements, flow_risk, prd_result)
+        workflow.logger.info(
+            f"LLM usage - Calls: {llm_usage['calls']}, "
+            f"Tokens: {llm_usage['prompt_tokens'] + llm_usage['completion_tokens']}, "
+            f"Cost: ${llm_usage['cost_usd']:.4f}"
+        )
+
         if not prd_result.get("success"):
             return PRDGenerationOutput(
                 form_name=input.form_name,
                 success=False,
                 error=prd_result.get("error", "PRD aggregation failed"),
+                llm_usage=llm_usage,
             )
 
         workflow.logger.info("Phase 7: Saving PRD document")
 
         save_result = await workflow.execute_activity(
             save_prd_activity,
-            args=[input.form_name, prd_result.get("markdown_content", ""), input.output_dir],
+            args=[
+                input.form_name,
+                prd_result.get("markdown_content", ""),
+                input.output_dir,
+                llm_usage,
+            ],
             **opts,
         )
 
@@ -411,5 +462,5 @@ class PRDGenerationWorkflow:
         )
 
         return self._build_success_output(
-            input, prd_result, save_result, vector_result, agent_results
+            input, prd_result, save_result, vector_result, agent_results, llm_usage
         )
@@ -10,6 +10,14 @@ from src.extractors.code_extractor import CodeExtractor, CodeFile
 from src.vector_store.qdrant_manager import QdrantManager
 
 
+@pytest.fixture
+def dummy_openai_key(monkeypatch):
+    """Give agents a placeholder API key so creating a client needs no credentials."""
+    from src.config.settings import get_settings
+
+    monkeypatch.setattr(get_settings().openai, "api_key", "sk-test")
+
+
 class TestCodeExtractor:
     """Tests for CodeExtractor."""
     
@@ -81,6 +89,1374 @@ public class UserService {
         assert " " not in name
         assert "-" not in name
 
+    def test_add_documents_streams_in_bounded_batches(self):
+        """Test that add_documents consumes generators in fixed-size batches."""
+        from langchain_core.documents import Document
+
+        manager = QdrantManager()
+        manager._client = MagicMock()
+        consumed: list[int] = []
+
+        def documents():
+            for i in range(25):
+                consumed.append(i)
+                yield Document(page_content=f"document {i}", metadata={"doc_type": "code"})
+
+        with patch.object(
+            manager.embedding_service,
+            "embed_texts_sync",
+            side_effect=lambda texts: [[0.0] * 3 for _ in texts],
+        ):
+            total = manager.add_documents("le01", documents(), batch_size=10)
+
+        batch_sizes = [
+            len(call.kwargs["points"]) for call in manager._client.upsert.call_args_list
+        ]
+        assert total == 25
+        assert batch_sizes == [10, 10, 5]
+        assert len(consumed) == 25
+
+
+class TestCodebaseIndex:
+    """Tests for CodebaseIndex."""
+
+    def test_build_and_resolve(self, tmp_path):
+        """Test that an archive is indexed once and resolved by dependency paths."""
+        import zipfile
+
+        from src.extractors.code_index import CodebaseIndex
+
+        zip_path = tmp_path / "legacy.zip"
+        with zipfile.ZipFile(zip_path, "w") as zf:
+            zf.writestr("src/forms/le01.java", "public class le01 {}\n")
+            zf.writestr("src/forms/ea01.java", "public class ea01 {}\n")
+            zf.writestr("sql/le01.sql", "CREATE TABLE le01 (id INT);\n")
+            zf.writestr("docs/readme.txt", "not code")
+
+        index = CodebaseIndex(zip_path, index_dir=tmp_path / "index")
+        assert not index.exists()
+        index.build()
+        assert index.exists()
+
+        assert index.all_paths() == ["sql/le01.sql", "src/forms/ea01.java", "src/forms/le01.java"]
+
+        paths = index.resolve(["/other/root/src/forms/le01.java", "le01.sql"])
+        files = index.get_files(paths)
+        assert [f.path for f in files] == ["sql/le01.sql", "src/forms/le01.java"]
+        assert files[1].classes == ["le01"]
+        assert files[0].file_type == "ddl"
+
+    def test_dependency_closure(self, tmp_path):
+        """Test transitive dependency closure from a form's entry files."""
+        import zipfile
+
+        from src.extractors.code_index import CodebaseIndex
+
+        zip_path = tmp_path / "legacy.zip"
+        with zipfile.ZipFile(zip_path, "w") as zf:
+            zf.writestr(
+                "src/forms/le01.java",
+                "package forms;\nimport services.CustomerService;\n"
+                "public class le01 { CustomerService s = new CustomerService(); }\n",
+            )
+            zf.writestr("src/forms/le01.form", '<Form><Component class="javax.swing.JButton"/></Form>')
+            zf.writestr(
+                "src/services/CustomerService.java",
+                "package services;\npublic class CustomerService {\n"
+                '  String sql = "SELECT * FROM customer";\n  CustomerDao dao;\n}\n',
+            )
+            zf.writestr(
+                "src/services/CustomerDao.java",
+                "package services;\npublic class CustomerDao {}\n",
+            )
+            zf.writestr("sql/customer.sql", "CREATE TABLE customer (id INT);\n")
+            zf.writestr("src/forms/ea01.java", "package forms;\npublic class ea01 {}\n")
+
+        index = CodebaseIndex(zip_path, index_dir=tmp_path / "index")
+        index.build()
+
+        entries = index.find_entry_files("LE01")
+        assert entries == ["src/forms/le01.form", "src/forms/le01.java"]
+
+        assert index.dependency_closure(entries, depth=1) == [
+            "src/forms/le01.form",
+            "src/forms/le01.java",
+            "src/services/CustomerService.java",
+        ]
+        assert index.dependency_closure(entries, depth=2) == [
+            "sql/customer.sql",
+            "src/forms/le01.form",
+            "src/forms/le01.java",
+            "src/services/CustomerDao.java",
+            "src/services/CustomerService.java",
+        ]
+
+
+class TestCodeMetrics:
+    """Tests for CodeMetricsAnalyzer."""
+
+    def test_complexity_duplication_and_tables(self):
+        """Test per-method complexity, duplicated blocks and SQL table touches."""
+        from src.extractors.code_metrics import CodeMetricsAnalyzer
+
+        extractor = CodeExtractor()
+        body = "".join(f"        int v{i} = {i};\n" for i in range(6))
+        first = extractor.parse_content(
+            "a/Foo.java",
+            "public class Foo {\n"
+            "    public int run(int x) {\n"
+            "        if (x > 0 && x < 10) { return 1; }\n"
+            '        String q = "SELECT * FROM customer";\n'
+            "        return x > 5 ? 1 : 2;\n"
+            "    }\n"
+            f"    private void copy() {{\n{body}    }}\n"
+            "}\n",
+        )
+        second = extractor.parse_content(
+            "b/Bar.java", f"public class Bar {{\n    public void copy() {{\n{body}    }}\n}}\n"
+        )
+        long_body = "".join(f"        total += {i} * x;\n" for i in range(30))
+        third = extractor.parse_content(
+            "c/Baz.java", f"public class Baz {{\n{long_body}{long_body}}}\n"
+        )
+
+        report = CodeMetricsAnalyzer(max_workers=1, complexity_threshold=3).analyze(
+            [first, second, third]
+        )
+
+        run = next(m for m in report.files[0].methods if m.name == "run")
+        assert run.complexity == 4
+        assert report.summary["complex_methods"][0]["method"] == "run"
+        # The six-line copy and the repeated 30-line block are two regions each
+        assert report.summary["duplicated_regions"] == 4
+        assert report.files[2].duplicated_lines == 60
+        assert report.summary["table_touches"] == {"customer": 1}
+
+    def test_python_functions_after_blank_lines(self):
+        """Test that a def preceded by blank lines starts on its own line."""
+        from src.extractors.code_metrics import CodeMetricsAnalyzer
+
+        parsed = CodeExtractor().parse_content(
+            "app/views.py",
+            "import os\n\n\ndef load(path):\n    if path:\n        return os.stat(path)\n",
+        )
+
+        report = CodeMetricsAnalyzer(max_workers=1).analyze([parsed])
+
+        load = report.files[0].methods[0]
+        assert load.name == "load"
+        assert load.line_count == 3
+        assert load.complexity == 2
+
+
+class TestSQLSchemaParser:
+    """Tests for SQLSchemaParser."""
+
+    def test_parse_tables_keys_and_indexes(self):
+        """Test columns, inline and table-level constraints, indexes and ALTER TABLE."""
+        from src.extractors.sql_schema import SchemaIndex, SQLSchemaParser
+
+        ddl = """
+        -- customers
+        CREATE TABLE app.CUSTOMER (
+            CUST_ID NUMBER(10) NOT NULL,
+            NAME VARCHAR2(100) NOT NULL,
+            STATUS CHAR(1) DEFAULT 'A' CHECK (STATUS IN ('A', 'I')),
+            CONSTRAINT PK_CUSTOMER PRIMARY KEY (CUST_ID)
+        );
+        CREATE TABLE orders (
+            order_id INT PRIMARY KEY,
+            cust_id NUMBER(10) REFERENCES customer(cust_id),
+            total DECIMAL(10, 2)
+        );
+        CREATE UNIQUE INDEX ix_name ON customer (name);
+        ALTER TABLE orders ADD CONSTRAINT fk_cust FOREIGN KEY (cust_id) REFERENCES customer (cust_id);
+        """
+
+        schema = SQLSchemaParser().parse(ddl, source_file="schema.sql")
+        customer = schema.tables["customer"]
+        orders = schema.tables["orders"]
+
+        assert customer.primary_key == ["CUST_ID"]
+        assert customer.get_column("name").nullable is False
+        assert customer.get_column("status").default == "'A'"
+        assert customer.indexes[0].unique
+        assert orders.get_column("total").data_type == "DECIMAL(10,2)"
+        assert len(orders.foreign_keys) == 1
+        assert orders.foreign_keys[0].name == "fk_cust"
+        assert schema.referenced_by("CUSTOMER")[0][0] == "orders"
+        assert SchemaIndex.from_dict(schema.to_dict()).tables.keys() == schema.tables.keys()
+
+
+FORM_XML = """<?xml version="1.0" encoding="UTF-8" ?>
+<Form version="1.3" type="org.netbeans.modules.form.forminfo.JDialogFormInfo">
+  <Properties>
+    <Property name="title" type="java.lang.String" value="Customer Maintenance"/>
+  </Properties>
+  <Layout class="org.netbeans.modules.form.compat2.layouts.DesignBorderLayout"/>
+  <SubComponents>
+    <Container class="javax.swing.JPanel" name="pnlMain">
+      <Layout class="org.netbeans.modules.form.compat2.layouts.DesignGridBagLayout"/>
+      <SubComponents>
+        <Component class="javax.swing.JLabel" name="lblName">
+          <Properties>
+            <Property name="text" type="java.lang.String" value="Name:"/>
+          </Properties>
+        </Component>
+        <Component class="javax.swing.JTextField" name="txtName">
+          <Properties>
+            <Property name="columns" type="int" value="30"/>
+          </Properties>
+        </Component>
+        <Component class="javax.swing.JComboBox" name="cboStatus">
+          <Properties>
+            <Property name="model" type="javax.swing.ComboBoxModel">
+              <StringArray count="2">
+                <StringItem index="0" value="Active"/>
+                <StringItem index="1" value="Inactive"/>
+              </StringArray>
+            </Property>
+          </Properties>
+        </Component>
+        <Component class="javax.swing.JButton" name="btnSave">
+          <Properties>
+            <Property name="text" type="java.lang.String" value="Save"/>
+          </Properties>
+          <Events>
+            <EventHandler event="actionPerformed" listener="java.awt.event.ActionListener"
+                          parameters="java.awt.event.ActionEvent" handler="btnSaveActionPerformed"/>
+          </Events>
+        </Component>
+      </SubComponents>
+    </Container>
+  </SubComponents>
+</Form>
+"""
+
+
+class TestFormDefinitionParser:
+    """Tests for FormDefinitionParser and its use by the screenshot agent."""
+
+    def test_parse_components(self):
+        """Test component types, labels, hierarchy, events and constraints."""
+        from src.extractors.form_parser import FormDefinitionParser
+
+        form = FormDefinitionParser().parse(FORM_XML, source_file="ui/CustomerDialog.form")
+        components = {c.name: c for c in form.components}
+
+        assert form.form_type == "dialog"
+        assert form.screen_name == "Customer Maintenance"
+        assert components["pnlMain"].layout == "GridBagLayout"
+        assert components["txtName"].element_type == "input"
+        assert components["txtName"].label == "Name"
+        assert components["txtName"].parent == "pnlMain"
+        assert components["txtName"].depth == 1
+        assert components["txtName"].constraints == {"columns": "30"}
+        assert components["cboStatus"].options == ["Active", "Inactive"]
+        assert components["btnSave"].events == {"actionPerformed": "btnSaveActionPerformed"}
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("dummy_openai_key")
+    async def test_inventory_without_screenshots_needs_no_vision(self):
+        """Test the UI analysis is built from the inventory with no image calls."""
+        from src.agents.screenshot_analysis_agent import ScreenshotAnalysisAgent
+
+        extractor = CodeExtractor()
+        code_file = extractor.parse_content("ui/CustomerDialog.form", FORM_XML)
+        inventory = extractor.extract_form_inventory([code_file])
+
+        agent = ScreenshotAnalysisAgent()
+        with patch.object(agent, "invoke_llm", AsyncMock(return_value="- Use a modern grid")) as llm:
+            result = await agent.analyze(
+                AgentContext(form_name="customer"), screenshots=[], form_inventory=inventory
+            )
+
+        assert result.success
+        assert result.data.component_inventory["input"] == 1
+        assert result.data.screen_analyses[0].screen_type == "dialog"
+        assert all(not call.kwargs.get("images") for call in llm.call_args_list)
+
+
+class TestMinioExtractor:
+    """Tests for MinioExtractor."""
+
+    def test_concurrent_downloads_preserve_order(self):
+        """Test that screenshots are downloaded in parallel but returned by object name."""
+        import time
+        from types import SimpleNamespace
+
+        from src.extractors.minio_extractor import MinioExtractor
+
+        names = [f"le01/screen_{i:02d}.png" for i in range(12)] + ["le01/notes.txt"]
+        objects = [
+            SimpleNamespace(object_name=n, size=3, content_type=None, metadata=None)
+            for n in reversed(names)
+        ]
+
+        def get_object(bucket, object_name):
+            # Later objects finish first
+            time.sleep(0.01 * (12 - int(object_name[-6:-4])))
+            return MagicMock(read=MagicMock(return_value=object_name.encode()))
+
+        extractor = MinioExtractor()
+        extractor._client = MagicMock()
+        extractor._client.list_objects.return_value = iter(objects)
+        extractor._client.get_object.side_effect = get_object
+
+        screenshots = extractor.get_form_screenshots("le01", bucket="shots")
+
+        assert [s.object_name for s in screenshots] == names[:12]
+        assert screenshots[0].image_data == b"le01/screen_00.png"
+        extractor._client.list_objects.assert_called_once()
+
+
+    def test_cache_avoids_repeat_downloads(self, tmp_path):
+        """Test that unchanged objects are served from the ETag-keyed cache."""
+        from types import SimpleNamespace
+
+        from src.extractors.minio_extractor import MinioExtractor
+        from src.extractors.screenshot_cache import ScreenshotCache
+
+        def listing(etag):
+            return [
+                SimpleNamespace(
+                    object_name=f"le01/screen_{i}.png",
+                    size=4,
+                    content_type="image/png",
+                    metadata=None,
+                    etag=f'"{etag}{i}"',
+                )
+                for i in range(3)
+            ]
+
+        extractor = MinioExtractor()
+        extractor._cache = ScreenshotCache(tmp_path, max_bytes=1024)
+        extractor._client = MagicMock()
+        extractor._client.get_object.side_effect = lambda bucket, name: MagicMock(
+            read=MagicMock(return_value=name.encode())
+        )
+
+        extractor._client.list_objects.return_value = iter(listing("v1-"))
+        first = extractor.get_form_screenshots("le01", bucket="shots")
+        extractor._client.list_objects.return_value = iter(listing("v1-"))
+        second = extractor.get_form_screenshots("le01", bucket="shots")
+        assert extractor._client.get_object.call_count == 3
+        assert [s.image_data for s in second] == [s.image_data for s in first]
+        assert second[0].etag == "v1-0"
+
+        extractor._client.stat_object.return_value = SimpleNamespace(etag='"v1-1"')
+        assert extractor.get_screenshot("shots", "le01/screen_1.png").image_data
+        assert extractor._client.get_object.call_count == 3
+
+        # A changed ETag is a new cache key
+        extractor._client.list_objects.return_value = iter(listing("v2-"))
+        extractor.get_form_screenshots("le01", bucket="shots")
+        assert extractor._client.get_object.call_count == 6
+
+    def test_cache_evicts_least_recently_used(self, tmp_path):
+        """Test that the cache stays within its size bound."""
+        from src.extractors.screenshot_cache import ScreenshotCache
+
+        cache = ScreenshotCache(tmp_path, max_bytes=250)
+        for i in range(4):
+            cache.put("shots", f"img_{i}.png", f"e{i}", bytes(100))
+
+        assert cache.get("shots", "img_3.png", "e3") is not None
+        assert cache.get("shots", "img_0.png", "e0") is None
+        assert cache._scan_size() <= 250
+
+        # Re-storing an entry does not count its size twice
+        cache = ScreenshotCache(tmp_path / "again", max_bytes=250)
+        cache.put("shots", "a.png", "e", bytes(120))
+        cache.put("shots", "b.png", "e", bytes(120))
+        cache.put("shots", "b.png", "e", bytes(120))
+        assert cache._size == 240
+        assert cache.get("shots", "a.png", "e") is not None
+
+    def test_screenshot_refs_resolve_from_cache(self, tmp_path):
+        """Test that references carry no image bytes and resolve without a download."""
+        import json
+        from unittest.mock import PropertyMock
+
+        from src.extractors.minio_extractor import MinioExtractor, Screenshot
+        from src.extractors.screenshot_cache import ScreenshotCache
+        from src.utils.data_reconstruction import reconstruct_screenshots
+
+        cache = ScreenshotCache(tmp_path)
+        screenshot = Screenshot(
+            object_name="le01/main.png",
+            bucket="shots",
+            form_name="le01",
+            screen_type="main_screen",
+            image_data=b"\x89PNG-bytes",
+            content_type="image/png",
+            size=10,
+            metadata={},
+            etag="abc",
+        )
+        cache.put("shots", "le01/main.png", "abc", screenshot.image_data)
+
+        ref = screenshot.to_ref()
+        assert "image_data" not in ref
+        assert len(json.dumps(ref)) < 400
+
+        client = MagicMock()
+        with patch.object(MinioExtractor, "cache", new_callable=PropertyMock, return_value=cache), \
+                patch.object(MinioExtractor, "client", new_callable=PropertyMock, return_value=client):
+            screenshots = reconstruct_screenshots({"screenshot_refs": [ref]}, "le01")
+
+        assert [s.image_data for s in screenshots] == [b"\x89PNG-bytes"]
+        client.get_object.assert_not_called()
+
+    def test_probe_image_reads_headers_only(self, tmp_path):
+        """Test header parsing for each format and ranged, cached probes."""
+        import io
+        from types import SimpleNamespace
+
+        from PIL import Image
+
+        from src.extractors.minio_extractor import MinioExtractor
+        from src.extractors.screenshot_cache import ScreenshotCache
+        from src.utils.image_header import parse_image_header
+
+        def encode(fmt, size=(321, 123), **kwargs):
+            buffer = io.BytesIO()
+            Image.new("RGB", size, "navy").save(buffer, format=fmt, **kwargs)
+            return buffer.getvalue()
+
+        for fmt, kwargs in [
+            ("PNG", {}), ("GIF", {}), ("BMP", {}), ("JPEG", {}),
+            ("WEBP", {}), ("WEBP", {"lossless": True}),
+        ]:
+            header = parse_image_header(encode(fmt, **kwargs)[:1024])
+            assert (header.width, header.height) == (321, 123), fmt
+        # A JPEG whose EXIF block pushes the frame header past the first bytes
+        exif = Image.Exif()
+        exif[0x010E] = "x" * 20000
+        jpeg = encode("JPEG", exif=exif.tobytes())
+        assert parse_image_header(jpeg[:8192]) is None
+        assert parse_image_header(jpeg).width == 321
+
+        reads = []
+
+        def get_object(bucket, name, offset=0, length=0):
+            reads.append(length)
+            return MagicMock(read=MagicMock(return_value=jpeg[offset : offset + length]))
+
+        extractor = MinioExtractor()
+        extractor._cache = ScreenshotCache(tmp_path)
+        extractor._client = MagicMock()
+        extractor._client.get_object.side_effect = get_object
+        extractor._client.stat_object.return_value = SimpleNamespace(etag='"e1"')
+
+        header = extractor.probe_image("shots", "le01/photo.jpg")
+        assert (header.format, header.width, header.height) == ("jpeg", 321, 123)
+        assert reads == [8192, 32768]
+
+        assert extractor.probe_image("shots", "le01/photo.jpg", etag="e1") == header
+        assert len(reads) == 2
+
+class TestImagePreprocessor:
+    """Tests for the vision image preprocessing pipeline."""
+
+    def test_crop_downscale_and_cache(self, tmp_path):
+        """Test border cropping, downscaling, re-encoding, detail choice and caching."""
+        import io
+
+        from PIL import Image, ImageDraw
+
+        from src.config.settings import VisionSettings
+        from src.extractors.screenshot_cache import ScreenshotCache
+        from src.utils.image_processing import ImagePreprocessor, estimate_image_tokens
+
+        image = Image.new("RGB", (3200, 2000), "white")
+        draw = ImageDraw.Draw(image)
+        for x in range(400, 2800, 40):
+            draw.rectangle([x, 300, x + 20, 1700], fill=(x % 255, 80, 160))
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        png = buffer.getvalue()
+
+        preprocessor = ImagePreprocessor(
+            VisionSettings(max_long_edge=1024), cache=ScreenshotCache(tmp_path)
+        )
+        prepared = preprocessor.prepare(png, cache_id=("shots", "le01/main.png", "etag-1"))
+
+        assert prepared.processed_size[0] == 1024
+        assert prepared.processed_size[0] / prepared.processed_size[1] == pytest.approx(
+            2380 / 1400, rel=0.01
+        )
+        assert prepared.image.mime_type == "image/webp"
+        assert prepared.image.detail == "high"
+        assert prepared.processed_bytes < prepared.original_bytes
+        assert prepared.processed_tokens < prepared.original_tokens
+        assert prepared.image.data_url.startswith("data:image/webp;base64,")
+
+        again = preprocessor.prepare(png, cache_id=("shots", "le01/main.png", "etag-1"))
+        assert again.from_cache
+        assert again.image.data == prepared.image.data
+
+        assert estimate_image_tokens(400, 300, detail="low") == 85
+        assert estimate_image_tokens(1024, 1024) == 765
+
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("dummy_openai_key")
+    async def test_near_duplicate_screenshots_share_one_vision_call(self, tmp_path):
+        """Test dHash clustering skips vision calls for near-identical screenshots."""
+        import io
+
+        from PIL import Image, ImageDraw
+
+        from src.agents.screenshot_analysis_agent import ScreenshotAnalysisAgent
+        from src.extractors.minio_extractor import Screenshot
+        from src.extractors.screenshot_cache import ScreenshotCache
+
+        def render(name, label, bars):
+            image = Image.new("RGB", (640, 480), "white")
+            draw = ImageDraw.Draw(image)
+            for i in range(bars):
+                draw.rectangle([40 + i * 70, 60, 80 + i * 70, 420], fill=(30, 60, 120))
+            draw.text((50, 440), label, fill="black")
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            data = buffer.getvalue()
+            return Screenshot(name, "shots", "le01", "general", data, "image/png", len(data), {})
+
+        screenshots = [
+            render("a_customer_1.png", "Customer 1001", 8),
+            render("a_customer_2.png", "Customer 2002", 8),
+            render("b_orders.png", "Orders", 3),
+        ]
+
+        agent = ScreenshotAnalysisAgent()
+        agent.image_preprocessor._cache = ScreenshotCache(tmp_path)
+        vision_json = '{"screen_name": "Screen", "screen_type": "form", "ui_elements": []}'
+        with patch.object(agent, "invoke_llm", AsyncMock(return_value=vision_json)) as llm:
+            result = await agent.analyze(AgentContext(form_name="le01"), screenshots=screenshots)
+
+        vision_calls = [c for c in llm.call_args_list if c.kwargs.get("images")]
+        assert result.success
+        assert len(vision_calls) == 2
+        assert result.data.vision_calls_skipped == 1
+        assert result.data.screen_analyses[0].screenshots == ["a_customer_1.png", "a_customer_2.png"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("dummy_openai_key")
+    async def test_ocr_text_grounds_prompts_and_skips_text_only_vision(self, tmp_path):
+        """Test OCR text lowers image detail and text-only screens get no image."""
+        import io
+
+        from PIL import Image, ImageDraw
+
+        from src.agents.screenshot_analysis_agent import ScreenshotAnalysisAgent
+        from src.extractors import screenshot_ocr
+        from src.extractors.minio_extractor import Screenshot
+        from src.extractors.screenshot_cache import ScreenshotCache
+
+        def render(name, bars):
+            image = Image.new("RGB", (640, 480), "white")
+            draw = ImageDraw.Draw(image)
+            draw.rectangle([40, 20, 300, 40], fill="black")
+            for i in range(bars):
+                draw.rectangle([40 + i * 70, 100, 80 + i * 70, 420], fill=(30, 60, 120))
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            data = buffer.getvalue()
+            return Screenshot(name, "shots", "le01", "general", data, "image/png", len(data), {})
+
+        def fake_recognize(job):
+            image_hash, data = job[0], job[1]
+            image = Image.open(io.BytesIO(data)).convert("RGB")
+            lines = [screenshot_ocr.TextLine("Customer Maintenance", 40, 20, 260, 20, 95.0)]
+            return screenshot_ocr.ScreenshotText(
+                image_hash, image.width, image.height, lines,
+                screenshot_ocr._ink_outside_text(image, lines),
+            )
+
+        screenshots = [render("a_message.png", 0), render("b_grid.png", 6)]
+        agent = ScreenshotAnalysisAgent()
+        agent.image_preprocessor._cache = ScreenshotCache(tmp_path / "vision")
+        agent._ocr = screenshot_ocr.ScreenshotOCR(tmp_path / "ocr", max_workers=1)
+        agent._ocr._available = True
+
+        vision_json = '{"screen_name": "Screen", "screen_type": "form", "ui_elements": []}'
+        with (
+            patch.object(screenshot_ocr, "_recognize", side_effect=fake_recognize) as recognize,
+            patch.object(agent, "invoke_llm", AsyncMock(return_value=vision_json)) as llm,
+        ):
+            result = await agent.analyze(AgentContext(form_name="le01"), screenshots=screenshots)
+            agent.ocr.extract(screenshots)
+
+        analysis_calls = [c for c in llm.call_args_list if "Analyze" in c.args[1]]
+        assert result.success
+        assert result.data.text_only_screens == 1
+        assert analysis_calls[0].kwargs["images"] is None
+        assert "no image is attached" in analysis_calls[0].args[1]
+        assert [image.detail for image in analysis_calls[1].kwargs["images"]] == ["low"]
+        assert '"Customer Maintenance" at x=40, y=20' in analysis_calls[1].args[1]
+        # Second extract is served from the hash-keyed cache
+        assert recognize.call_count == 2
+
+        documents = agent.ocr.to_documents(screenshots, agent.ocr.extract(screenshots), "le01")
+        assert [d.metadata["doc_type"] for d in documents] == ["screenshot_text"] * 2
+        assert "Customer Maintenance" in documents[0].page_content
+
+class TestJiraExtractor:
+    """Tests for JiraExtractor."""
+
+    @staticmethod
+    def _issue(number):
+        return {
+            "key": f"LE-{number}",
+            "fields": {
+                "summary": f"Issue {number}",
+                "issuetype": {"name": "Story"},
+                "status": {"name": "Open"},
+                "priority": {"name": "Medium"},
+                "created": "2024-01-01T00:00:00.000+0000",
+                "updated": "2024-01-02T00:00:00.000+0000",
+            },
+            "changelog": {
+                "histories": [
+                    {
+                        "author": {"displayName": "Ann"},
+                        "created": "2024-01-02T00:00:00.000+0000",
+                        "items": [{"field": "status", "fromString": "New", "toString": "Open"}],
+                    }
+                ]
+            },
+        }
+
+    def test_paginates_concurrently_with_field_projection(self):
+        """Test that all pages are fetched in order with only the parsed fields."""
+        from src.extractors.jira_extractor import JiraExtractor
+
+        def jql(query, fields, start, limit, expand):
+            numbers = range(start, min(start + limit, 250))
+            return {"startAt": start, "total": 250, "issues": [self._issue(n) for n in numbers]}
+
+        extractor = JiraExtractor()
+        extractor._client = MagicMock(cloud=False)
+        extractor._client.jql.side_effect = jql
+
+        issues = extractor.get_form_issues("le01", project_key="LE")
+
+        assert [i.key for i in issues] == [f"LE-{n}" for n in range(250)]
+        calls = extractor._client.jql.call_args_list
+        assert sorted(c.kwargs["start"] for c in calls) == [0, 100, 200]
+        assert all(c.kwargs["fields"] == JiraExtractor.ISSUE_FIELDS for c in calls)
+        assert all(c.kwargs["expand"] is None for c in calls)
+
+        extractor._client.jql.reset_mock()
+        limited = extractor.get_form_issues("le01", max_results=30, include_changelog=True)
+        assert len(limited) == 30
+        assert extractor._client.jql.call_args.kwargs["expand"] == "changelog"
+        assert limited[0].changelog[0]["to"] == "Open"
+
+    def test_projection_keeps_acceptance_criteria_custom_fields(self):
+        """Test that text custom fields from the field metadata are requested and parsed."""
+        from src.extractors.jira_extractor import JiraExtractor
+
+        def jql(query, fields, start, limit, expand):
+            issue = self._issue(1)
+            issue["fields"].update(
+                {
+                    "customfield_10100": "Search returns matching customers only",
+                    "customfield_10200": "Release train A",
+                    "customfield_10300": "not requested",
+                }
+            )
+            issue["fields"] = {k: v for k, v in issue["fields"].items() if k in fields}
+            return {"total": 1, "issues": [issue]}
+
+        extractor = JiraExtractor()
+        extractor._client = MagicMock(cloud=False)
+        extractor._client.jql.side_effect = jql
+        text = {"type": "string"}
+        extractor._client.get_all_fields.return_value = [
+            {"id": "summary", "name": "Summary", "schema": text},
+            {"id": "customfield_10100", "name": "Acceptance Criteria", "schema": text},
+            {"id": "customfield_10200", "name": "Release Train", "schema": text},
+            {"id": "customfield_10300", "name": "Sprint", "schema": {"type": "array"}},
+        ]
+
+        issue = extractor.get_form_issues("le01", project_key="LE")[0]
+        extractor.get_form_issues("le01", project_key="LE")
+
+        assert issue.acceptance_criteria == "Search returns matching customers only"
+        assert issue.custom_fields == {
+            "customfield_10100": "Search returns matching customers only",
+            "customfield_10200": "Release train A",
+        }
+        assert extractor._client.get_all_fields.call_count == 1
+
+    def test_incremental_sync_from_local_store(self, tmp_path):
+        """Test that repeat syncs fetch only changes and drop deleted issues."""
+        from src.extractors.jira_extractor import JiraExtractor
+        from src.extractors.jira_store import JiraIssueStore
+        from src.utils.data_reconstruction import reconstruct_jira_issues
+
+        remote = {n: self._issue(n) for n in range(5)}
+        queries = []
+
+        def jql(query, fields, start, limit, expand):
+            queries.append(query)
+            if query.startswith("key in"):
+                matches = [issue for issue in remote.values() if issue["key"] in query]
+            elif "updated >=" in query:
+                matches = [remote[3]]
+            else:
+                matches = list(remote.values())
+            if fields == ["key"]:
+                matches = [{"key": issue["key"]} for issue in matches]
+            return {"total": len(matches), "issues": matches[start : start + limit]}
+
+        extractor = JiraExtractor()
+        extractor._client = MagicMock(cloud=False)
+        extractor._client.jql.side_effect = jql
+        extractor._store = JiraIssueStore(tmp_path)
+
+        first = extractor.sync_form_issues("le01", project_key="LE")
+        assert first.full and first.fetched == 5 and len(first.issues) == 5
+
+        remote[3]["fields"]["summary"] = "Renamed"
+        del remote[4]
+        extractor.settings.jira.deletion_check_hours = 0
+        try:
+            second = extractor.sync_form_issues("le01", project_key="LE")
+        finally:
+            extractor.settings.jira.deletion_check_hours = 24
+
+        assert not second.full
+        assert second.fetched == 1 and second.deleted == 1
+        assert "updated >= -6m" in queries[-2]
+        assert {i.key: i.summary for i in second.issues}["LE-3"] == "Renamed"
+        assert "LE-4" not in {i.key for i in second.issues}
+
+        serialized = {"raw_issues": [issue.to_dict() for issue in second.issues]}
+        restored = reconstruct_jira_issues(serialized)
+        assert restored[0].created == second.issues[0].created
+
+        # Activities pass a store reference instead of the issues themselves
+        scope = extractor.store.scope_for(extractor.build_form_jql("le01", "LE"))
+        ref = {"source": "store", "scope": scope, "keys": ["LE-3", "LE-0", "LE-9"]}
+        assert [i.key for i in extractor.resolve_issues(ref)] == ["LE-3", "LE-0"]
+        assert queries[-1] == "key in (LE-9)"
+
+        # A worker on another host has no local store: the keys are fetched from Jira
+        elsewhere = JiraExtractor()
+        elsewhere._client = extractor._client
+        elsewhere._store = JiraIssueStore(tmp_path / "other-host")
+        assert [i.key for i in elsewhere.resolve_issues(ref)] == ["LE-3", "LE-0"]
+        assert queries[-1] == "key in (LE-3, LE-0, LE-9)"
+
+    def test_export_ingestion_streams_and_indexes(self, tmp_path):
+        """Test XML and JSON exports map through _parse_issue into a term index."""
+        import json
+
+        from src.extractors import jira_export
+        from src.extractors.jira_export import JiraExportIndex, iter_export_issues
+        from src.extractors.jira_extractor import JiraExtractor
+
+        xml_export = tmp_path / "export.xml"
+        xml_export.write_text(
+            """<?xml version="1.0"?>
+<rss version="0.92"><channel><title>Export</title>
+<item>
+  <key>LE-1</key><summary>LE01 customer search</summary><type>Story</type>
+  <status>Done</status><priority>High</priority>
+  <created>Mon, 1 Jan 2024 10:00:00 +0000</created>
+  <updated>Tue, 2 Jan 2024 10:00:00 +0000</updated>
+  <labels><label>billing</label></labels>
+  <customfields><customfield id="customfield_10020">
+    <customfieldname>Story Points</customfieldname>
+    <customfieldvalues><customfieldvalue>5.0</customfieldvalue></customfieldvalues>
+  </customfield></customfields>
+</item>
+<item>
+  <key>LE-2</key><summary>Printer setup</summary><type>Bug</type>
+  <status>Open</status><priority>Low</priority>
+  <created>Mon, 1 Jan 2024 10:00:00 +0000</created>
+  <updated>Wed, 3 Jan 2024 10:00:00 +0000</updated>
+  <component>Forms le01</component>
+</item>
+<item>
+  <key>OPS-9</key><summary>Unrelated</summary><type>Task</type>
+  <created>Mon, 1 Jan 2024 10:00:00 +0000</created>
+  <updated>Mon, 1 Jan 2024 10:00:00 +0000</updated>
+</item>
+</channel></rss>"""
+        )
+
+        extractor = JiraExtractor()
+        index = JiraExportIndex(xml_export, tmp_path / "index")
+        index.build(extractor._parse_issue)
+        issues = index.find("le01")
+        assert [i.key for i in issues] == ["LE-2", "LE-1"]
+        assert issues[1].story_points == 5.0
+        assert index.find("le01", project_key="OPS") == []
+
+        def rest_issue(n):
+            return {
+                "key": f"LE-{n}",
+                "fields": {
+                    "summary": f"Issue {n} " + "x" * 40,
+                    "labels": ["le01"] if n % 2 else [],
+                    "created": "2024-01-01T00:00:00.000+0000",
+                    "updated": f"2024-01-{n + 1:02d}T00:00:00.000+0000",
+                },
+            }
+
+        json_export = tmp_path / "export.json"
+        json_export.write_text(
+            json.dumps({"startAt": 0, "total": 20, "issues": [rest_issue(n) for n in range(20)]})
+        )
+        with patch.object(jira_export, "_READ_CHUNK_SIZE", 64):
+            streamed = list(iter_export_issues(json_export))
+        assert [i["key"] for i in streamed] == [f"LE-{n}" for n in range(20)]
+
+        json_index = JiraExportIndex(json_export, tmp_path / "index")
+        json_index.build(extractor._parse_issue)
+        assert [i.key for i in json_index.find("le01")][:3] == ["LE-19", "LE-17", "LE-15"]
+        assert len(json_index.find("le01")) == 10
+        # Every token of a multi-token name must match
+        assert [i.key for i in json_index.find("issue-3")] == ["LE-3"]
+        assert json_index.find("issue-admin") == []
+
+    def test_text_normalized_at_parse_time(self):
+        """Test that markup, quoted replies, signatures and repeated comments are dropped."""
+        from src.extractors.jira_extractor import JiraExtractor
+
+        bot_comment = {"author": {"displayName": "CI"}, "body": "Deployed to *staging*."}
+        raw = self._issue(1)
+        raw["fields"]["description"] = (
+            "h2. Search\n* Filter by [customer|https://x/y] for [~ann]\n"
+            "{code:java}\n" + "\n".join(f"line {n}" for n in range(20)) + "\n{code}"
+        )
+        raw["fields"]["comment"] = {
+            "comments": [
+                {
+                    "author": {"displayName": "Bob"},
+                    "body": "Agreed.\n{quote}Earlier text{quote}\n> old reply\n\nRegards,\nBob",
+                },
+                {"author": {"displayName": "Bob"}, "body": "{quote}only a quote{quote}"},
+                bot_comment,
+            ]
+        }
+        other = self._issue(2)
+        other["fields"]["comment"] = {"comments": [bot_comment]}
+
+        extractor = JiraExtractor()
+        issues = [extractor._parse_issue(raw), extractor._parse_issue(other)]
+        extractor.normalizer.dedupe_comments(issues)
+
+        description = issues[0].description
+        assert description.startswith("Search\n- Filter by customer for @ann")
+        assert "line 7" in description and "line 8" not in description
+        assert "[... 12 more lines]" in description
+        assert [c["body"] for c in issues[0].comments] == ["Agreed.", "Deployed to staging."]
+        assert issues[1].comments == []
+
+        stats = extractor.text_stats
+        assert stats["duplicate_comments_removed"] == 1
+        assert stats["quoted_blocks_removed"] == 3
+        assert stats["tokens_saved"] > 0
+
+    def test_dedupe_counts_comments_normalized_elsewhere(self):
+        """Test that deduping store-served comments never drives the stats negative."""
+        from src.extractors.jira_text import JiraTextNormalizer
+
+        body = "Deployed to staging."
+        issues = [MagicMock(comments=[{"body": body}]) for _ in range(5)]
+
+        normalizer = JiraTextNormalizer()
+        normalizer.dedupe_comments(issues)
+
+        stats = normalizer.stats.to_dict()
+        assert stats["chars_after"] == 0
+        assert stats["tokens_after"] == 0
+        assert stats["duplicate_chars_removed"] == 4 * len(body)
+        assert stats["tokens_saved"] > 0
+
+
+class TestRateLimiter:
+    """Tests for the shared LLM rate limiter."""
+
+    def test_shared_buckets_reconcile_usage(self, tmp_path):
+        """Test that limiter instances share buckets through SQLite and return unused tokens."""
+        from src.utils.rate_limiter import RateLimiter, RateLimits
+
+        limits = {"gpt-4o": RateLimits(requests_per_minute=2, tokens_per_minute=1000)}
+        first = RateLimiter(tmp_path / "limits.sqlite", shared=True, limits=limits)
+        second = RateLimiter(tmp_path / "limits.sqlite", shared=True, limits=limits)
+
+        assert first.reserve("gpt-4o", 600) == 0
+        # 400 tokens left; 200 more refill in 12 seconds
+        assert second.reserve("gpt-4o", 600) == pytest.approx(12, abs=0.5)
+
+        first.reconcile("gpt-4o", estimated_tokens=600, actual_tokens=100)
+        assert second.reserve("gpt-4o", 600) == 0
+        # Both requests of the minute are used
+        assert first.reserve("gpt-4o", 10) == pytest.approx(30, abs=0.5)
+
+    @pytest.mark.asyncio
+    async def test_retry_after_pauses_model(self):
+        """Test that a 429 is retried after Retry-After and pauses the model for all callers."""
+        import httpx
+        import openai
+
+        from src.utils.rate_limiter import RateLimiter, RateLimits
+
+        limiter = RateLimiter(shared=False, limits={"gpt-4o": RateLimits(100, 100000)})
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        attempts = []
+
+        async def call():
+            attempts.append(1)
+            if len(attempts) == 1:
+                response = httpx.Response(429, headers={"retry-after-ms": "20"}, request=request)
+                raise openai.RateLimitError("rate limited", response=response, body=None)
+            return "ok"
+
+        with patch.object(limiter, "block", wraps=limiter.block) as block:
+            assert await limiter.run("gpt-4o", 100, call) == "ok"
+        assert len(attempts) == 2
+        assert block.call_args.args == ("gpt-4o", 0.02)
+
+        async def bad_request():
+            response = httpx.Response(400, request=request)
+            raise openai.BadRequestError("bad", response=response, body=None)
+
+        with pytest.raises(openai.BadRequestError):
+            await limiter.run("gpt-4o", 100, bad_request)
+
+        limiter.block("gpt-4o", 5)
+        assert limiter.reserve("gpt-4o", 1) > 4
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits_for_shared_lock_off_the_event_loop(self, tmp_path):
+        """Test that a locked shared state does not block other coroutines."""
+        import asyncio
+        import sqlite3
+
+        from src.utils.rate_limiter import RateLimiter, RateLimits
+
+        limiter = RateLimiter(
+            tmp_path / "limits.sqlite", shared=True, limits={"gpt-4o": RateLimits(100, 100000)}
+        )
+        other = sqlite3.connect(tmp_path / "limits.sqlite", isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+
+        task = asyncio.create_task(limiter.acquire("gpt-4o", 10))
+        await asyncio.sleep(0.05)
+        assert not task.done()
+
+        other.rollback()
+        other.close()
+        assert await task == 0
+
+
+class TestConcurrencyController:
+    """Tests for the adaptive LLM concurrency controller."""
+
+    @pytest.mark.asyncio
+    async def test_window_grows_on_success_and_halves_once_on_throttling(self):
+        """Test additive increase up to the ceiling and one decrease per congestion event."""
+        import asyncio
+
+        import httpx
+        import openai
+
+        from src.utils.concurrency import ConcurrencyController
+
+        controller = ConcurrencyController(
+            initial=2, minimum=1, maximum=4, backoff=0.5, latency_target_seconds=0
+        )
+        active = []
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with controller.slot("gpt-4o"):
+                active.append(1)
+                peak = max(peak, len(active))
+                await asyncio.sleep(0.01)
+                active.pop()
+
+        await asyncio.gather(*(call() for _ in range(20)))
+        metrics = controller.metrics()["gpt-4o"]
+        assert 2 <= peak <= 4
+        assert metrics["window"] == 4
+        assert metrics["successes"] == 20
+
+        response = httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com"))
+
+        async def throttled():
+            async with controller.slot("gpt-4o"):
+                await asyncio.sleep(0.01)
+                raise openai.RateLimitError("rate limited", response=response, body=None)
+
+        results = await asyncio.gather(throttled(), throttled(), return_exceptions=True)
+        assert all(isinstance(r, openai.RateLimitError) for r in results)
+        metrics = controller.metrics()["gpt-4o"]
+        assert metrics["throttled"] == 2
+        assert metrics["window"] == 2
+        assert metrics["in_flight"] == 0
+
+
+class TestLLMResponseCache:
+    """Tests for the disk-backed LLM response cache."""
+
+    @staticmethod
+    def _agent(tmp_path):
+        from langchain_core.messages import AIMessage
+
+        from src.agents.base_agent import BaseAgent
+        from src.utils.llm_cache import LLMResponseCache
+        from src.utils.rate_limiter import RateLimiter
+
+        class EchoAgent(BaseAgent):
+            def get_system_prompt(self, context):
+                return "You are terse."
+
+            async def analyze(self, context, **kwargs):
+                return None
+
+        agent = EchoAgent("EchoAgent")
+        agent._llm = MagicMock(model_name="gpt-4o", temperature=0.1, max_tokens=100)
+        agent._llm.ainvoke = AsyncMock(side_effect=lambda m: AIMessage(content=m[1].content))
+        agent._rate_limiter = RateLimiter(shared=False)
+        agent._response_cache = LLMResponseCache(tmp_path)
+        agent.use_response_cache = True
+        return agent
+
+    @pytest.mark.asyncio
+    async def test_identical_calls_are_served_from_cache(self, tmp_path):
+        """Test that repeated prompts skip the LLM unless bypassed."""
+        agent = self._agent(tmp_path)
+        context = AgentContext(form_name="le01")
+
+        assert await agent.invoke_llm(context, "List actors") == "List actors"
+        assert await agent.invoke_llm(context, "List actors") == "List actors"
+        assert agent._llm.ainvoke.await_count == 1
+
+        await agent.invoke_llm(context, "List risks")
+        await agent.invoke_llm(context, "List actors", use_cache=False)
+        assert agent._llm.ainvoke.await_count == 3
+
+        # A new agent instance on the same directory (a rerun) hits the disk cache
+        rerun = self._agent(tmp_path)
+        assert await rerun.invoke_llm(context, "List risks") == "List risks"
+        assert rerun._llm.ainvoke.await_count == 0
+        assert rerun.response_cache.stats() == {"hits": 1, "misses": 0}
+
+    def test_expiry_and_size_eviction(self, tmp_path):
+        """Test that expired entries miss and the least recently used entries are evicted."""
+        from src.utils.llm_cache import LLMResponseCache
+
+        expired = LLMResponseCache(tmp_path / "ttl", ttl_seconds=0)
+        expired.put("a", "gpt-4o", "answer")
+        assert expired.get("a") is None
+
+        cache = LLMResponseCache(tmp_path / "lru", max_bytes=100)
+        cache.put("a", "gpt-4o", "a" * 40)
+        cache.put("b", "gpt-4o", "b" * 40)
+        assert cache.get("a") is not None
+        cache.put("c", "gpt-4o", "c" * 40)
+        assert cache.get("b") is None
+        assert cache.get("a") == "a" * 40
+        assert cache.get("c") == "c" * 40
+
+
+class TestLLMUsage:
+    """Tests for per-call LLM usage accounting."""
+
+    @pytest.mark.asyncio
+    async def test_calls_recorded_per_call_site_and_merged(self, tmp_path):
+        """Test that tokens, retries and cache hits are attributed to the calling method."""
+        import httpx
+        import openai
+        from langchain_core.messages import AIMessage
+
+        from src.utils.llm_usage import merge_llm_usage
+
+        agent = TestLLMResponseCache._agent(tmp_path)
+        response = httpx.Response(
+            429, headers={"retry-after-ms": "1"}, request=httpx.Request("POST", "https://x")
+        )
+        agent._llm.ainvoke = AsyncMock(
+            side_effect=[
+                openai.RateLimitError("rate limited", response=response, body=None),
+                AIMessage(
+                    content="- Clerk\n- Manager",
+                    usage_metadata={
+                        "input_tokens": 1000,
+                        "output_tokens": 100,
+                        "total_tokens": 1100,
+                        "input_token_details": {"cache_read": 400},
+                    },
+                ),
+            ]
+        )
+
+        async def _identify_actors(context):
+            return await agent.invoke_llm_for_list(context, "List actors")
+
+        context = AgentContext(form_name="le01")
+        assert await _identify_actors(context) == ["Clerk", "Manager"]
+        assert await _identify_actors(context) == ["Clerk", "Manager"]
+
+        usage = agent.llm_usage()
+        site = usage["by_call_site"][_identify_actors.__qualname__]
+        assert usage["calls"] == site["calls"] == 2
+        assert usage["cache_hits"] == 1
+        assert usage["retries"] == 1
+        assert (usage["prompt_tokens"], usage["completion_tokens"]) == (1000, 100)
+        # 600 uncached and 400 cached input tokens plus 100 output tokens at gpt-4o prices
+        assert usage["cost_usd"] == pytest.approx((600 * 2.5 + 400 * 1.25 + 100 * 10) / 1e6)
+
+        result = agent.create_success_result([], MagicMock(elapsed_ms=lambda: 1.0))
+        assert result.metadata["llm_usage"] == usage
+
+        merged = merge_llm_usage({"user_flow_analysis": usage, "risk_analysis": usage, "jira": {}})
+        assert merged["calls"] == 4
+        assert merged["by_call_site"][_identify_actors.__qualname__]["calls"] == 4
+        assert set(merged["by_agent"]) == {"user_flow_analysis", "risk_analysis"}
+
+
+class TestTokenBudget:
+    """Tests for token counting and relevance packing of prompt context."""
+
+    def test_pack_selects_relevant_items_within_budget(self):
+        """Test that packing prefers relevant short items and truncates when nothing fits."""
+        from src.utils.token_budget import ContextItem, TokenBudget
+
+        budget = TokenBudget("gpt-4o")
+        short = ContextItem(text="Invoices are approved by managers.", score=0.9)
+        long = ContextItem(text="Irrelevant filler. " * 200, score=0.8)
+        other = ContextItem(text="Approved invoices are posted nightly.", score=0.5)
+        limit = budget.count(short.text) + budget.count(other.text) + 10
+
+        packed = budget.pack([other, long, short], limit)
+        assert [item.text for item in packed] == [short.text, other.text]
+        assert sum(budget.count(item.text) for item in packed) <= limit
+
+        truncated = budget.pack([long], 20)
+        assert len(truncated) == 1
+        assert budget.count(truncated[0].text) <= 20
+        assert truncated[0].text.endswith("...")
+
+        assert budget.pack_lines(["a b c", "d e f", "g h i " * 100], 10) == ["a b c", "d e f"]
+
+    @pytest.mark.usefixtures("dummy_openai_key")
+    def test_code_summary_ranks_files_by_distance_from_the_form(self):
+        """Test that the entry file and its dependencies win over unrelated and huge files."""
+        from src.agents.requirements_generator_agent import RequirementsGeneratorAgent
+
+        def java(path, imports=(), methods=("run",)):
+            return CodeFile(
+                path=path,
+                content="",
+                language="java",
+                file_type="source",
+                classes=[path.rsplit("/", 1)[-1][:-5]],
+                methods=list(methods),
+                imports=list(imports),
+            )
+
+        code_files = [
+            java("a/Aardvark.java", methods=[f"m{i}" for i in range(40)]),
+            java("b/Helper.java"),
+            java("z/le01.java", imports=["b.Helper"]),
+        ]
+        agent = RequirementsGeneratorAgent()
+        context = AgentContext(form_name="le01")
+
+        assert agent._dependency_distances("le01", code_files) == {
+            "z/le01.java": 0,
+            "b/Helper.java": 1,
+        }
+        summary = agent._build_code_summary(context, code_files, max_tokens=60)
+        assert summary.splitlines()[0].startswith("- z/le01.java")
+        assert "b/Helper.java" in summary
+        assert "Aardvark" not in summary
+
+        full = agent._build_code_summary(context, code_files, max_tokens=1000)
+        assert "(+25 more)" in full
+
+        # Many small unrelated files do not crowd out the form's own files
+        crowded = [
+            java("z/le01.java", imports=["b.Helper"], methods=[f"m{i}" for i in range(15)]),
+            java("b/Helper.java"),
+        ] + [java(f"u/Util{n}.java") for n in range(200)]
+        summary = agent._build_code_summary(context, crowded, max_tokens=1500).splitlines()
+        assert summary[0].startswith("- z/le01.java")
+        assert summary[1].startswith("- b/Helper.java")
+        assert all(line.startswith("- u/Util") for line in summary[2:])
+
+    @pytest.mark.asyncio
+    async def test_agent_prompts_fit_the_budget(self, tmp_path):
+        """Test that formatted context respects its budget and oversized prompts are cut."""
+        agent = TestLLMResponseCache._agent(tmp_path)
+        agent.use_response_cache = False
+        contexts = [f"Context {i}: " + "detail " * 50 for i in range(10)]
+
+        formatted = agent.format_context_for_prompt(contexts, max_contexts=10, max_tokens=200)
+        assert 0 < agent.token_budget.count(formatted) <= 200
+        assert "Context 0:" in formatted
+
+        with patch("src.utils.token_budget.context_window", return_value=8000):
+            limit = agent.token_budget.prompt_limit
+            response = await agent.invoke_llm(AgentContext(form_name="le01"), "word " * 10000)
+        assert 0 < agent.token_budget.count(response) <= limit
+
+
+class TestStructuredOutput:
+    """Tests for JSON schema structured output of agent calls."""
+
+    def test_schema_derived_from_dataclass_and_json_decoded_in_place(self):
+        """Test the strict schema of nested dataclasses and JSON extraction from prose."""
+        from src.agents.screenshot_analysis_agent import ScreenAnalysis
+        from src.utils.serialization import (
+            extract_json_array,
+            extract_json_object,
+            json_schema_response_format,
+        )
+
+        response_format = json_schema_response_format(
+            ScreenAnalysis, many=True, exclude=("screenshots",)
+        )
+        assert response_format["json_schema"]["strict"] is True
+        item = response_format["json_schema"]["schema"]["properties"]["items"]["items"]
+        assert "screenshots" not in item["properties"]
+        assert item["required"] == list(item["properties"])
+        element = item["properties"]["ui_elements"]["items"]
+        assert element["additionalProperties"] is False
+        assert element["properties"]["interactions"] == {
+            "type": "array",
+            "items": {"type": "string"},
+        }
+
+        prose = 'Screen [main]: {"screen_name": "Orders", "tags": ["a"]} Also see {"x": 1}.'
+        assert extract_json_object(prose) == {"screen_name": "Orders", "tags": ["a"]}
+        assert extract_json_array('Result:\n[{"id": 1}]\n[done]') == [{"id": 1}]
+        assert extract_json_array('{"items": [{"id": 2}]}') == [{"id": 2}]
+
+    @pytest.mark.asyncio
+    async def test_agent_requests_schema_and_parses_response(self, tmp_path):
+        """Test that structured calls send the dataclass schema and unwrap list results."""
+        from langchain_core.messages import AIMessage
+
+        from src.agents.risk_analysis_agent import Risk
+
+        agent = TestLLMResponseCache._agent(tmp_path)
+        agent.use_response_cache = False
+        agent._llm.ainvoke = AsyncMock(
+            return_value=AIMessage(content='{"items": [{"risk_id": "RISK-001"}]}')
+        )
+
+        data = await agent.invoke_llm_structured(
+            AgentContext(form_name="le01"), "List risks", Risk, many=True
+        )
+        assert data == [{"risk_id": "RISK-001"}]
+        response_format = agent._llm.ainvoke.await_args.kwargs["response_format"]
+        assert response_format["json_schema"]["name"] == "RiskList"
+
+
+class TestModelRouting:
+    """Tests for per-call-site model routing."""
+
+    @pytest.mark.asyncio
+    async def test_routed_call_escalates_on_invalid_response(self, tmp_path):
+        """Test that routed calls use their tier and escalate when the answer is invalid."""
+        from langchain_core.messages import AIMessage
+
+        from src.utils.model_routing import ModelRouter, ModelTier
+
+        agent = TestLLMResponseCache._agent(tmp_path)
+        agent.use_response_cache = False
+        fast = MagicMock(model_name="gpt-4o-mini", temperature=0.0, max_tokens=50)
+        fast.ainvoke = AsyncMock(return_value=AIMessage(content=""))
+        agent._tier_llms["fast"] = fast
+
+        async def _identify_actors(context):
+            return await agent.invoke_llm_for_list(context, "- Clerk")
+
+        tiers = {
+            "standard": ModelTier("standard", "gpt-4o", 100, 0.1),
+            "fast": ModelTier("fast", "gpt-4o-mini", 50, 0.0, escalate_to="standard"),
+        }
+        agent._router = ModelRouter(tiers, routes={_identify_actors.__qualname__: "fast"})
+        assert agent.router.route("Other._method").name == "standard"
+
+        assert await _identify_actors(AgentContext(form_name="le01")) == ["Clerk"]
+        assert fast.ainvoke.await_count == 1
+        assert agent._llm.ainvoke.await_count == 1
+        assert [call.model for call in agent.llm_calls] == ["gpt-4o-mini", "gpt-4o"]
+
+        fast.ainvoke.return_value = AIMessage(content="- Manager")
+        assert await _identify_actors(AgentContext(form_name="le01")) == ["Manager"]
+        assert agent._llm.ainvoke.await_count == 1
+
+    def test_combined_call_sites_keep_the_fast_tier(self):
+        """Test that combined calls of fast-tier sections are routed like the sections."""
+        from src.agents.user_flow_agent import UserFlowAgent
+        from src.utils.model_routing import DEFAULT_ROUTES, FAST_TIER
+
+        combined = UserFlowAgent._generate_context_sections.__qualname__
+        assert DEFAULT_ROUTES[combined] == FAST_TIER
+        assert DEFAULT_ROUTES[UserFlowAgent._identify_actors.__qualname__] == FAST_TIER
+
+
+class TestCombinedSections:
+    """Tests for requesting an agent's secondary sections in one call."""
+
+    @pytest.mark.asyncio
+    async def test_invalid_sections_fall_back_to_individual_calls(self, tmp_path):
+        """Test that one combined call fills valid sections and only invalid ones are redone."""
+        import json
+
+        from langchain_core.messages import AIMessage
+
+        from src.agents.risk_analysis_agent import Risk, RiskAnalysisAgent
+        from src.utils.model_routing import ModelRouter
+        from src.utils.rate_limiter import RateLimiter
+
+        agent = RiskAnalysisAgent()
+        agent.use_response_cache = False
+        agent._rate_limiter = RateLimiter(shared=False)
+        agent._router = ModelRouter(routes={}, enabled=False)
+        agent._llm = MagicMock(model_name="gpt-4o", temperature=0.1, max_tokens=100)
+        combined = {
+            "recommended_approach": "Phased migration behind a strangler facade. " * 3,
+            "dependencies_risks": ["Nightly batch export to the ledger system"],
+            "technical_debt_items": ["Validation rules duplicated across three screens"],
+            "success_factors": ["ok"],
+            "executive_summary": "Moderate risk driven by undocumented integrations. " * 3,
+        }
+        agent._llm.ainvoke = AsyncMock(
+            side_effect=[
+                AIMessage(content=json.dumps(combined)),
+                AIMessage(content="- Early stakeholder sign-off on scope"),
+            ]
+        )
+        risk = Risk(
+            "RISK-001", "Hidden rules", "", "technical", "high", "medium", "", [], [], "", "", ""
+        )
+        risk_matrix = agent._calculate_risk_matrix([risk])
+
+        sections = await agent._generate_sections(
+            AgentContext(form_name="le01"), [risk], risk_matrix, "high", [], None
+        )
+
+        assert agent._llm.ainvoke.await_count == 2
+        assert sections["success_factors"] == ["Early stakeholder sign-off on scope"]
+        assert sections["dependencies_risks"] == combined["dependencies_risks"]
+        assert sections["executive_summary"] == combined["executive_summary"].strip()
+        response_format = agent._llm.ainvoke.await_args_list[0].kwargs["response_format"]
+        assert response_format["json_schema"]["name"] == "RiskAnalysisSections"
+
 
 class TestAgentContext:
     """Tests for AgentContext."""